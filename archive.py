@@ -0,0 +1,306 @@
+"""
+Codaqui Analytics compact archive
+
+A binary copy of the data/YYYY-MM JSON folders that stays small as history
+grows:
+
+- data/archive/dictionaries/<column>.jsonl holds every pagePath,
+  sessionSource and newVsReturning value ever seen, one JSON string per
+  line. The line number is the value's integer ID and lines are only ever
+  appended, so a new month adds its new paths instead of repeating them all.
+- data/archive/<report>/YYYY-MM.arrow holds one month of a report as an
+  uncompressed Arrow IPC file of fixed-width columns: int32 IDs for those
+  strings (-1 for null) and the metric types of storage.SCHEMAS. year and
+  month come from the file name.
+
+Months are read through a memory map (read_month), so the column buffers
+point into the page cache instead of being parsed or copied.
+
+The JSON layout can be rebuilt from the archive byte for byte (export_month).
+
+The JSON folders are the only committed copy: the archive is kept out of git
+and built on the dashboard host (streamlit.service runs build before
+starting), where build only rewrites the months whose JSON files are newer
+than their archive files.
+
+Build the archive from data/:   python archive.py build [data_dir]
+Export it back to JSON folders: python archive.py export [data_dir] out_dir
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+
+import pyarrow as pa
+
+import storage
+
+ARCHIVE_DIR = "archive"
+DICTIONARY_DIR = "dictionaries"
+# String columns stored as IDs into a global dictionary
+CODED_COLUMNS = ("pagePath", "newVsReturning", "sessionSource")
+NULL_ID = -1
+MONTH_FILE_PATTERN = re.compile(r"^(\d{4}-\d{2})\.arrow$")
+# Schema metadata telling which JSON file the sessions rows came from
+SESSIONS_SOURCE_KEY = b"json"
+# Reports whose JSON rows hold metrics as strings, as the API returns them
+STRING_REPORTS = ("pages_info", "website_info")
+
+
+def archive_schema(report: str) -> pa.Schema:
+    """storage.SCHEMAS without year and month, with int32 IDs for strings."""
+    return pa.schema(
+        [
+            pa.field(
+                field.name, pa.int32() if field.name in CODED_COLUMNS else field.type
+            )
+            for field in storage.SCHEMAS[report]
+            if field.name not in ("year", "month")
+        ]
+    )
+
+
+def month_path(data_dir: str, report: str, year_month: str) -> str:
+    """Path of the archive file holding one month of a report."""
+    return os.path.join(data_dir, ARCHIVE_DIR, report, f"{year_month}.arrow")
+
+
+class Dictionary:
+    """Append-only mapping between the values of a column and integer IDs."""
+
+    def __init__(self, data_dir: str, column: str):
+        self.path = os.path.join(
+            data_dir, ARCHIVE_DIR, DICTIONARY_DIR, f"{column}.jsonl"
+        )
+        self.values = []
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.values = [json.loads(line) for line in f]
+        self.ids = {value: i for i, value in enumerate(self.values)}
+        self._saved = len(self.values)
+
+    def encode(self, values) -> pa.Array:
+        """IDs of ``values``, giving new values the next free IDs."""
+        ids = []
+        for value in values:
+            if value is None:
+                ids.append(NULL_ID)
+                continue
+            value_id = self.ids.get(value)
+            if value_id is None:
+                value_id = self.ids[value] = len(self.values)
+                self.values.append(value)
+            ids.append(value_id)
+        return pa.array(ids, pa.int32())
+
+    def decode(self, ids) -> list:
+        """Values of ``ids`` (an int32 array or a list of ints)."""
+        if isinstance(ids, (pa.Array, pa.ChunkedArray)):
+            ids = ids.to_pylist()
+        return [
+            None if value_id == NULL_ID else self.values[value_id] for value_id in ids
+        ]
+
+    def save(self):
+        """Append the values added since the file was read."""
+        if len(self.values) == self._saved:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        saved = self._saved
+        with open(self.path, "a", encoding="utf-8") as f:
+            for value in self.values[saved:]:
+                f.write(json.dumps(value) + "\n")
+        self._saved = len(self.values)
+
+
+def load_dictionaries(data_dir: str) -> dict:
+    """The dictionary of every coded column, as stored in data_dir."""
+    return {column: Dictionary(data_dir, column) for column in CODED_COLUMNS}
+
+
+def encode_table(report: str, table: pa.Table, dictionaries: dict) -> pa.Table:
+    """Archive table of a typed storage.SCHEMAS table."""
+    schema = archive_schema(report)
+    arrays = []
+    for field in schema:
+        column = table[field.name]
+        if field.name in CODED_COLUMNS:
+            arrays.append(dictionaries[field.name].encode(column.to_pylist()))
+        else:
+            arrays.append(column.combine_chunks())
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def write_table(path: str, table: pa.Table):
+    """Write an Arrow IPC file, moving it into place once complete."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with pa.OSFile(f"{path}.tmp", "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(f"{path}.tmp", path)
+
+
+def write_month(data_dir: str, year_month: str, dictionaries: dict = None):
+    """Archive every report of a month from its JSON files."""
+    if dictionaries is None:
+        dictionaries = load_dictionaries(data_dir)
+    folder = os.path.join(data_dir, year_month)
+    tables = {}
+    for report, rows in storage.read_month_rows(data_dir, year_month).items():
+        table = encode_table(
+            report, storage.to_table(report, rows, year_month), dictionaries
+        )
+        if report == "website_sessions_info":
+            cross_tab = os.path.exists(
+                os.path.join(folder, "website_sessions_info.json")
+            )
+            source = "website_sessions_info" if cross_tab else "website_dimensions_info"
+            table = table.replace_schema_metadata({SESSIONS_SOURCE_KEY: source})
+        tables[report] = table
+    # IDs must be on disk before any month file refers to them
+    for dictionary in dictionaries.values():
+        dictionary.save()
+    for report, table in tables.items():
+        write_table(month_path(data_dir, report, year_month), table)
+    logging.info("Archived %s", year_month)
+
+
+def is_current(data_dir: str, year_month: str) -> bool:
+    """Whether every archive file of a month is newer than its JSON files."""
+    folder = os.path.join(data_dir, year_month)
+    newest = max(
+        (
+            os.path.getmtime(os.path.join(folder, f"{report}.json"))
+            for report in storage.JSON_REPORTS
+            if os.path.exists(os.path.join(folder, f"{report}.json"))
+        ),
+        default=0,
+    )
+    for report in storage.SCHEMAS:
+        path = month_path(data_dir, report, year_month)
+        if not os.path.exists(path) or os.path.getmtime(path) < newest:
+            return False
+    return True
+
+
+def read_month(
+    data_dir: str, report: str, year_month: str, memory_map: bool = True
+) -> pa.Table:
+    """One month of a report, with IDs still encoded.
+
+    With ``memory_map`` the columns are views over the mapped file, which
+    stays mapped for as long as the table (or a slice of it) is alive.
+    """
+    path = month_path(data_dir, report, year_month)
+    source = pa.memory_map(path) if memory_map else pa.OSFile(path)
+    return pa.ipc.open_file(source).read_all()
+
+
+def months(data_dir: str = "data") -> list:
+    """Sorted YYYY-MM months in the archive."""
+    folder = os.path.join(data_dir, ARCHIVE_DIR, "website_info")
+    if not os.path.isdir(folder):
+        return []
+    return sorted(
+        match.group(1)
+        for match in map(MONTH_FILE_PATTERN.match, os.listdir(folder))
+        if match
+    )
+
+
+def json_rows(
+    report: str, table: pa.Table, year_month: str, dictionaries: dict
+) -> list:
+    """Rows of an archive table in the layout of its JSON file."""
+    columns = {}
+    for field in table.schema:
+        if field.name in CODED_COLUMNS:
+            columns[field.name] = dictionaries[field.name].decode(table[field.name])
+            continue
+        values = table[field.name].to_pylist()
+        if report in STRING_REPORTS:
+            text = storage.api_number if pa.types.is_floating(field.type) else str
+            values = [None if value is None else text(value) for value in values]
+        columns[field.name] = values
+    if report == "pages_info":
+        year, month = year_month.split("-")
+        columns["year"] = [year] * table.num_rows
+        columns["month"] = [month] * table.num_rows
+
+    names = [name for name in storage.SCHEMAS[report].names if name in columns]
+    return [dict(zip(names, values)) for values in zip(*(columns[n] for n in names))]
+
+
+def export_month(data_dir: str, year_month: str, out_dir: str, dictionaries=None):
+    """Write a month's JSON files in out_dir/YYYY-MM from the archive."""
+    if dictionaries is None:
+        dictionaries = load_dictionaries(data_dir)
+    files = {}
+    for report in storage.SCHEMAS:
+        if not os.path.exists(month_path(data_dir, report, year_month)):
+            continue
+        table = read_month(data_dir, report, year_month)
+        rows = json_rows(report, table, year_month, dictionaries)
+        if report != "website_sessions_info":
+            files[report] = rows
+            continue
+        metadata = table.schema.metadata or {}
+        if metadata.get(SESSIONS_SOURCE_KEY) == b"website_dimensions_info":
+            # Split marginals of an old month: each row has one of the keys
+            files["website_dimensions_info"] = {
+                row["newVsReturning"] or row["sessionSource"]: row["sessions"]
+                for row in rows
+            }
+        else:
+            files["website_dimensions_info"] = storage.dimensions_info(rows)
+            files["website_sessions_info"] = rows
+
+    folder = os.path.join(out_dir, year_month)
+    os.makedirs(folder, exist_ok=True)
+    for report in storage.JSON_REPORTS:
+        if report in files:
+            path = os.path.join(folder, f"{report}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(json.dumps(files[report], indent=4))
+
+
+def build(data_dir: str = "data") -> list:
+    """Archive the month folders of data_dir the archive is missing or behind."""
+    dictionaries = load_dictionaries(data_dir)
+    archived = [
+        year_month
+        for year_month in storage.month_folders(data_dir)
+        if not is_current(data_dir, year_month)
+    ]
+    for year_month in archived:
+        write_month(data_dir, year_month, dictionaries)
+    return archived
+
+
+def export(data_dir: str, out_dir: str) -> list:
+    """Write the JSON folders of every archived month to out_dir."""
+    dictionaries = load_dictionaries(data_dir)
+    exported = months(data_dir)
+    for year_month in exported:
+        export_month(data_dir, year_month, out_dir, dictionaries)
+    return exported
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Codaqui Analytics compact archive")
+    parser.add_argument("command", choices=("build", "export"))
+    parser.add_argument("data_dir", nargs="?", default="data")
+    parser.add_argument("out_dir", nargs="?", help="JSON output folder for export")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        done = build(args.data_dir)
+        logging.info("Archived %d months", len(done))
+    else:
+        if not args.out_dir:
+            parser.error("export needs an out_dir")
+        done = export(args.data_dir, args.out_dir)
+        logging.info("Exported %d months to %s", len(done), args.out_dir)
@@ -0,0 +1,216 @@
+"""
+Dashboard load and render benchmark
+
+Builds synthetic archives of 1, 5 and 20 years and, for each one, times:
+
+- loading every month (cold from JSON, cold from Parquet and warm);
+- the data step of each dashboard page (the Queries calls it makes);
+- a full headless render of each page with Streamlit's AppTest, which
+  includes the data step and the Plotly figures.
+
+Results are compared with benchmarks/baseline_dashboard.json and the script
+exits with status 1 when a timing is slower than the baseline by more than
+the tolerance. Use --update-baseline to store the current numbers.
+
+Example: python benchmarks/bench_dashboard.py --years 1 5 20
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "streamlit")]
+
+import pandas as pd  # noqa: E402
+import streamlit as st  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import storage  # noqa: E402
+from data_loader import DataStore  # noqa: E402
+from queries import Queries  # noqa: E402
+from synthetic import make_archive  # noqa: E402
+
+BASELINE = os.path.join(ROOT, "benchmarks", "baseline_dashboard.json")
+APP = os.path.join(ROOT, "streamlit", "main.py")
+# Differences below this many milliseconds are treated as noise
+NOISE_MS = 5.0
+
+
+def overview_data(queries, catalog):
+    return queries.website(catalog["year"].unique(), catalog["month"].unique())
+
+
+def pages_data(queries, catalog):
+    years, months = catalog["year"].unique(), catalog["month"].unique()
+    queries.pages(years, months)
+    queries.top_pages(20, years, months)
+    page_index = queries.page_index(years, months)
+    page_index.search("python")
+    return page_index.series(page_index.paths[:3])
+
+
+def traffic_data(queries, catalog):
+    years, months = catalog["year"].unique(), catalog["month"].unique()
+    queries.sources(years, months)
+    queries.visitors(years, months)
+    return queries.source_totals(years, months)
+
+
+def comparative_data(queries, catalog):
+    first, last = catalog["year_month"].iloc[0], catalog["year_month"].iloc[-1]
+    for period in (first, last):
+        queries.website(period=period)
+        queries.top_pages(10, period=period)
+
+
+def monthly_data(queries, catalog):
+    period = catalog["year_month"].iloc[-1]
+    queries.history()
+    queries.website(period=period)
+    queries.top_pages(10, period=period)
+    return queries.source_totals(period=period)
+
+
+# Sidebar label of each page -> its data step
+PAGES = {
+    "📊 Visão Geral": overview_data,
+    "📄 Análise de Páginas": pages_data,
+    "🌐 Fontes de Tráfego": traffic_data,
+    "🔍 Comparativo": comparative_data,
+    "📈 Relatório Mensal": monthly_data,
+}
+
+
+def timed(function):
+    """Wall time of one call in milliseconds"""
+    gc.collect()
+    started = time.perf_counter()
+    function()
+    return (time.perf_counter() - started) * 1000
+
+
+def best(function, repeat):
+    return min(timed(function) for _ in range(repeat))
+
+
+def render_times(data_dir, repeat):
+    """Headless render time of each page, cold (first visit) and warm"""
+    cwd = os.getcwd()
+    os.chdir(os.path.dirname(data_dir))
+    # The app keeps its DataStore in st.cache_resource; start each archive cold
+    st.cache_resource.clear()
+    try:
+        app = AppTest.from_file(APP, default_timeout=300)
+        app.run()
+        results = {}
+        for page in PAGES:
+            selectbox = app.sidebar.selectbox[0]
+            results[f"render cold {page}"] = timed(lambda: selectbox.select(page).run())
+            if app.exception:
+                raise RuntimeError(f"{page} failed: {app.exception[0].value}")
+            results[f"render warm {page}"] = best(app.run, repeat)
+        return results
+    finally:
+        os.chdir(cwd)
+
+
+def measure(years, pages_per_month, repeat):
+    """Every timing of one archive size, in milliseconds"""
+    with tempfile.TemporaryDirectory() as workdir:
+        data_dir = os.path.join(workdir, "data")
+        make_archive(data_dir, months=12 * years, pages_per_month=pages_per_month)
+        results = {"load json (cold)": best(lambda: DataStore(data_dir).load(), repeat)}
+
+        storage.rebuild(data_dir)
+        results["load parquet (cold)"] = best(
+            lambda: DataStore(data_dir).load(), repeat
+        )
+        store = DataStore(data_dir)
+        store.load()
+        results["load (warm)"] = best(store.load, repeat)
+
+        for page, data_step in PAGES.items():
+            catalog = store.catalog()
+            results[f"data cold {page}"] = timed(
+                lambda: data_step(Queries(DataStore(data_dir)), catalog)
+            )
+            queries = Queries(store)
+            results[f"data warm {page}"] = best(
+                lambda: data_step(queries, catalog), repeat
+            )
+
+        results.update(render_times(data_dir, repeat))
+    return results
+
+
+def compare(current, baseline, tolerance):
+    """One row per timing with its baseline and whether it regressed"""
+    rows = []
+    for archive, timings in current.items():
+        for name, ms in timings.items():
+            before = baseline.get(archive, {}).get(name)
+            regressed = (
+                before is not None
+                and ms > before * (1 + tolerance)
+                and ms - before > NOISE_MS
+            )
+            rows.append(
+                {
+                    "archive": archive,
+                    "timing": name,
+                    "ms": round(ms, 1),
+                    "baseline_ms": None if before is None else round(before, 1),
+                    "change": None if not before else f"{ms / before - 1:+.0%}",
+                    "regressed": regressed,
+                }
+            )
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--pages", type=int, default=600, help="pages per month")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed slowdown over the baseline (0.25 = 25%%)",
+    )
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    current = {
+        f"{years}y x {args.pages} pages": measure(years, args.pages, args.repeat)
+        for years in args.years
+    }
+    try:
+        with open(BASELINE, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = {}
+
+    report = compare(current, baseline, args.tolerance)
+    print(report.to_string(index=False))
+
+    if args.update_baseline:
+        baseline.update(
+            {
+                archive: {name: round(ms, 2) for name, ms in timings.items()}
+                for archive, timings in current.items()
+            }
+        )
+        with open(BASELINE, "w", encoding="utf-8") as f:
+            f.write(json.dumps(baseline, indent=4, ensure_ascii=False))
+        print(f"Baseline written to {BASELINE}")
+    elif report["regressed"].any():
+        print(f"{int(report['regressed'].sum())} timings regressed")
+        sys.exit(1)
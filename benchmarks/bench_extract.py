@@ -0,0 +1,111 @@
+"""
+Extractor benchmark against the offline fake Analytics API
+
+Runs main.backfill() for a few months of synthetic properties of growing
+size and reports extraction throughput (page rows per second, excluding the
+time the fake spends generating rows), API round trips, peak traced memory
+and bytes written to data/. No network or credentials are needed.
+
+Example: python benchmarks/bench_extract.py --pages 1000 10000 100000 --months 3
+"""
+
+import argparse
+import asyncio
+import gc
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd  # noqa: E402
+
+import main  # noqa: E402
+from fake_ga import FakeAnalyticsClient, FakeProperty  # noqa: E402
+from synthetic import month_range  # noqa: E402
+
+
+def folder_bytes(path):
+    """Total size of the files under ``path``"""
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path)
+        for name in files
+    )
+
+
+def extract(fake, months):
+    """One forced backfill of ``months``; returns wall time in seconds"""
+    gc.collect()
+    started = time.perf_counter()
+    results = asyncio.run(main.backfill(1, months, force=True, api_client=fake))
+    elapsed = time.perf_counter() - started
+    if "failed" in results.values():
+        raise RuntimeError(f"Extraction failed: {results}")
+    return elapsed
+
+
+def run(page_sizes, months, repeat, latency):
+    rows = []
+    year_months = month_range("2024-01", months)
+    cwd = os.getcwd()
+    for pages in page_sizes:
+        with tempfile.TemporaryDirectory() as workdir:
+            os.chdir(workdir)
+            os.makedirs("data")
+            try:
+                fake = FakeAnalyticsClient(FakeProperty(pages), latency=latency)
+                # First run also builds the fake's responses; later runs only
+                # pay for decoding and writing
+                extract(fake, year_months)
+                calls, requests = fake.calls, fake.requests
+                seconds = min(extract(fake, year_months) for _ in range(repeat))
+
+                tracemalloc.start()
+                extract(fake, year_months)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+                written = folder_bytes("data")
+                json_bytes = sum(
+                    folder_bytes(os.path.join("data", month)) for month in year_months
+                )
+            finally:
+                os.chdir(cwd)
+
+        page_rows = pages * months
+        rows.append(
+            {
+                "pages/month": pages,
+                "months": months,
+                "page_rows": page_rows,
+                "api_calls": calls,
+                "requests": requests,
+                "time_s": round(seconds, 3),
+                "rows_per_s": int(page_rows / seconds),
+                "peak_mb": round(peak / 2**20, 1),
+                "written_mb": round(written / 2**20, 2),
+                "json_mb": round(json_bytes / 2**20, 2),
+                "generate_s": round(fake.generation_seconds, 2),
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--months", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds added per API call"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    print(
+        run(args.pages, args.months, args.repeat, args.latency).to_string(index=False)
+    )
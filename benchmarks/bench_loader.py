@@ -0,0 +1,145 @@
+"""
+Dashboard loader benchmark
+
+Compares the original per-row load_all_data() with the DataStore loader
+(vectorised JSON, Parquet store and warm cache) on synthetic archives that
+are 1x, 10x and 100x the page rows of the current data/ folder.
+
+Example: python benchmarks/bench_loader.py --scales 1 10 100
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "streamlit")]
+
+import pandas as pd  # noqa: E402
+
+import storage  # noqa: E402
+from data_loader import DataStore  # noqa: E402
+from synthetic import make_archive  # noqa: E402
+
+# Shape of the current archive: 28 months with ~60 pages each
+BASE_MONTHS = 28
+BASE_PAGES = 60
+
+
+def legacy_load_all_data(data_dir):
+    """load_all_data() as it was before DataStore, kept as the baseline"""
+    website_data = []
+    pages_data = []
+    dimensions_data = []
+    for root, dirs, files in os.walk(data_dir):
+        if "website_info.json" not in files:
+            continue
+        year_month = root.split("/")[-1]
+        try:
+            year, month = year_month.split("-")
+            with open(os.path.join(root, "website_info.json"), "r") as f:
+                data = json.load(f)[0]
+                data["year"] = int(year)
+                data["month"] = int(month)
+                data["year_month"] = year_month
+                for key in ["activeUsers", "screenPageViews", "sessions"]:
+                    if key in data:
+                        data[key] = int(data[key])
+                for key in ["averageSessionDuration", "bounceRate"]:
+                    if key in data:
+                        data[key] = float(data[key])
+                website_data.append(data)
+            with open(os.path.join(root, "pages_info.json"), "r") as f:
+                for page in json.load(f):
+                    page["year"] = int(year)
+                    page["month"] = int(month)
+                    page["year_month"] = year_month
+                    for key in ["activeUsers", "screenPageViews"]:
+                        if key in page:
+                            page[key] = int(page[key])
+                    pages_data.append(page)
+            with open(os.path.join(root, "website_dimensions_info.json"), "r") as f:
+                for source, count in json.load(f).items():
+                    dimensions_data.append(
+                        {
+                            "source": source,
+                            "count": int(count),
+                            "year": int(year),
+                            "month": int(month),
+                            "year_month": year_month,
+                        }
+                    )
+        except ValueError:
+            continue
+    return (
+        pd.DataFrame(website_data),
+        pd.DataFrame(pages_data),
+        pd.DataFrame(dimensions_data),
+    )
+
+
+def measure(load, repeat):
+    """Best wall time over ``repeat`` runs plus peak traced memory of one run"""
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        frames = load()
+        timings.append(time.perf_counter() - started)
+
+    gc.collect()
+    tracemalloc.start()
+    load()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    resident = sum(frame.memory_usage(deep=True).sum() for frame in frames)
+    return min(timings), peak, resident, len(frames[1])
+
+
+def run(scales, repeat):
+    rows = []
+    for scale in scales:
+        with tempfile.TemporaryDirectory() as data_dir:
+            make_archive(
+                data_dir, months=BASE_MONTHS, pages_per_month=BASE_PAGES * scale
+            )
+            variants = {
+                "legacy": lambda: legacy_load_all_data(data_dir),
+                "json (cold)": lambda: DataStore(data_dir).load(),
+            }
+            results = {name: measure(load, repeat) for name, load in variants.items()}
+
+            storage.rebuild(data_dir)
+            results["parquet (cold)"] = measure(
+                lambda: DataStore(data_dir).load(), repeat
+            )
+            warm = DataStore(data_dir)
+            warm.load()
+            results["warm cache"] = measure(warm.load, repeat)
+
+            for name, (seconds, peak, resident, page_rows) in results.items():
+                rows.append(
+                    {
+                        "scale": f"{scale}x",
+                        "loader": name,
+                        "page_rows": page_rows,
+                        "time_ms": round(seconds * 1000, 2),
+                        "peak_mb": round(peak / 2**20, 2),
+                        "frames_mb": round(resident / 2**20, 2),
+                    }
+                )
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(run(args.scales, args.repeat).to_string(index=False))
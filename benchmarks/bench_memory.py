@@ -0,0 +1,123 @@
+"""
+Dashboard memory benchmark
+
+Loads a synthetic archive in several processes at once, the way concurrent
+server processes of streamlit.service would, and reports what each of them
+holds once every process has its data loaded:
+
+- anon_mb: private heap that no other process can share;
+- pss_mb: the process's fair share of its resident memory (shared pages
+  are divided between the processes mapping them);
+- rss_mb: resident memory, counting shared pages in full.
+
+Every figure is the growth over the process's memory before loading. Sources
+are the Parquet store (decoded into each process's heap) and data/archive/
+(memory-mapped; see archive.py). "months" loads every month on its own, like
+the monthly report visited month by month; "history" loads all months as
+one selection, like the overview.
+
+Example: python benchmarks/bench_memory.py --processes 1 4 --years 20
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "streamlit")]
+
+import pandas as pd  # noqa: E402
+
+import archive  # noqa: E402
+import storage  # noqa: E402
+from data_loader import DataStore  # noqa: E402
+from synthetic import make_archive  # noqa: E402
+
+FIELDS = {"Anonymous": "anon_mb", "Pss": "pss_mb", "Rss": "rss_mb"}
+
+
+def memory():
+    """Memory counters of this process from /proc/self/smaps_rollup, in bytes"""
+    counters = {}
+    with open("/proc/self/smaps_rollup", "r") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in FIELDS:
+                counters[FIELDS[name]] = int(value.split()[0]) * 1024
+    return counters
+
+
+def worker(data_dir, mode, barrier, results):
+    before = memory()
+    store = DataStore(data_dir)
+    if mode == "months":
+        for year_month in store.available_months():
+            store.load([year_month])
+    else:
+        store.load()
+    barrier.wait()  # everyone holds their data while memory is measured
+    after = memory()
+    results.put({name: after[name] - before[name] for name in after})
+    barrier.wait()
+
+
+def measure(data_dir, mode, processes):
+    """Median growth per process with ``processes`` of them loaded at once"""
+    context = multiprocessing.get_context("fork")
+    barrier = context.Barrier(processes)
+    results = context.Queue()
+    workers = [
+        context.Process(target=worker, args=(data_dir, mode, barrier, results))
+        for _ in range(processes)
+    ]
+    for process in workers:
+        process.start()
+    samples = [results.get() for _ in workers]
+    for process in workers:
+        process.join()
+    return {
+        name: round(statistics.median(s[name] for s in samples) / 2**20, 2)
+        for name in FIELDS.values()
+    }
+
+
+def run(workdir, process_counts):
+    parquet_dir = os.path.join(workdir, "parquet")
+    storage.rebuild(parquet_dir)
+    archive_dir = os.path.join(workdir, "archive")
+    shutil.copytree(parquet_dir, archive_dir)
+    archive.build(archive_dir)
+
+    rows = []
+    for source, data_dir in (("parquet", parquet_dir), ("archive", archive_dir)):
+        for mode in ("months", "history"):
+            for processes in process_counts:
+                rows.append(
+                    {
+                        "source": source,
+                        "load": mode,
+                        "processes": processes,
+                        **measure(data_dir, mode, processes),
+                    }
+                )
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--years", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=600, help="pages per month")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        make_archive(
+            os.path.join(workdir, "parquet"),
+            months=12 * args.years,
+            pages_per_month=args.pages,
+        )
+        print(run(workdir, args.processes).to_string(index=False))
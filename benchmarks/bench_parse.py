@@ -0,0 +1,93 @@
+"""
+JSON month parsing benchmark
+
+Times a cold DataStore.load() of a synthetic JSON-only archive (no Parquet
+or data/archive/), where every month folder has to be read and decoded,
+for each way parse_months can read them:
+
+- sequential, with the json module and with orjson when installed;
+- a thread pool and a process pool with 1, 2, 4... workers, up to the
+  cores available (--workers to choose), with orjson when installed.
+
+Process pools are created once and warmed up before timing, as they are on
+a running server. The speed-up is against sequential json.
+
+Example: python benchmarks/bench_parse.py --years 20 --pages 600
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "streamlit")]
+
+import pandas as pd  # noqa: E402
+
+import data_loader  # noqa: E402
+from data_loader import DataStore, available_cpus  # noqa: E402
+from synthetic import make_archive  # noqa: E402
+
+
+def timed_load(data_dir, pool, workers, repeat):
+    """Median seconds of a cold load, after one warm-up load"""
+    DataStore(data_dir, pool=pool, workers=workers).load()
+    timings = []
+    for _ in range(repeat):
+        store = DataStore(data_dir, pool=pool, workers=workers)
+        started = time.perf_counter()
+        store.load()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def run(data_dir, worker_counts, repeat):
+    orjson = data_loader.orjson
+    default = "json" if orjson is None else "orjson"
+
+    data_loader.orjson = None
+    rows = [("json", "sequential", 1, timed_load(data_dir, "sequential", 1, repeat))]
+    data_loader.orjson = orjson
+    if orjson is not None:
+        seconds = timed_load(data_dir, "sequential", 1, repeat)
+        rows.append(("orjson", "sequential", 1, seconds))
+    # Worker processes import their own decoder: the default one
+    for pool in ("thread", "process"):
+        for workers in worker_counts:
+            seconds = timed_load(data_dir, pool, workers, repeat)
+            rows.append((default, pool, workers, seconds))
+
+    baseline = rows[0][3]
+    return pd.DataFrame(
+        [
+            {
+                "decoder": decoder,
+                "pool": pool,
+                "workers": workers,
+                "load_ms": round(seconds * 1000, 1),
+                "speedup": round(baseline / seconds, 2),
+            }
+            for decoder, pool, workers, seconds in rows
+        ]
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--years", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=600, help="pages per month")
+    parser.add_argument("--workers", type=int, nargs="+")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    cpus = available_cpus()
+    worker_counts = args.workers or sorted(
+        {2**power for power in range(cpus.bit_length())} | {cpus}
+    )
+    with tempfile.TemporaryDirectory() as data_dir:
+        make_archive(data_dir, months=12 * args.years, pages_per_month=args.pages)
+        print(f"{cpus} CPUs available")
+        print(run(data_dir, worker_counts, args.repeat).to_string(index=False))
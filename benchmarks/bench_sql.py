@@ -0,0 +1,101 @@
+"""
+SQL backend benchmark
+
+Times the aggregations of the pages, traffic and comparison pages on a
+synthetic archive with a month filter the rollups cannot answer (first half
+of every year), computed three ways:
+
+- pandas (cold): a new DataStore loads the selected months and groups them;
+- pandas (warm): the same DataStore again, with its frames cached;
+- sqlite: data/analytics.sqlite (see database.py) filters, groups and ranks
+  and only the result reaches pandas.
+
+"threads" runs the whole set of queries from that many threads at once, the
+way concurrent Streamlit sessions would, and reports the wall time per set.
+
+Example: python benchmarks/bench_sql.py --years 20 --pages 600 --threads 4
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "streamlit")]
+
+import pandas as pd  # noqa: E402
+
+import database  # noqa: E402
+import storage  # noqa: E402
+from data_loader import DataStore  # noqa: E402
+from queries import Queries  # noqa: E402
+from sql_backend import SqlBackend  # noqa: E402
+from synthetic import make_archive  # noqa: E402
+
+FILTER = {"months": [1, 2, 3, 4, 5, 6]}
+
+
+def query_set(queries):
+    """The aggregations a visit to the pages and traffic pages runs"""
+    queries.top_pages(20, **FILTER)
+    totals = queries.source_totals(**FILTER)
+    queries.sources(**FILTER, only=totals.head(5)["source"].tolist())
+    queries.visitors(**FILTER)
+
+
+def timed(run, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    return round(statistics.median(timings) * 1000, 2)
+
+
+def concurrent(make_queries, threads, repeat):
+    """Wall time of ``threads`` query sets running at once"""
+    pool_queries = [make_queries() for _ in range(threads)]
+    with ThreadPoolExecutor(threads) as pool:
+        return timed(lambda: list(pool.map(query_set, pool_queries)), repeat)
+
+
+def run(data_dir, threads, repeat):
+    storage.rebuild(data_dir)
+    os.remove(os.path.join(data_dir, storage.ROLLUPS_FILE))
+    database.rebuild(data_dir)
+
+    warm = Queries(DataStore(data_dir))
+    query_set(warm)
+    sql = Queries(DataStore(data_dir), SqlBackend(data_dir))
+    variants = {
+        "pandas (cold)": lambda: Queries(DataStore(data_dir)),
+        "pandas (warm)": lambda: warm,
+        "sqlite": lambda: sql,
+    }
+    rows = []
+    for name, make_queries in variants.items():
+        rows.append(
+            {
+                "backend": name,
+                "query_set_ms": timed(lambda: query_set(make_queries()), repeat),
+                f"{threads}_threads_ms": concurrent(make_queries, threads, repeat),
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--years", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=600, help="pages per month")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        make_archive(data_dir, months=12 * args.years, pages_per_month=args.pages)
+        print(run(data_dir, args.threads, args.repeat).to_string(index=False))
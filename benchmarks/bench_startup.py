@@ -0,0 +1,170 @@
+"""
+Dashboard cold-start benchmark
+
+Measures what a fresh start of the streamlit.service deployment pays before
+a page is shown. Every sample runs in a new process, so nothing is warm:
+
+- server ready: time until ``streamlit run`` with the ExecStart flags of
+  streamlit.service answers its health check;
+- first render: a new interpreter rendering the start page headlessly with
+  AppTest (interpreter start, imports and the script run);
+- first visit: the same process then opening each data page, which loads
+  that page's months and builds its figures for the first time.
+
+Example: python benchmarks/bench_startup.py --repeat 3 --years 5
+"""
+
+import argparse
+import json
+import os
+import shlex
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd  # noqa: E402
+
+from synthetic import make_archive  # noqa: E402
+
+APP = os.path.join(ROOT, "streamlit", "main.py")
+SERVICE = os.path.join(ROOT, "streamlit.service")
+PAGES = (
+    "📊 Visão Geral",
+    "📄 Análise de Páginas",
+    "🌐 Fontes de Tráfego",
+    "🔍 Comparativo",
+    "📈 Relatório Mensal",
+)
+
+# Runs in a fresh interpreter: render the start page, then visit ``page``
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file(sys.argv[1], default_timeout=300)
+app.run()
+intro = time.perf_counter()
+if sys.argv[2]:
+    app.sidebar.selectbox[0].select(sys.argv[2]).run()
+if app.exception:
+    sys.exit(app.exception[0].value)
+print(json.dumps({"intro": intro - started, "page": time.perf_counter() - intro}))
+"""
+
+
+def service_command(port):
+    """ExecStart of streamlit.service, run headless on ``port``"""
+    with open(SERVICE, "r", encoding="utf-8") as f:
+        exec_start = next(
+            line.split("=", 1)[1] for line in f if line.startswith("ExecStart=")
+        )
+    args = shlex.split(exec_start)
+    if args[:2] == ["poetry", "run"]:
+        args = args[2:]
+    if args[0] == "streamlit":
+        args = [sys.executable, "-m", "streamlit"] + args[1:]
+    args[args.index("streamlit/main.py")] = APP
+    return args + ["--server.headless", "true", "--server.port", str(port)]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def server_ready(workdir, timeout=60.0):
+    """Seconds from launching the service command to a healthy server"""
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        service_command(port),
+        cwd=workdir,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                url = f"http://127.0.0.1:{port}/_stcore/health"
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.05)
+        raise TimeoutError("Streamlit did not become healthy")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def first_render(workdir, page=""):
+    """(process wall time, start page render, page visit) in seconds"""
+    started = time.perf_counter()
+    child = subprocess.run(
+        [sys.executable, "-c", CHILD, APP, page],
+        cwd=workdir,
+        env={**os.environ, "PYTHONPATH": os.path.join(ROOT, "streamlit")},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    wall = time.perf_counter() - started
+    result = json.loads(child.stdout.strip().splitlines()[-1])
+    return wall, result["intro"], result["page"]
+
+
+def run(workdir, repeat):
+    samples = {"server ready": []}
+    for _ in range(repeat):
+        samples["server ready"].append(server_ready(workdir))
+    for page in ("",) + PAGES:
+        for _ in range(repeat):
+            wall, intro, visit = first_render(workdir, page)
+            if not page:
+                samples.setdefault("process wall to start page", []).append(wall)
+                samples.setdefault("start page render", []).append(intro)
+            else:
+                samples.setdefault(f"first visit {page}", []).append(visit)
+    return pd.DataFrame(
+        [
+            {
+                "timing": name,
+                "median_ms": round(statistics.median(values) * 1000, 1),
+                "min_ms": round(min(values) * 1000, 1),
+            }
+            for name, values in samples.items()
+        ]
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--years",
+        type=int,
+        default=0,
+        help="use a synthetic archive of this many years instead of data/",
+    )
+    parser.add_argument("--pages", type=int, default=600, help="pages per month")
+    args = parser.parse_args()
+
+    if args.years:
+        with tempfile.TemporaryDirectory() as workdir:
+            make_archive(
+                os.path.join(workdir, "data"),
+                months=12 * args.years,
+                pages_per_month=args.pages,
+            )
+            report = run(workdir, args.repeat)
+    else:
+        report = run(ROOT, args.repeat)
+    print(report.to_string(index=False))
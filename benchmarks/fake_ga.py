@@ -0,0 +1,179 @@
+"""
+Offline stand-in for the Analytics Data API
+
+FakeAnalyticsClient answers run_report and batch_run_reports like
+BetaAnalyticsDataAsyncClient for the reports in reports.py, from a synthetic
+property of configurable size. Pages follow a Zipf-like popularity and are
+returned in the order the pages spec asks for (activeUsers desc, pagePath),
+honouring limit/offset pagination and row_count.
+
+Responses are kept serialized and parsed on every call, so the extractor
+pays the same decoding cost as with responses coming from the network.
+Building the synthetic rows is timed separately in ``generation_seconds``.
+"""
+
+import asyncio
+import random
+import time
+from datetime import datetime
+
+from google.analytics.data_v1beta.types import (
+    BatchRunReportsResponse,
+    RunReportRequest,
+    RunReportResponse,
+)
+
+from synthetic import SOURCES, page_universe
+
+# Metrics of a page row, in the order FakeProperty.pages returns them
+PAGE_METRICS = (
+    "activeUsers",
+    "screenPageViews",
+    "screenPageViewsPerSession",
+    "screenPageViewsPerUser",
+    "averageSessionDuration",
+    "bounceRate",
+)
+
+
+class FakeProperty:
+    """Size and seed of a synthetic property."""
+
+    def __init__(self, pages_per_month: int = 1000, sources: int = 40, seed: int = 0):
+        self.pages_per_month = pages_per_month
+        self.sources = sources
+        self.seed = seed
+
+    def source_names(self) -> list:
+        count = self.sources
+        names = list(SOURCES) + [f"site-{index}.example" for index in range(count)]
+        return names[:count]
+
+    def pages(self, year_month: str) -> list:
+        """Page rows of a month as (pagePath, metric strings), in report order."""
+        rng = random.Random(f"{self.seed}-{year_month}")
+        universe = page_universe(self.pages_per_month * 2)
+        rows = []
+        for rank, page_path in enumerate(
+            rng.sample(universe, self.pages_per_month), start=1
+        ):
+            users = max(1, int(50000 / rank**0.9 * rng.uniform(0.9, 1.1)))
+            views = int(users * rng.uniform(1.0, 3.0))
+            rows.append(
+                (
+                    page_path,
+                    (
+                        str(users),
+                        str(views),
+                        str(rng.uniform(1.0, 3.0)),
+                        str(views / users),
+                        str(rng.uniform(10, 400)),
+                        str(rng.uniform(0.2, 0.8)),
+                    ),
+                )
+            )
+        rows.sort(key=lambda row: (-int(row[1][0]), row[0]))
+        return rows
+
+
+def request_month(request) -> str:
+    return datetime.strptime(request.date_ranges[0].start_date, "%Y-%m-%d").strftime(
+        "%Y-%m"
+    )
+
+
+class FakeAnalyticsClient:
+    """In-process replacement for BetaAnalyticsDataAsyncClient.
+
+    ``latency`` adds a fixed delay per call, like an HTTP round trip.
+    """
+
+    def __init__(self, prop: FakeProperty = None, latency: float = 0.0):
+        self.prop = prop or FakeProperty()
+        self.latency = latency
+        self.calls = 0
+        self.requests = 0
+        self.generation_seconds = 0.0
+        self._months = {}
+        self._responses = {}
+
+    def _month_pages(self, year_month: str) -> list:
+        if year_month not in self._months:
+            self._months[year_month] = self.prop.pages(year_month)
+        return self._months[year_month]
+
+    def _build(self, request) -> bytes:
+        """Serialized response of one request."""
+        response = RunReportResponse.pb()()
+        dimensions = [dimension.name for dimension in request.dimensions]
+        year_month = request_month(request)
+        year, month = year_month.split("-")
+
+        metrics = [metric.name for metric in request.metrics]
+
+        if dimensions[:1] == ["pagePath"]:
+            pages = self._month_pages(year_month)
+            offset = request.offset
+            end = offset + request.limit if request.limit else len(pages)
+            positions = [PAGE_METRICS.index(name) for name in metrics]
+            for page_path, values in pages[offset:end]:
+                row = response.rows.add()
+                for value in (page_path, year, month)[: len(dimensions)]:
+                    row.dimension_values.add(value=value)
+                for position in positions:
+                    row.metric_values.add(value=values[position])
+            response.row_count = len(pages)
+        elif dimensions == ["newVsReturning", "sessionSource"]:
+            users = sum(int(values[0]) for _, values in self._month_pages(year_month))
+            for rank, source in enumerate(self.prop.source_names(), start=1):
+                sessions = max(2, int(users / rank**1.5))
+                for visitor, share in (("new", 0.8), ("returning", 0.2)):
+                    row = response.rows.add()
+                    row.dimension_values.add(value=visitor)
+                    row.dimension_values.add(value=source)
+                    row.metric_values.add(value=str(int(sessions * share)))
+            response.row_count = len(response.rows)
+        else:
+            pages = self._month_pages(year_month)
+            users = sum(int(values[0]) for _, values in pages)
+            views = sum(int(values[1]) for _, values in pages)
+            values = {
+                "activeUsers": users,
+                "screenPageViews": views,
+                "averageSessionDuration": 120.5,
+                "bounceRate": 0.45,
+                "sessions": int(users * 1.2),
+            }
+            row = response.rows.add()
+            for name in metrics:
+                row.metric_values.add(value=str(values[name]))
+            response.row_count = 1
+
+        quota = response.property_quota
+        quota.tokens_per_day.consumed = 1 + len(response.rows) // 10000
+        quota.tokens_per_day.remaining = 200000
+        quota.tokens_per_hour.remaining = 40000
+        return response.SerializeToString()
+
+    def _serialized(self, request) -> bytes:
+        key = RunReportRequest.serialize(request)
+        if key not in self._responses:
+            started = time.perf_counter()
+            self._responses[key] = self._build(request)
+            self.generation_seconds += time.perf_counter() - started
+        return self._responses[key]
+
+    async def run_report(self, request):
+        await asyncio.sleep(self.latency)
+        self.calls += 1
+        self.requests += 1
+        return RunReportResponse.deserialize(self._serialized(request))
+
+    async def batch_run_reports(self, request):
+        await asyncio.sleep(self.latency)
+        self.calls += 1
+        self.requests += len(request.requests)
+        batch = BatchRunReportsResponse.pb()()
+        for report_request in request.requests:
+            batch.reports.add().ParseFromString(self._serialized(report_request))
+        return BatchRunReportsResponse.wrap(batch)
@@ -0,0 +1,149 @@
+"""
+Synthetic data/ archives for the benchmarks
+
+Writes data/YYYY-MM/ folders in the same layout and string-typed JSON as
+main.py, with a Zipf-like page popularity so a few pages dominate each month
+like on the real site.
+
+Example: python benchmarks/synthetic.py /tmp/archive --months 240 --pages 600
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+
+SECTIONS = ("trilhas", "blog", "comunidade", "eventos", "projetos", "docs")
+TOPICS = ("python", "github-starter", "git", "javascript", "dados", "linux", "web")
+SOURCES = (
+    "google",
+    "(direct)",
+    "(not set)",
+    "bing",
+    "github.com",
+    "youtube.com",
+    "linkedin.com",
+    "instagram.com",
+    "facebook.com",
+    "medium.com",
+    "duckduckgo",
+    "chatgpt.com",
+    "t.co",
+    "perplexity.ai",
+)
+
+
+def month_range(start: str, months: int) -> list:
+    """Return ``months`` consecutive YYYY-MM strings starting at ``start``."""
+    year, month = (int(part) for part in start.split("-"))
+    result = []
+    for _ in range(months):
+        result.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return result
+
+
+def page_universe(size: int) -> list:
+    """Build ``size`` distinct page paths spread over sections and topics."""
+    paths = []
+    for index in range(size):
+        section = SECTIONS[index % len(SECTIONS)]
+        topic = TOPICS[(index // len(SECTIONS)) % len(TOPICS)]
+        paths.append(f"/{section}/{topic}/page-{index}/")
+    return paths
+
+
+def month_files(year_month: str, pages: list, rng: random.Random) -> dict:
+    """Generate the three report payloads of one month."""
+    year, month = year_month.split("-")
+    pages_info = []
+    for rank, page_path in enumerate(pages, start=1):
+        users = max(1, int(5000 / rank**0.9 * rng.uniform(0.5, 1.5)))
+        views = int(users * rng.uniform(1.0, 3.0))
+        sessions = max(1, int(users * rng.uniform(0.8, 1.2)))
+        pages_info.append(
+            {
+                "pagePath": page_path,
+                "year": year,
+                "month": month,
+                "activeUsers": str(users),
+                "screenPageViews": str(views),
+                "screenPageViewsPerSession": str(views / sessions),
+                "screenPageViewPerUser": str(views / users),
+                "averageSessionDuration": str(rng.uniform(10, 400)),
+                "bounceRate": str(rng.uniform(0.2, 0.8)),
+            }
+        )
+
+    total_users = sum(int(page["activeUsers"]) for page in pages_info)
+    total_views = sum(int(page["screenPageViews"]) for page in pages_info)
+    website_info = [
+        {
+            "activeUsers": str(total_users),
+            "screenPageViews": str(total_views),
+            "averageSessionDuration": str(rng.uniform(60, 240)),
+            "bounceRate": str(rng.uniform(0.3, 0.6)),
+            "sessions": str(int(total_users * 1.2)),
+        }
+    ]
+
+    sessions = int(total_users * 1.2)
+    website_sessions_info = []
+    website_dimensions_info = {}
+    for rank, source in enumerate(SOURCES, start=1):
+        source_sessions = max(1, int(sessions / rank**1.5 / 2))
+        new_sessions = int(source_sessions * rng.uniform(0.7, 0.95))
+        for visitor, count in (
+            ("new", new_sessions),
+            ("returning", source_sessions - new_sessions),
+        ):
+            website_sessions_info.append(
+                {"newVsReturning": visitor, "sessionSource": source, "sessions": count}
+            )
+            for key in (visitor, source):
+                website_dimensions_info[key] = (
+                    website_dimensions_info.get(key, 0) + count
+                )
+
+    return {
+        "pages_info.json": pages_info,
+        "website_info.json": website_info,
+        "website_dimensions_info.json": website_dimensions_info,
+        "website_sessions_info.json": website_sessions_info,
+    }
+
+
+def make_archive(
+    data_dir: str,
+    months: int = 28,
+    pages_per_month: int = 60,
+    start: str = "2024-01",
+    seed: int = 0,
+) -> list:
+    """Write a synthetic archive and return the generated months."""
+    rng = random.Random(seed)
+    universe = page_universe(pages_per_month * 4)
+    generated = month_range(start, months)
+    for year_month in generated:
+        pages = rng.sample(universe, pages_per_month)
+        folder = os.path.join(data_dir, year_month)
+        os.makedirs(folder, exist_ok=True)
+        for name, payload in month_files(year_month, pages, rng).items():
+            with open(os.path.join(folder, name), "w", encoding="utf-8") as f:
+                f.write(json.dumps(payload, indent=4))
+    return generated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("data_dir")
+    parser.add_argument("--months", type=int, default=28)
+    parser.add_argument("--pages", type=int, default=60, help="pages per month")
+    parser.add_argument("--start", default="2024-01")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    written = make_archive(
+        args.data_dir, args.months, args.pages, args.start, args.seed
+    )
+    sys.stdout.write(f"Wrote {len(written)} months to {args.data_dir}\n")
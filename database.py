@@ -0,0 +1,185 @@
+"""
+Codaqui Analytics SQLite database
+
+data/analytics.sqlite holds every month of each report in one table per
+report, with the columns of storage.SCHEMAS plus year_month and the row's
+position in the month's JSON file. The dashboard (streamlit/sql_backend.py)
+filters, groups and ranks there and only reads the results, instead of
+loading every page row of the selected months into pandas.
+
+The database is a derived artefact kept out of git and built on the
+dashboard host, never by the extractor (which runs in CI, where there is no
+database). The months table lists each month the database holds with the
+signature of the JSON files it was read from; refresh() rewrites only the
+months whose files changed since, so a data pull costs one transaction per
+new or updated month. streamlit.service refreshes before starting and the
+dashboard (streamlit/sql_backend.py) refreshes the months a query needs
+when their files no longer match.
+
+Refresh it from the JSON files: python database.py [data_dir]
+Rebuild it from scratch: python database.py [data_dir] --rebuild
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import sys
+
+import pyarrow as pa
+
+import storage
+
+DATABASE_FILE = "analytics.sqlite"
+# Bumped when the tables change; an older database is recreated on refresh
+SCHEMA_VERSION = 2
+# Covering indexes: the dashboard's aggregations read them without the tables
+INDEXES = {
+    "pages_info": ("year_month", "pagePath", "activeUsers", "screenPageViews"),
+    "website_info": ("year_month",),
+    "website_sessions_info": (
+        "year_month",
+        "sessionSource",
+        "newVsReturning",
+        "sessions",
+    ),
+}
+
+
+def sql_type(data_type: pa.DataType) -> str:
+    if pa.types.is_integer(data_type):
+        return "INTEGER"
+    if pa.types.is_floating(data_type):
+        return "REAL"
+    return "TEXT"
+
+
+def columns(report: str) -> list:
+    """Columns of a report's table, in order."""
+    return storage.SCHEMAS[report].names + ["year_month", "position"]
+
+
+def month_signature(data_dir: str, year_month: str) -> str:
+    """(file, mtime, size) of the JSON reports of a month, as a string."""
+    files = []
+    for report in storage.JSON_REPORTS:
+        path = os.path.join(data_dir, year_month, f"{report}.json")
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        files.append([report, stat.st_mtime_ns, stat.st_size])
+    return json.dumps(files)
+
+
+def create_schema(connection: sqlite3.Connection):
+    (version,) = connection.execute("PRAGMA user_version").fetchone()
+    if version != SCHEMA_VERSION:
+        for table in ["months", *storage.SCHEMAS]:
+            connection.execute(f"DROP TABLE IF EXISTS {table}")
+        connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS months"
+        " (year_month TEXT PRIMARY KEY, signature TEXT)"
+    )
+    for report, schema in storage.SCHEMAS.items():
+        definitions = [f'"{field.name}" {sql_type(field.type)}' for field in schema]
+        definitions += ["year_month TEXT NOT NULL", "position INTEGER NOT NULL"]
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {report} ({', '.join(definitions)})"
+        )
+        indexed = ", ".join(f'"{column}"' for column in INDEXES[report])
+        connection.execute(
+            f"CREATE INDEX IF NOT EXISTS {report}_month ON {report} ({indexed})"
+        )
+
+
+def write_month(connection: sqlite3.Connection, data_dir: str, year_month: str):
+    """Replace a month's rows with the contents of its JSON files."""
+    # Taken before reading, so a file written meanwhile shows up as changed
+    signature = month_signature(data_dir, year_month)
+    for report in storage.SCHEMAS:
+        connection.execute(f"DELETE FROM {report} WHERE year_month = ?", (year_month,))
+    for report, rows in storage.read_month_rows(data_dir, year_month).items():
+        table = storage.to_table(report, rows, year_month)
+        values = zip(
+            *(table[name].to_pylist() for name in table.column_names),
+            [year_month] * table.num_rows,
+            range(table.num_rows),
+        )
+        placeholders = ", ".join("?" * len(columns(report)))
+        quoted = ", ".join(f'"{column}"' for column in columns(report))
+        connection.executemany(
+            f"INSERT INTO {report} ({quoted}) VALUES ({placeholders})", values
+        )
+    connection.execute(
+        "INSERT OR REPLACE INTO months VALUES (?, ?)", (year_month, signature)
+    )
+
+
+def refresh(data_dir: str = "data", year_months=None) -> list:
+    """Rewrite the months whose JSON files changed since they were stored.
+
+    Checks year_months, or every month folder (dropping months whose folder
+    is gone). Creates the database if needed; each month is written in its
+    own transaction, so readers see either its old or its new rows.
+    """
+    path = os.path.join(data_dir, DATABASE_FILE)
+    connection = sqlite3.connect(path, timeout=30)
+    try:
+        with connection:
+            create_schema(connection)
+        stored = dict(connection.execute("SELECT year_month, signature FROM months"))
+        folders = storage.month_folders(data_dir)
+        updated = [
+            year_month
+            for year_month in (folders if year_months is None else year_months)
+            if year_month in folders
+            and stored.get(year_month) != month_signature(data_dir, year_month)
+        ]
+        for year_month in updated:
+            with connection:
+                write_month(connection, data_dir, year_month)
+        if year_months is None:
+            for year_month in set(stored) - set(folders):
+                with connection:
+                    for report in storage.SCHEMAS:
+                        connection.execute(
+                            f"DELETE FROM {report} WHERE year_month = ?",
+                            (year_month,),
+                        )
+                    connection.execute(
+                        "DELETE FROM months WHERE year_month = ?", (year_month,)
+                    )
+    finally:
+        connection.close()
+    return updated
+
+
+def rebuild(data_dir: str = "data") -> list:
+    """Write the database from every month folder, replacing it at the end."""
+    path = os.path.join(data_dir, DATABASE_FILE)
+    if os.path.exists(f"{path}.tmp"):
+        os.remove(f"{path}.tmp")
+    months = storage.month_folders(data_dir)
+    connection = sqlite3.connect(f"{path}.tmp")
+    try:
+        with connection:
+            create_schema(connection)
+            for year_month in months:
+                write_month(connection, data_dir, year_month)
+    finally:
+        connection.close()
+    os.replace(f"{path}.tmp", path)
+    return months
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    arguments = [argument for argument in sys.argv[1:] if argument != "--rebuild"]
+    data_dir = arguments[0] if arguments else "data"
+    if "--rebuild" in sys.argv:
+        written = rebuild(data_dir)
+    else:
+        written = refresh(data_dir)
+    logging.info("Wrote %d months to %s", len(written), DATABASE_FILE)
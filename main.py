@@ -2,191 +2,774 @@
 Codaqui Analytics Extract Data
 """
 
+import argparse
 import asyncio
 import json
 import os
+import random
 import sys
 import logging
-from datetime import datetime
+import textwrap
+import time
+from datetime import date, datetime, timedelta
 from google.analytics.data_v1beta import BetaAnalyticsDataAsyncClient
+from google.api_core import exceptions as api_exceptions
 from google.analytics.data_v1beta.types import (
-    DateRange,
-    Dimension,
-    Metric,
+    BatchRunReportsRequest,
     RunReportRequest,
 )
 
+import reports
+import storage
+from response_cache import (
+    DEFAULT_CACHE_DIR,
+    DEFAULT_MAX_BYTES,
+    DEFAULT_TTL,
+    CachingClient,
+    ResponseCache,
+)
+
+# Rows per RunReport page (the API caps a single response at 250,000 rows)
+PAGE_SIZE = 10000
+REPORT_FILES = (
+    "pages_info.json",
+    "website_info.json",
+    "website_dimensions_info.json",
+    "website_sessions_info.json",
+)
+# Reports added after the first extractions: months fetched before them are
+# still complete, their rows come from website_dimensions_info.json
+# (storage.legacy_sessions_rows)
+LEGACY_OPTIONAL_FILES = ("website_sessions_info.json",)
+
+# Concurrency and retry settings for Analytics Data API calls
+MAX_CONCURRENT_REQUESTS = 4
+MAX_RETRIES = 5
+RETRY_BASE_DELAY = 2.0
+MAX_CONCURRENT_MONTHS = 3
+MAX_CONCURRENT_DAYS = 7
+# Recent days GA may still be processing; refetched on every daily run
+REFRESH_DAYS = 3
+# BatchRunReports accepts at most 5 requests per call
+MAX_BATCH_SIZE = 5
+# Seconds a request waits for others to share its batch
+BATCH_WINDOW = 0.05
+# Requests in flight when batching: enough to fill every concurrent batch
+MAX_PENDING_REQUESTS = MAX_CONCURRENT_REQUESTS * MAX_BATCH_SIZE
+RETRYABLE_ERRORS = (
+    api_exceptions.ResourceExhausted,
+    api_exceptions.ServiceUnavailable,
+    api_exceptions.DeadlineExceeded,
+    api_exceptions.InternalServerError,
+    api_exceptions.Aborted,
+)
+
+
+async def run_report_with_retry(client, name, request, semaphore):
+    """Run one report, retrying quota/transient errors with exponential backoff."""
+    for attempt in range(1, MAX_RETRIES + 1):
+        started = time.perf_counter()
+        try:
+            async with semaphore:
+                response = await client.run_report(request)
+        except RETRYABLE_ERRORS as error:
+            if attempt == MAX_RETRIES:
+                logging.error("Report %s failed after %d attempts", name, attempt)
+                raise
+            delay = RETRY_BASE_DELAY * 2 ** (attempt - 1)
+            delay += random.uniform(0, RETRY_BASE_DELAY)
+            logging.warning(
+                "Report %s failed (%s), retrying in %.1fs (attempt %d/%d)",
+                name,
+                error.__class__.__name__,
+                delay,
+                attempt,
+                MAX_RETRIES,
+            )
+            await asyncio.sleep(delay)
+            continue
+
+        logging.info(
+            "Report %s finished in %.2fs (%d rows)",
+            name,
+            time.perf_counter() - started,
+            len(response.rows),
+        )
+        return response
+
+
+def quota_summary(responses) -> str:
+    """Tokens consumed by some responses and the property quota left after them."""
+    quotas = [response.property_quota for response in responses]
+    consumed = sum(quota.tokens_per_day.consumed for quota in quotas)
+    remaining_day = min(quota.tokens_per_day.remaining for quota in quotas)
+    remaining_hour = min(quota.tokens_per_hour.remaining for quota in quotas)
+    return (
+        f"{consumed} quota tokens consumed,"
+        f" {remaining_day} left today, {remaining_hour} left this hour"
+    )
+
+
+class ReportBatcher:
+    """Group run_report calls into batch_run_reports calls.
+
+    Requests made within BATCH_WINDOW seconds of each other, e.g. the reports
+    of one month or of several months during a backfill, share one HTTP round
+    trip, up to MAX_BATCH_SIZE requests per batch and MAX_CONCURRENT_REQUESTS
+    batches at a time. Callers use it like the client's run_report.
+    """
+
+    def __init__(self, client, property_id: int):
+        self.client = client
+        self.property = f"properties/{str(property_id)}"
+        self.batches = 0
+        self._pending = []
+        self._flush_handle = None
+        self._tasks = set()
+        self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+    async def run_report(self, request):
+        request = RunReportRequest(request)
+        request.return_property_quota = True
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((request, future))
+        if len(self._pending) >= MAX_BATCH_SIZE:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                BATCH_WINDOW, self._flush
+            )
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        while self._pending:
+            batch = self._pending[:MAX_BATCH_SIZE]
+            self._pending = self._pending[MAX_BATCH_SIZE:]
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch):
+        async with self._semaphore:
+            started = time.perf_counter()
+            try:
+                response = await self.client.batch_run_reports(
+                    BatchRunReportsRequest(
+                        property=self.property,
+                        requests=[request for request, _ in batch],
+                    )
+                )
+            except Exception as error:
+                # Every caller sees the error and retries on its own
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                return
+
+        if len(response.reports) != len(batch):
+            error = RuntimeError(
+                f"Batch returned {len(response.reports)} reports for {len(batch)}"
+            )
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        self.batches += 1
+        logging.info(
+            "Batch of %d reports finished in %.2fs: %s",
+            len(batch),
+            time.perf_counter() - started,
+            quota_summary(response.reports),
+        )
+        for (_, future), report in zip(batch, response.reports):
+            if not future.done():
+                future.set_result(report)
+
+
+async def run_paginated_report(client, name, request, semaphore=None):
+    """Yield the responses of a report page by page using limit/offset."""
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    offset = 0
+    while True:
+        page_request = RunReportRequest(request)
+        page_request.limit = PAGE_SIZE
+        page_request.offset = offset
+        response = await run_report_with_retry(
+            client, f"{name}[offset={offset}]", page_request, semaphore
+        )
+        yield response
+        offset += len(response.rows)
+        if not response.rows or offset >= response.row_count:
+            break
+
+
+class JsonArrayWriter:
+    """Write a JSON array item by item, matching ``json.dumps(items, indent=4)``.
+
+    Items go to a temporary file that only replaces ``path`` once the whole
+    array was written, so readers never see a truncated report.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._tmp_path = f"{path}.tmp"
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self._tmp_path, "w", encoding="utf-8")
+        self._file.write("[")
+        return self
+
+    def write(self, item):
+        self._file.write(",\n" if self.count else "\n")
+        self._file.write(textwrap.indent(json.dumps(item, indent=4), "    "))
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is not None:
+            self._file.close()
+            os.remove(self._tmp_path)
+            return False
+        self._file.write("\n]" if self.count else "]")
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+        return False
+
+
+def make_client(property_id: int, cache=None, replay: bool = False, api_client=None):
+    """Batching API client, served from ``cache`` first when one is given.
+
+    ``api_client`` replaces BetaAnalyticsDataAsyncClient (e.g. an offline
+    fake). In replay mode no API client is created: every response must
+    come from the cache.
+    """
+    batcher = None
+    if not replay:
+        if api_client is None:
+            api_client = BetaAnalyticsDataAsyncClient()
+        batcher = ReportBatcher(api_client, property_id)
+    if cache is None:
+        return batcher
+    return CachingClient(batcher, cache, replay=replay)
+
+
+async def report_responses(client, spec, request, semaphore=None):
+    """Yield the responses of a report, page by page when the spec paginates."""
+    if spec.paginate:
+        async for response in run_paginated_report(
+            client, spec.name, request, semaphore
+        ):
+            yield response
+        return
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    yield await run_report_with_retry(client, spec.name, request, semaphore)
+
+
+async def extract_report(client, spec, request, folder, semaphore=None) -> int:
+    """Run one report spec and write its JSON file and Parquet partition.
+
+    Each response is decoded into string columns (spec.decode), cast once to
+    the report's Parquet schema and streamed to both outputs; files in
+    ``spec.derived`` are written from the JSON rows at the end.
+    """
+    data_dir, year_month = os.path.split(os.path.normpath(folder))
+    writer = JsonArrayWriter(f"{folder}/{spec.name}.json")
+    parquet_writer = storage.PartitionWriter(data_dir, spec.name, year_month)
+    collected = []
+    # The partition is closed last, so it is never older than its JSON file
+    # (the dashboard reads a month from JSON when its Parquet copy is older)
+    with parquet_writer, writer:
+        async for response in report_responses(client, spec, request, semaphore):
+            strings = spec.decode(response)
+            typed = storage.columns_table(spec.name, strings, year_month)
+            parquet_writer.write_table(typed)
+            rows = spec.json_rows(strings, typed)
+            for row in rows:
+                writer.write(row)
+            if spec.derived:
+                collected.extend(rows)
+
+    for name, derive in spec.derived.items():
+        with open(f"{folder}/{name}", "w", encoding="utf-8") as f:
+            f.write(json.dumps(derive(collected), indent=4))
+    logging.info("Saved %d rows to %s/%s.json", writer.count, folder, spec.name)
+    return writer.count
+
 
 async def sample_run_report(
-    property_id: int, start_date: str, end_date: str, folder: str
+    property_id: int,
+    start_date: str,
+    end_date: str,
+    folder: str,
+    client=None,
+    semaphore=None,
+    cache=None,
+    replay: bool = False,
 ):
     logging.info("Start report. Dates: %s - %s", start_date, end_date)
-    client = BetaAnalyticsDataAsyncClient()
-
-    # Request for page-specific data
-    logging.info("Requesting page-specific data")
-    page_request = RunReportRequest(
-        property=f"properties/{str(property_id)}",
-        dimensions=[
-            Dimension(name="pagePath"),
-            Dimension(name="year"),
-            Dimension(name="month"),
-        ],
-        metrics=[
-            Metric(name="activeUsers"),
-            Metric(name="screenPageViews"),
-            Metric(name="screenPageViewsPerSession"),
-            Metric(name="screenPageViewsPerUser"),
-            Metric(name="averageSessionDuration"),
-            Metric(name="bounceRate"),
-        ],
-        date_ranges=[DateRange(start_date=start_date, end_date=end_date)],
-    )
-
-    # Request for website-wide data
-    logging.info("Requesting website-wide data")
-    website_request = RunReportRequest(
-        property=f"properties/{str(property_id)}",
-        metrics=[
-            Metric(name="activeUsers"),
-            Metric(name="screenPageViews"),
-            Metric(name="averageSessionDuration"),
-            Metric(name="bounceRate"),
-            Metric(name="sessions"),
-        ],
-        date_ranges=[DateRange(start_date=start_date, end_date=end_date)],
-    )
-
-    # Request for website-wide data with dimensions
-    logging.info("Requesting website-wide data with dimensions")
-    website_dimensions_request = RunReportRequest(
-        property=f"properties/{str(property_id)}",
-        dimensions=[
-            Dimension(name="newVsReturning"),
-            Dimension(name="sessionSource"),
-        ],
-        metrics=[Metric(name="sessions")],
-        date_ranges=[DateRange(start_date=start_date, end_date=end_date)],
-    )
-
-    page_response = await client.run_report(page_request)
-    website_response = await client.run_report(website_request)
-    website_dimensions_response = await client.run_report(website_dimensions_request)
-
-    pages_info = []
-    for row in page_response.rows:
-        page_path = row.dimension_values[0].value
-        year = row.dimension_values[1].value
-        month = row.dimension_values[2].value
-        active_users = row.metric_values[0].value
-        screen_page_views = row.metric_values[1].value
-        screen_page_views_session = row.metric_values[2].value
-        screen_page_views_user = row.metric_values[3].value
-        avg_session_duration = row.metric_values[4].value
-        bounce_rate = row.metric_values[5].value
-
-        if page_path != "/":
-            pages_info.append(
-                {
-                    "pagePath": page_path,
-                    "year": year,
-                    "month": month,
-                    "activeUsers": active_users,
-                    "screenPageViews": screen_page_views,
-                    "screenPageViewsPerSession": screen_page_views_session,
-                    "screenPageViewPerUser": screen_page_views_user,
-                    "averageSessionDuration": avg_session_duration,
-                    "bounceRate": bounce_rate,
-                }
+    if client is None:
+        client = make_client(property_id, cache, replay)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(MAX_PENDING_REQUESTS)
+
+    # Every report in reports.SPECS runs concurrently through the same engine
+    await asyncio.gather(
+        *(
+            extract_report(
+                client,
+                spec,
+                spec.request(property_id, start_date, end_date),
+                folder,
+                semaphore,
+            )
+            for spec in reports.SPECS
+        )
+    )
+
+
+async def extract_day(client, property_id: int, day: str, semaphore=None) -> int:
+    """Run every report for one YYYY-MM-DD day and store it in data/YYYY-MM/daily/.
+
+    Returns the number of page rows of the day.
+    """
+    year_month = day[:7]
+
+    async def day_rows(spec):
+        rows = []
+        request = spec.request(property_id, day, day)
+        async for response in report_responses(client, spec, request, semaphore):
+            strings = spec.decode(response)
+            typed = storage.columns_table(spec.name, strings, year_month)
+            rows.extend(spec.json_rows(strings, typed))
+        return spec.name, rows
+
+    day_reports = dict(
+        await asyncio.gather(*(day_rows(spec) for spec in reports.SPECS))
+    )
+    storage.write_day("data", day, day_reports)
+    return len(day_reports["pages_info"])
+
+
+async def month_users(client, property_id: int, year_month: str, semaphore=None):
+    """Active users of a month, per page and in total, for storage.derive_month.
+
+    One month-range request each: users active on several days count once.
+    """
+    days = storage.month_days(year_month)
+    start_date, end_date = days[0], days[-1]
+
+    async def rows(spec):
+        strings = []
+        request = spec.request(property_id, start_date, end_date)
+        async for response in report_responses(client, spec, request, semaphore):
+            strings.extend(spec.decode(response).to_pylist())
+        return strings
+
+    pages, website = await asyncio.gather(
+        rows(reports.PAGE_USERS), rows(reports.WEBSITE_USERS)
+    )
+    return {
+        "pages_info": {row["pagePath"]: int(row["activeUsers"]) for row in pages},
+        "website_info": sum(int(row["activeUsers"]) for row in website),
+    }
+
+
+async def daily_backfill(
+    property_id: int,
+    days: list,
+    force: bool = False,
+    refresh_days: int = REFRESH_DAYS,
+    cache=None,
+    replay: bool = False,
+    api_client=None,
+) -> dict:
+    """Fetch the days not stored yet and derive their months from the days.
+
+    Days in the last ``refresh_days`` are fetched again even if stored, as
+    GA may still be processing them; ``force`` fetches every day. The
+    months with a fetched day are derived again, as are months whose
+    monthly files are missing or older than their days (e.g. an earlier run
+    failed to derive them), and only once their stored days cover them: a
+    month missing days keeps its monthly files.
+
+    Returns a status per day ("fetched", "skipped" or "failed") and per
+    month considered ("derived", "incomplete" or "failed").
+    """
+    client = make_client(property_id, cache, replay, api_client)
+    day_semaphore = asyncio.Semaphore(MAX_CONCURRENT_DAYS)
+    request_semaphore = asyncio.Semaphore(MAX_PENDING_REQUESTS)
+    fresh_since = (date.today() - timedelta(days=refresh_days)).isoformat()
+    results = {}
+
+    async def run_day(day):
+        stored = os.path.exists(storage.day_path("data", day))
+        if stored and not force and day < fresh_since:
+            results[day] = "skipped"
+            return
+        async with day_semaphore:
+            try:
+                rows = await extract_day(client, property_id, day, request_semaphore)
+            except Exception:
+                logging.exception("Failed to extract %s", day)
+                results[day] = "failed"
+                return
+        logging.info("Saved %s (%d pages)", day, rows)
+        results[day] = "fetched"
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_day(day) for day in days))
+
+    # Months with a fetched day, and months whose days were all stored by an
+    # earlier run that could not derive them
+    in_range = {day[:7] for day in days}
+    months = sorted(
+        {day[:7] for day in days if results[day] == "fetched"}
+        | {month for month in in_range if storage.derived_is_stale("data", month)}
+    )
+    derived = []
+    for month in months:
+        missing = storage.missing_days("data", month)
+        if missing:
+            logging.error(
+                "Not deriving %s, its monthly files are kept: %d days are not"
+                " stored. Fetch them first with --daily %s..%s",
+                month,
+                len(missing),
+                missing[0],
+                missing[-1],
             )
+            results[month] = "incomplete"
+            continue
+        try:
+            users = await month_users(client, property_id, month, request_semaphore)
+            storage.derive_month("data", month, users)
+            storage.update_index("data", month)
+        except Exception:
+            logging.exception("Failed to derive %s", month)
+            results[month] = "failed"
+            continue
+        results[month] = "derived"
+        derived.append(month)
+    if derived:
+        storage.write_rollups("data")
+
+    statuses = [results[day] for day in days]
+    logging.info(
+        "Daily extraction finished in %.1fs: %d fetched, %d skipped, %d failed;"
+        " %d months derived, %d failed",
+        time.perf_counter() - started,
+        statuses.count("fetched"),
+        statuses.count("skipped"),
+        statuses.count("failed"),
+        len(derived),
+        sum(results[month] == "failed" for month in months),
+    )
+    if cache is not None:
+        logging.info("Response cache: %d hits, %d misses", cache.hits, cache.misses)
+    return results
+
+
+def parse_day_range(value: str) -> list:
+    """Expand "YYYY-MM-DD..YYYY-MM-DD" (or a single day) into a list of days.
+
+    Days after today are dropped: GA has no data for them yet.
+    """
+    first, _, last = value.partition("..")
+    try:
+        current = datetime.strptime(first, "%Y-%m-%d").date()
+        end = datetime.strptime(last or first, "%Y-%m-%d").date()
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(
+            f"Invalid day range {value!r}, use YYYY-MM-DD..YYYY-MM-DD"
+        ) from error
+    if current > end:
+        raise argparse.ArgumentTypeError(f"Day range {value!r} is reversed")
+
+    end = min(end, date.today())
+    days = []
+    while current <= end:
+        days.append(current.isoformat())
+        current += timedelta(days=1)
+    return days
+
+
+def parse_month_range(value: str) -> list:
+    """Expand "YYYY-MM..YYYY-MM" (or a single "YYYY-MM") into a list of months."""
+    first, _, last = value.partition("..")
+    try:
+        current = datetime.strptime(first, "%Y-%m")
+        end = datetime.strptime(last or first, "%Y-%m")
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(
+            f"Invalid month range {value!r}, use YYYY-MM..YYYY-MM"
+        ) from error
+    if current > end:
+        raise argparse.ArgumentTypeError(f"Month range {value!r} is reversed")
+
+    months = []
+    while current <= end:
+        months.append(current.strftime("%Y-%m"))
+        current = current.replace(
+            year=current.year + current.month // 12, month=current.month % 12 + 1
+        )
+    return months
+
+
+def month_bounds(month: str) -> tuple:
+    """Return the first and last day (YYYY-MM-DD) of a YYYY-MM month."""
+    first_day = datetime.strptime(month, "%Y-%m")
+    next_month = first_day.replace(
+        year=first_day.year + first_day.month // 12, month=first_day.month % 12 + 1
+    )
+    last_day = datetime.fromordinal(next_month.toordinal() - 1)
+    return first_day.strftime("%Y-%m-%d"), last_day.strftime("%Y-%m-%d")
+
 
-    logging.info("Saving data to file")
-    with open(f"{folder}/pages_info.json", "w", encoding="utf-8") as f:
-        f.write(json.dumps(pages_info, indent=4))
-
-    website_info = []
-    for row in website_response.rows:
-        active_users = row.metric_values[0].value
-        screen_page_views = row.metric_values[1].value
-        avg_session_duration = row.metric_values[2].value
-        bounce_rate = row.metric_values[3].value
-        sessions = row.metric_values[4].value
-
-        website_info.append(
-            {
-                "activeUsers": active_users,
-                "screenPageViews": screen_page_views,
-                "averageSessionDuration": avg_session_duration,
-                "bounceRate": bounce_rate,
-                "sessions": sessions,
-            }
+def is_month_complete(folder: str, today: date = None) -> bool:
+    """A past month is complete when every report file exists and is not empty.
+
+    The current and future months never are, since GA is still adding to them.
+    """
+    today = today or date.today()
+    _, last_day = month_bounds(os.path.basename(os.path.normpath(folder)))
+    if last_day >= today.isoformat():
+        return False
+    legacy = []
+    for name in REPORT_FILES:
+        path = os.path.join(folder, name)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            if name not in LEGACY_OPTIONAL_FILES:
+                return False
+            legacy.append(name)
+    if legacy:
+        logging.info(
+            "%s has no %s, using the reports fetched before it",
+            folder,
+            ", ".join(legacy),
         )
+    return True
 
-    website_dimensions_info = {}
-    for row in website_dimensions_response.rows:
-        new_vs_returning = row.dimension_values[0].value
-        session_source = row.dimension_values[1].value
-        sessions = int(row.metric_values[0].value)
 
-        # Aggregate sessions by newVsReturning and sessionSource
-        if new_vs_returning not in website_dimensions_info:
-            website_dimensions_info[new_vs_returning] = sessions
-        else:
-            website_dimensions_info[new_vs_returning] += sessions
+async def backfill(
+    property_id: int,
+    months: list,
+    max_concurrent_months: int = MAX_CONCURRENT_MONTHS,
+    force: bool = False,
+    cache=None,
+    replay: bool = False,
+    api_client=None,
+) -> dict:
+    """Extract many months with one shared client and return a status per month."""
+    # One batcher for every month, so requests of different months share batches
+    client = make_client(property_id, cache, replay, api_client)
+    month_semaphore = asyncio.Semaphore(max_concurrent_months)
+    request_semaphore = asyncio.Semaphore(MAX_PENDING_REQUESTS)
+    results = {}
 
-        if session_source not in website_dimensions_info:
-            website_dimensions_info[session_source] = sessions
-        else:
-            website_dimensions_info[session_source] += sessions
+    async def run_month(month):
+        folder = f"data/{month}"
+        if not force and is_month_complete(folder):
+            logging.info("Skipping %s, data already complete", month)
+            results[month] = "skipped"
+            return
 
-    with open(f"{folder}/website_info.json", "w", encoding="utf-8") as f:
-        f.write(json.dumps(website_info, indent=4))
+        start_date, end_date = month_bounds(month)
+        async with month_semaphore:
+            os.makedirs(folder, exist_ok=True)
+            try:
+                await sample_run_report(
+                    property_id=property_id,
+                    start_date=start_date,
+                    end_date=end_date,
+                    folder=folder,
+                    client=client,
+                    semaphore=request_semaphore,
+                )
+                storage.update_index("data", month)
+            except Exception:
+                logging.exception("Failed to extract %s", month)
+                results[month] = "failed"
+                return
+        results[month] = "fetched"
 
-    with open(f"{folder}/website_dimensions_info.json", "w", encoding="utf-8") as f:
-        f.write(json.dumps(website_dimensions_info, indent=4))
+    started = time.perf_counter()
+    await asyncio.gather(*(run_month(month) for month in months))
+
+    summary = {status: [] for status in ("fetched", "skipped", "failed")}
+    for month in months:
+        summary[results[month]].append(month)
+    logging.info(
+        "Backfill finished in %.1fs: %d fetched, %d skipped, %d failed",
+        time.perf_counter() - started,
+        len(summary["fetched"]),
+        len(summary["skipped"]),
+        len(summary["failed"]),
+    )
+    if cache is not None:
+        logging.info("Response cache: %d hits, %d misses", cache.hits, cache.misses)
+    if summary["failed"]:
+        logging.error("Failed months: %s", ", ".join(summary["failed"]))
+    if summary["fetched"]:
+        storage.write_rollups("data")
+    return results
 
 
 # Main
 # Example: python main.py property_id start_date end_date
 # Example: python main.py 337372858 01-01-2024 31-01-2024
 # Date format: DD-MM-YYYY
-
-# Validate args
-if len(sys.argv) != 4:
-    raise ValueError(
-        "Invalid arguments, use example: python main.py property_id(int) start_date(str) end_date(str)"
-        " where start_date and end_date are in the format DD-MM-YYYY."
+# Backfill: python main.py property_id --backfill YYYY-MM..YYYY-MM
+# Example: python main.py 337372858 --backfill 2024-01..2025-12 --max-months 3
+# Daily: python main.py property_id --daily YYYY-MM-DD..YYYY-MM-DD
+# Example: python main.py 337372858 --daily 2025-06-01..2025-06-15
+def main():
+    parser = argparse.ArgumentParser(description="Codaqui Analytics Extract Data")
+    parser.add_argument("property_id", type=int)
+    parser.add_argument("start_date", nargs="?", help="DD-MM-YYYY")
+    parser.add_argument("end_date", nargs="?", help="DD-MM-YYYY")
+    parser.add_argument(
+        "--backfill",
+        type=parse_month_range,
+        metavar="YYYY-MM..YYYY-MM",
+        help="extract every month in the range, skipping complete ones",
+    )
+    parser.add_argument(
+        "--daily",
+        type=parse_day_range,
+        metavar="YYYY-MM-DD..YYYY-MM-DD",
+        help="extract the range day by day, fetching only days not stored yet,"
+        " and derive its months from the days",
+    )
+    parser.add_argument(
+        "--refresh-days",
+        type=int,
+        default=REFRESH_DAYS,
+        help="with --daily, days before today fetched again even if stored",
+    )
+    parser.add_argument(
+        "--max-months",
+        type=int,
+        default=MAX_CONCURRENT_MONTHS,
+        help="months extracted concurrently during a backfill",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="re-extract months (or days) that already have complete data",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="cache API responses in this folder and reuse them on later runs",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=DEFAULT_TTL / 3600,
+        help="hours a cached response stays valid",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=DEFAULT_MAX_BYTES // 2**20,
+        help="size of the cache before the oldest responses are evicted",
+    )
+    parser.add_argument(
+        "--replay",
+        action="store_true",
+        help="serve every request from the cache, offline and without credentials",
     )
+    args = parser.parse_args()
 
-# Retrieve args
-property_id_arg: int = int(sys.argv[1])
-start_date_arg: str = sys.argv[2]
-end_date_arg: str = sys.argv[3]
+    # Validate args
+    if (
+        args.backfill is None
+        and args.daily is None
+        and (args.start_date is None or args.end_date is None)
+    ):
+        parser.error(
+            "use: python main.py property_id(int) start_date(str) end_date(str)"
+            " where start_date and end_date are in the format DD-MM-YYYY,"
+            " or python main.py property_id(int) --backfill YYYY-MM..YYYY-MM,"
+            " or python main.py property_id(int) --daily YYYY-MM-DD..YYYY-MM-DD."
+        )
 
-# Convert date format
-start_date_arg = datetime.strptime(start_date_arg, "%d-%m-%Y").strftime("%Y-%m-%d")
-end_date_arg = datetime.strptime(end_date_arg, "%d-%m-%Y").strftime("%Y-%m-%d")
+    # Set service account
+    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "service_account.json"
 
-# Set service account
-os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "service_account.json"
+    # Config logger to Console
+    logging.basicConfig(level=logging.INFO)
 
-# Config logger to Console
-logging.basicConfig(level=logging.INFO)
+    # Create a folder to save the data
+    os.makedirs("data", exist_ok=True)
 
-# Create a folder to save the data
-os.makedirs("data", exist_ok=True)
+    cache = None
+    if args.cache_dir is not None or args.replay:
+        cache = ResponseCache(
+            args.cache_dir or DEFAULT_CACHE_DIR,
+            ttl=args.cache_ttl * 3600,
+            max_bytes=args.cache_max_mb * 2**20,
+        )
 
-# Create a month folder to save the data
-month_folder = datetime.strptime(start_date_arg, "%Y-%m-%d").strftime("%Y-%m")
-os.makedirs(f"data/{month_folder}", exist_ok=True)
-folder_path = f"data/{month_folder}"
+    if args.daily is not None:
+        results = asyncio.run(
+            daily_backfill(
+                property_id=args.property_id,
+                days=args.daily,
+                force=args.force,
+                refresh_days=args.refresh_days,
+                cache=cache,
+                replay=args.replay,
+            )
+        )
+        if "failed" in results.values():
+            sys.exit(1)
+        return
+
+    if args.backfill is not None:
+        results = asyncio.run(
+            backfill(
+                property_id=args.property_id,
+                months=args.backfill,
+                max_concurrent_months=args.max_months,
+                force=args.force,
+                cache=cache,
+                replay=args.replay,
+            )
+        )
+        if "failed" in results.values():
+            sys.exit(1)
+        return
 
-# Call the function
-asyncio.run(
-    sample_run_report(
-        property_id=property_id_arg,
-        start_date=start_date_arg,
-        end_date=end_date_arg,
-        folder=folder_path,
+    # Convert date format
+    start_date = datetime.strptime(args.start_date, "%d-%m-%Y").strftime("%Y-%m-%d")
+    end_date = datetime.strptime(args.end_date, "%d-%m-%Y").strftime("%Y-%m-%d")
+
+    # Create a month folder to save the data
+    month_folder = datetime.strptime(start_date, "%Y-%m-%d").strftime("%Y-%m")
+    folder_path = f"data/{month_folder}"
+    os.makedirs(folder_path, exist_ok=True)
+
+    # Call the function
+    asyncio.run(
+        sample_run_report(
+            property_id=args.property_id,
+            start_date=start_date,
+            end_date=end_date,
+            folder=folder_path,
+            cache=cache,
+            replay=args.replay,
+        )
     )
-)
+    storage.update_index("data", month_folder)
+    storage.write_rollups("data")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Declarative specs of the Google Analytics reports the extractor saves
+
+Each ReportSpec lists the dimensions and metrics of one report, the column
+names they get in data/YYYY-MM/<name>.json and data/parquet/<name>/, and
+how the JSON file is written. main.py runs every spec through the same
+engine, so adding a report means adding a spec here and its schema in
+storage.SCHEMAS.
+
+Responses are read from the raw protobuf message, which avoids building a
+proto-plus wrapper for every cell. Protobuf has no columnar access, so the
+cell values are still collected one by one in Python; only the steps after
+that (casting, filtering, writing) work on whole Arrow columns.
+"""
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from google.analytics.data_v1beta.types import (
+    DateRange,
+    Dimension,
+    Metric,
+    OrderBy,
+    RunReportRequest,
+)
+
+import storage
+
+
+def column_pairs(names) -> tuple:
+    """Normalise ``"name"`` or ``("apiName", "column")`` entries to pairs."""
+    return tuple((name, name) if isinstance(name, str) else name for name in names)
+
+
+class ReportSpec:
+    """One Analytics report and how its rows are stored.
+
+    ``dimensions`` and ``metrics`` are API names, or ``(api_name, column)``
+    pairs when the stored column has another name. ``exclude`` drops rows
+    whose column has one of the given values. With ``json_strings`` the
+    JSON file keeps the API's string values; otherwise it gets the typed
+    values of the Parquet schema. ``derived`` maps extra JSON file names to
+    functions building their content from the JSON rows.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        dimensions=(),
+        metrics=(),
+        order_bys=(),
+        paginate: bool = False,
+        exclude=None,
+        json_strings: bool = True,
+        derived=None,
+    ):
+        self.name = name
+        self.dimensions = column_pairs(dimensions)
+        self.metrics = column_pairs(metrics)
+        self.order_bys = list(order_bys)
+        self.paginate = paginate
+        self.exclude = exclude or {}
+        self.json_strings = json_strings
+        self.derived = derived or {}
+        self.columns = [column for _, column in self.dimensions + self.metrics]
+
+    def request(self, property_id, start_date: str, end_date: str):
+        """Build the RunReportRequest of this report for a date range."""
+        return RunReportRequest(
+            property=f"properties/{str(property_id)}",
+            dimensions=[Dimension(name=name) for name, _ in self.dimensions],
+            metrics=[Metric(name=name) for name, _ in self.metrics],
+            date_ranges=[DateRange(start_date=start_date, end_date=end_date)],
+            order_bys=self.order_bys,
+        )
+
+    def decode(self, response) -> pa.Table:
+        """Decode a response into a table of string columns.
+
+        Each column is collected cell by cell from the protobuf rows, then
+        built into an Arrow array and filtered as a whole.
+        """
+        rows = type(response).pb(response).rows
+        columns = {}
+        for position, (_, column) in enumerate(self.dimensions):
+            columns[column] = [row.dimension_values[position].value for row in rows]
+        for position, (_, column) in enumerate(self.metrics):
+            columns[column] = [row.metric_values[position].value for row in rows]
+        table = pa.table(
+            {column: pa.array(columns[column], pa.string()) for column in self.columns}
+        )
+        for column, values in self.exclude.items():
+            keep = pc.invert(pc.is_in(table[column], pa.array(values, pa.string())))
+            table = table.filter(keep)
+        return table
+
+    def json_rows(self, strings: pa.Table, typed: pa.Table) -> list:
+        """Rows of the JSON file from the decoded and the typed tables."""
+        source = strings if self.json_strings else typed.select(self.columns)
+        return source.to_pylist()
+
+
+PAGES_ORDER = [
+    OrderBy(metric=OrderBy.MetricOrderBy(metric_name="activeUsers"), desc=True),
+    OrderBy(dimension=OrderBy.DimensionOrderBy(dimension_name="pagePath")),
+]
+
+PAGES = ReportSpec(
+    "pages_info",
+    dimensions=["pagePath", "year", "month"],
+    metrics=[
+        "activeUsers",
+        "screenPageViews",
+        "screenPageViewsPerSession",
+        ("screenPageViewsPerUser", "screenPageViewPerUser"),
+        "averageSessionDuration",
+        "bounceRate",
+    ],
+    # Stable order so offset pagination never skips or repeats rows
+    order_bys=PAGES_ORDER,
+    paginate=True,
+    exclude={"pagePath": ["/"]},
+)
+
+WEBSITE = ReportSpec(
+    "website_info",
+    metrics=[
+        "activeUsers",
+        "screenPageViews",
+        "averageSessionDuration",
+        "bounceRate",
+        "sessions",
+    ],
+)
+
+# Full newVsReturning x sessionSource cross-tab, one row per pair; the merged
+# website_dimensions_info.json is kept for its existing readers
+WEBSITE_SESSIONS = ReportSpec(
+    "website_sessions_info",
+    dimensions=["newVsReturning", "sessionSource"],
+    metrics=["sessions"],
+    json_strings=False,
+    derived={"website_dimensions_info.json": storage.dimensions_info},
+)
+
+SPECS = (PAGES, WEBSITE, WEBSITE_SESSIONS)
+
+# Month-level active users of a month derived from days: users active on
+# several days count once, as in a monthly extraction (storage.merge_days)
+PAGE_USERS = ReportSpec(
+    "page_users",
+    dimensions=["pagePath"],
+    metrics=["activeUsers"],
+    order_bys=PAGES_ORDER,
+    paginate=True,
+    exclude={"pagePath": ["/"]},
+)
+
+WEBSITE_USERS = ReportSpec("website_users", metrics=["activeUsers"])
@@ -0,0 +1,159 @@
+"""
+On-disk cache of Analytics Data API responses
+
+Responses are stored under their request's content address, the SHA-256 of
+the serialized RunReportRequest, e.g. .ga-cache/3f/3fa2....pb. Entries
+expire after a TTL and the oldest ones are evicted when the cache grows past
+its size limit. In replay mode every request must already be cached, so an
+extraction runs offline without credentials or API quota.
+"""
+
+import hashlib
+import logging
+import os
+import time
+
+from google.analytics.data_v1beta.types import RunReportRequest, RunReportResponse
+from google.protobuf.message import DecodeError
+
+DEFAULT_CACHE_DIR = ".ga-cache"
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_MAX_BYTES = 512 * 2**20
+# Eviction frees the cache down to this share of max_bytes, so a full cache
+# is walked once per tenth of it written again rather than on every put
+EVICT_TO = 0.9
+
+
+class CacheMiss(LookupError):
+    """A request is not cached and the cache is in replay mode."""
+
+
+def request_key(request) -> str:
+    """Content address of a request: SHA-256 of its serialized message."""
+    return hashlib.sha256(RunReportRequest.serialize(request)).hexdigest()
+
+
+class ResponseCache:
+    """Serialized RunReportResponses keyed by ``request_key``.
+
+    The cache is walked once on creation to learn its size, which is then
+    kept up to date on every put; it is only walked again to evict.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        ttl: float = DEFAULT_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.size = sum(size for _, size, _ in self.entries())
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.pb")
+
+    def get(self, request, ignore_ttl: bool = False):
+        """Cached response of ``request``, or None if missing or expired.
+
+        An entry that cannot be parsed is deleted, so the next put replaces it.
+        """
+        path = self.path(request_key(request))
+        try:
+            age = time.time() - os.path.getmtime(path)
+            if not ignore_ttl and age > self.ttl:
+                self.misses += 1
+                return None
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        try:
+            response = RunReportResponse.deserialize(data)
+        except (DecodeError, ValueError):
+            logging.warning("Removing unreadable cached response %s", path)
+            self.remove(path, len(data))
+            self.misses += 1
+            return None
+        self.hits += 1
+        return response
+
+    def remove(self, path: str, size: int):
+        """Delete one entry of ``size`` bytes from the cache."""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        self.size -= size
+
+    def put(self, request, response):
+        """Store ``response`` and evict the oldest entries past ``max_bytes``."""
+        path = self.path(request_key(request))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = RunReportResponse.serialize(response)
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(data)
+        try:
+            self.size -= os.path.getsize(path)
+        except FileNotFoundError:
+            pass
+        os.replace(f"{path}.tmp", path)
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def entries(self) -> list:
+        """(mtime, size, path) of every cached response, oldest first."""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".pb"):
+                    path = os.path.join(root, name)
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        return sorted(entries)
+
+    def evict(self) -> int:
+        """Delete expired entries, then the oldest until under EVICT_TO."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        limit = self.max_bytes * EVICT_TO
+        now = time.time()
+        removed = 0
+        for mtime, size, path in entries:
+            if total <= limit and now - mtime <= self.ttl:
+                continue
+            os.remove(path)
+            total -= size
+            removed += 1
+        self.size = total
+        if removed:
+            logging.info("Evicted %d cached responses", removed)
+        return removed
+
+
+class CachingClient:
+    """Serve run_report from a ResponseCache, calling ``client`` on misses.
+
+    With ``replay`` the cache is the only source: entries never expire and
+    a miss raises CacheMiss instead of reaching the API.
+    """
+
+    def __init__(self, client, cache: ResponseCache, replay: bool = False):
+        self.client = client
+        self.cache = cache
+        self.replay = replay
+
+    async def run_report(self, request):
+        response = self.cache.get(request, ignore_ttl=self.replay)
+        if response is not None:
+            return response
+        if self.replay:
+            raise CacheMiss(f"No cached response for request {request_key(request)}")
+        response = await self.client.run_report(request)
+        self.cache.put(request, response)
+        return response
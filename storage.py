@@ -0,0 +1,665 @@
+"""
+Codaqui Analytics typed Parquet store
+
+Every report is kept as a Hive-partitioned Parquet dataset next to the JSON
+month folders, e.g. data/parquet/pages_info/year_month=2024-01/part-0.parquet,
+so the dashboard can read all history in one vectorised, typed read.
+
+Months extracted day by day keep one file per day in data/YYYY-MM/daily/
+and get their monthly JSON files derived from those days (derive_month).
+
+It also keeps data/rollups.json with the aggregates the dashboard shows
+most often (top pages and source totals per month, per year and all-time),
+and data/index.json, a manifest of every month's files (size, checksum, row
+count) and totals that is updated one month at a time.
+
+Rebuild the store from the JSON files: python storage.py [data_dir]
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+PARQUET_DIR = "parquet"
+ROLLUPS_FILE = "rollups.json"
+INDEX_FILE = "index.json"
+# Pages kept per scope in the rollups (DATA_CONFIG["max_top_pages"] on the dashboard)
+ROLLUP_TOP_N = 20
+MONTH_DIR_PATTERN = re.compile(r"^(\d{4})-(\d{2})$")
+DAILY_DIR = "daily"
+DAY_FILE_PATTERN = re.compile(r"^(\d{4})-(\d{2})-(\d{2})\.json$")
+
+# Column types per report, using the same column names as the JSON files
+SCHEMAS = {
+    "pages_info": pa.schema(
+        [
+            ("pagePath", pa.string()),
+            ("year", pa.int16()),
+            ("month", pa.int8()),
+            ("activeUsers", pa.int64()),
+            ("screenPageViews", pa.int64()),
+            ("screenPageViewsPerSession", pa.float64()),
+            ("screenPageViewPerUser", pa.float64()),
+            ("averageSessionDuration", pa.float64()),
+            ("bounceRate", pa.float64()),
+        ]
+    ),
+    "website_info": pa.schema(
+        [
+            ("year", pa.int16()),
+            ("month", pa.int8()),
+            ("activeUsers", pa.int64()),
+            ("screenPageViews", pa.int64()),
+            ("averageSessionDuration", pa.float64()),
+            ("bounceRate", pa.float64()),
+            ("sessions", pa.int64()),
+        ]
+    ),
+    # newVsReturning x sessionSource cross-tab; null when a month only has
+    # the merged website_dimensions_info.json (see legacy_sessions_rows)
+    "website_sessions_info": pa.schema(
+        [
+            ("newVsReturning", pa.string()),
+            ("sessionSource", pa.string()),
+            ("sessions", pa.int64()),
+            ("year", pa.int16()),
+            ("month", pa.int8()),
+        ]
+    ),
+}
+# JSON files written by main.py for every month
+JSON_REPORTS = (
+    "pages_info",
+    "website_info",
+    "website_dimensions_info",
+    "website_sessions_info",
+)
+NEW_VS_RETURNING = ("new", "returning")
+
+
+def partition_path(data_dir: str, report: str, year_month: str) -> str:
+    """Path of the Parquet file holding one month of a report."""
+    return os.path.join(
+        data_dir, PARQUET_DIR, report, f"year_month={year_month}", "part-0.parquet"
+    )
+
+
+def columns_table(report: str, columns, year_month: str) -> pa.Table:
+    """Build a typed table from string columns (a table or a dict of lists).
+
+    year and month always come from ``year_month``.
+    """
+    year, month = MONTH_DIR_PATTERN.match(year_month).groups()
+    if isinstance(columns, pa.Table):
+        num_rows = columns.num_rows
+    else:
+        num_rows = len(next(iter(columns.values()), []))
+    arrays = []
+    for field in SCHEMAS[report]:
+        if field.name == "year":
+            values = pa.array([year] * num_rows, pa.string())
+        elif field.name == "month":
+            values = pa.array([month] * num_rows, pa.string())
+        elif isinstance(columns, pa.Table):
+            values = columns[field.name]
+        else:
+            values = pa.array(columns[field.name], pa.string())
+        arrays.append(values.cast(field.type))
+    return pa.Table.from_arrays(arrays, schema=SCHEMAS[report])
+
+
+def to_table(report: str, rows: list, year_month: str) -> pa.Table:
+    """Build a typed table from JSON-style rows (metrics stored as strings)."""
+    columns = {
+        field.name: [
+            None if row.get(field.name) is None else str(row[field.name])
+            for row in rows
+        ]
+        for field in SCHEMAS[report]
+        if field.name not in ("year", "month")
+    }
+    return columns_table(report, columns, year_month)
+
+
+class PartitionWriter:
+    """Append batches of rows to one month partition of a report.
+
+    The file is written to a temporary path and moved into place on a clean
+    exit, so readers never see a partially written partition.
+    """
+
+    def __init__(self, data_dir: str, report: str, year_month: str):
+        self.report = report
+        self.year_month = year_month
+        self.path = partition_path(data_dir, report, year_month)
+        # Hidden name so dataset discovery skips it while it is being written
+        folder, name = os.path.split(self.path)
+        self._tmp_path = os.path.join(folder, f".{name}.tmp")
+        self._writer = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._writer = pq.ParquetWriter(self._tmp_path, SCHEMAS[self.report])
+        return self
+
+    def write_rows(self, rows: list):
+        if rows:
+            self._writer.write_table(to_table(self.report, rows, self.year_month))
+
+    def write_table(self, table: pa.Table):
+        if table.num_rows:
+            self._writer.write_table(table)
+
+    def __exit__(self, exc_type, exc, traceback):
+        self._writer.close()
+        if exc_type is not None:
+            os.remove(self._tmp_path)
+            return False
+        os.replace(self._tmp_path, self.path)
+        return False
+
+
+def write_report(data_dir: str, report: str, year_month: str, rows: list):
+    """Write (or replace) one month partition of a report in a single call."""
+    with PartitionWriter(data_dir, report, year_month) as writer:
+        writer.write_rows(rows)
+
+
+def dimensions_info(sessions_rows: list) -> dict:
+    """Fold the cross-tab into the website_dimensions_info.json mapping.
+
+    The mapping puts newVsReturning and sessionSource values side by side,
+    so every session is counted twice; it is kept for existing readers.
+    """
+    website_dimensions_info = {}
+    for row in sessions_rows:
+        for key in (row["newVsReturning"], row["sessionSource"]):
+            website_dimensions_info[key] = (
+                website_dimensions_info.get(key, 0) + row["sessions"]
+            )
+    return website_dimensions_info
+
+
+def legacy_sessions_rows(website_dimensions_info: dict) -> list:
+    """Split an old merged mapping into its two marginals.
+
+    Months fetched before the cross-tab was stored only have the merged
+    mapping: "new"/"returning" become rows without a source and the other
+    keys rows without a newVsReturning value. "(not set)" is ambiguous in
+    that mapping and is kept as a source.
+    """
+    return [
+        {
+            "newVsReturning": key if key in NEW_VS_RETURNING else None,
+            "sessionSource": None if key in NEW_VS_RETURNING else key,
+            "sessions": count,
+        }
+        for key, count in website_dimensions_info.items()
+    ]
+
+
+def read_sessions_rows(folder: str):
+    """Cross-tab rows of a month folder, or None if it has no session data."""
+    path = os.path.join(folder, "website_sessions_info.json")
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    path = os.path.join(folder, "website_dimensions_info.json")
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return legacy_sessions_rows(json.load(f))
+    return None
+
+
+def read_month_rows(data_dir: str, year_month: str) -> dict:
+    """JSON rows of every report a month folder has, by report."""
+    folder = os.path.join(data_dir, year_month)
+    rows = {}
+    for report in SCHEMAS:
+        if report == "website_sessions_info":
+            data = read_sessions_rows(folder)
+        else:
+            path = os.path.join(folder, f"{report}.json")
+            if not os.path.exists(path):
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        if data is not None:
+            rows[report] = data
+    return rows
+
+
+def convert_month(data_dir: str, year_month: str):
+    """Write the Parquet partitions of a month from its JSON files."""
+    for report, data in read_month_rows(data_dir, year_month).items():
+        write_report(data_dir, report, year_month, data)
+
+
+def day_path(data_dir: str, day: str) -> str:
+    """Path of the file holding every report of one YYYY-MM-DD day."""
+    return os.path.join(data_dir, day[:7], DAILY_DIR, f"{day}.json")
+
+
+def write_day(data_dir: str, day: str, day_reports: dict):
+    """Store the rows of each report of one day, replacing the day's file."""
+    path = day_path(data_dir, day)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        f.write(json.dumps(day_reports, indent=4))
+    os.replace(f"{path}.tmp", path)
+
+
+def stored_days(data_dir: str, year_month: str) -> list:
+    """YYYY-MM-DD days of a month that have a daily file."""
+    folder = os.path.join(data_dir, year_month, DAILY_DIR)
+    if not os.path.isdir(folder):
+        return []
+    return sorted(
+        name[:-5] for name in os.listdir(folder) if DAY_FILE_PATTERN.match(name)
+    )
+
+
+def month_days(year_month: str, today: date = None) -> list:
+    """YYYY-MM-DD days of a month up to its last day or ``today``."""
+    today = today or date.today()
+    current = date(*map(int, MONTH_DIR_PATTERN.match(year_month).groups()), 1)
+    days = []
+    while current.strftime("%Y-%m") == year_month and current <= today:
+        days.append(current.isoformat())
+        current += timedelta(days=1)
+    return days
+
+
+def missing_days(data_dir: str, year_month: str, today: date = None) -> list:
+    """Days of a month, up to ``today``, without a daily file."""
+    stored = set(stored_days(data_dir, year_month))
+    return [day for day in month_days(year_month, today) if day not in stored]
+
+
+def derived_is_stale(data_dir: str, year_month: str) -> bool:
+    """Whether a month's monthly files are missing or older than its days."""
+    days = stored_days(data_dir, year_month)
+    if not days:
+        return False
+    newest_day = max(os.path.getmtime(day_path(data_dir, day)) for day in days)
+    for report in JSON_REPORTS:
+        path = os.path.join(data_dir, year_month, f"{report}.json")
+        if not os.path.exists(path) or os.path.getmtime(path) < newest_day:
+            return True
+    return False
+
+
+class IncompleteMonth(ValueError):
+    """Raised when the stored days of a month do not cover it."""
+
+    def __init__(self, year_month: str, missing: list):
+        super().__init__(
+            f"{year_month} is missing {len(missing)} days"
+            f" ({missing[0]}..{missing[-1]})"
+        )
+        self.year_month = year_month
+        self.missing = missing
+
+
+def weighted_means(frame, key, columns, weight) -> pd.DataFrame:
+    """Mean of ``columns`` per ``key`` weighted by ``weight``.
+
+    Groups whose weights add up to zero get the plain mean instead.
+    """
+    weighted = (
+        frame[columns].mul(frame[weight], axis=0).assign(**{weight: frame[weight]})
+    )
+    sums = weighted.groupby(frame[key], sort=False).sum()
+    plain = frame.groupby(key, sort=False)[columns].mean()
+    means = sums[columns].div(sums[weight].replace(0, np.nan), axis=0)
+    return means.fillna(plain)
+
+
+def api_number(value: float) -> str:
+    """Format a float the way the API does (shortest of 15 or 17 digits)."""
+    text = "%.15g" % value
+    return text if float(text) == value else "%.17g" % value
+
+
+def to_strings(frame, int_columns, float_columns) -> pd.DataFrame:
+    """Format metrics like the API does: integers and floats as strings."""
+    frame = frame.copy()
+    for column in int_columns:
+        frame[column] = frame[column].round().astype("int64").astype(str)
+    for column in float_columns:
+        frame[column] = frame[column].astype(float).map(api_number)
+    return frame
+
+
+def merge_pages(rows: list, year_month: str, users: dict) -> list:
+    """Monthly pages_info rows from daily ones and the month's users per page.
+
+    Page sessions are recovered from views / screenPageViewsPerSession so the
+    per-session metrics can be weighted by each day's sessions. Pages missing
+    from ``users`` get 0 activeUsers.
+    """
+    columns = SCHEMAS["pages_info"].names
+    if not rows:
+        return []
+    frame = pd.DataFrame(rows, columns=columns)
+    metrics = columns[3:]
+    frame[metrics] = frame[metrics].apply(pd.to_numeric)
+    per_session = frame["screenPageViewsPerSession"]
+    frame["sessions"] = (frame["screenPageViews"] / per_session).where(
+        per_session > 0, 0.0
+    )
+    months = frame.groupby("pagePath", sort=False)[
+        ["screenPageViews", "sessions"]
+    ].sum()
+    months["activeUsers"] = pd.Series(users, dtype="float64").reindex(
+        months.index, fill_value=0.0
+    )
+    months = months.join(
+        weighted_means(
+            frame, "pagePath", ["averageSessionDuration", "bounceRate"], "sessions"
+        )
+    )
+    months["screenPageViewsPerSession"] = (
+        months["screenPageViews"] / months["sessions"].replace(0, np.nan)
+    ).fillna(0.0)
+    months["screenPageViewPerUser"] = (
+        months["screenPageViews"] / months["activeUsers"].replace(0, np.nan)
+    ).fillna(0.0)
+
+    year, month = MONTH_DIR_PATTERN.match(year_month).groups()
+    months = months.reset_index().assign(year=year, month=month)
+    months = months.sort_values(
+        ["activeUsers", "pagePath"], ascending=[False, True], kind="stable"
+    )
+    months = to_strings(months, ["activeUsers", "screenPageViews"], metrics[2:])
+    return months[columns].to_dict(orient="records")
+
+
+def merge_website(rows: list, users: int) -> list:
+    """Monthly website_info row from daily ones and the month's users.
+
+    Rates are weighted by sessions.
+    """
+    columns = [
+        name for name in SCHEMAS["website_info"].names if name not in ("year", "month")
+    ]
+    if not rows:
+        return []
+    frame = pd.DataFrame(rows, columns=columns).apply(pd.to_numeric)
+    frame["month"] = 0
+    totals = frame.groupby("month")[["screenPageViews", "sessions"]].sum()
+    totals["activeUsers"] = users
+    totals = totals.join(
+        weighted_means(
+            frame, "month", ["averageSessionDuration", "bounceRate"], "sessions"
+        )
+    )
+    totals = to_strings(
+        totals,
+        ["activeUsers", "screenPageViews", "sessions"],
+        ["averageSessionDuration", "bounceRate"],
+    )
+    return totals[columns].to_dict(orient="records")
+
+
+def merge_sessions(rows: list) -> list:
+    """Monthly cross-tab rows: sessions summed per newVsReturning x source."""
+    if not rows:
+        return []
+    frame = pd.DataFrame(rows, columns=["newVsReturning", "sessionSource", "sessions"])
+    merged = (
+        frame.groupby(["newVsReturning", "sessionSource"], sort=False, dropna=False)[
+            "sessions"
+        ]
+        .sum()
+        .reset_index()
+        .sort_values("sessions", ascending=False, kind="stable")
+    )
+    return [
+        {
+            "newVsReturning": row.newVsReturning,
+            "sessionSource": row.sessionSource,
+            "sessions": int(row.sessions),
+        }
+        for row in merged.itertuples(index=False)
+    ]
+
+
+def merge_days(year_month: str, days: list, month_users: dict) -> dict:
+    """Monthly rows of each report from the stored rows of several days.
+
+    Counts are summed and per-session averages and rates are weighted by
+    sessions. Active users cannot be summed over days (a user active on
+    several days would count once per day), so they come from
+    ``month_users``, a month-range query: ``{"pages_info": {pagePath:
+    users}, "website_info": users}``.
+    """
+    rows = {report: [] for report in SCHEMAS}
+    for day_reports in days:
+        for report in rows:
+            rows[report].extend(day_reports.get(report, []))
+    return {
+        "pages_info": merge_pages(
+            rows["pages_info"], year_month, month_users["pages_info"]
+        ),
+        "website_info": merge_website(
+            rows["website_info"], month_users["website_info"]
+        ),
+        "website_sessions_info": merge_sessions(rows["website_sessions_info"]),
+    }
+
+
+def derive_month(
+    data_dir: str, year_month: str, month_users: dict, today: date = None
+) -> list:
+    """Write a month's JSON files and Parquet partitions from its daily files.
+
+    The days must cover the month from its first day to its last one (or to
+    ``today`` for the current month); otherwise IncompleteMonth is raised
+    and the monthly files are left as they are. ``month_users`` holds the
+    month-level active users (see merge_days). Returns the days the month
+    was derived from.
+    """
+    missing = missing_days(data_dir, year_month, today)
+    if missing:
+        raise IncompleteMonth(year_month, missing)
+    days = stored_days(data_dir, year_month)
+    day_reports = []
+    for day in days:
+        with open(day_path(data_dir, day), "r", encoding="utf-8") as f:
+            day_reports.append(json.load(f))
+    merged = merge_days(year_month, day_reports, month_users)
+    merged["website_dimensions_info"] = dimensions_info(merged["website_sessions_info"])
+
+    folder = os.path.join(data_dir, year_month)
+    for report, data in merged.items():
+        path = os.path.join(folder, f"{report}.json")
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            f.write(json.dumps(data, indent=4))
+        os.replace(f"{path}.tmp", path)
+    convert_month(data_dir, year_month)
+    logging.info("Derived %s from %d days", year_month, len(days))
+    return days
+
+
+def read_report(data_dir: str, report: str) -> pd.DataFrame:
+    """Read every month of a report from the Parquet store."""
+    path = os.path.join(data_dir, PARQUET_DIR, report)
+    if not os.path.isdir(path):
+        return pd.DataFrame()
+    frame = pq.read_table(path, partitioning="hive").to_pandas()
+    frame["year_month"] = frame["year_month"].astype(str)
+    return frame.sort_values("year_month", kind="stable", ignore_index=True)
+
+
+def top_records(frame: pd.DataFrame, key: str, metric: str, limit=None) -> list:
+    """Sum ``metric``-like columns per ``key`` and return the largest rows."""
+    totals = frame.groupby(key, sort=False).sum(numeric_only=True).reset_index()
+    totals = totals.sort_values(metric, ascending=False, kind="stable")
+    if limit is not None:
+        totals = totals.head(limit)
+    return totals.to_dict(orient="records")
+
+
+def build_rollups(data_dir: str = "data", top_n: int = ROLLUP_TOP_N) -> dict:
+    """Aggregate the Parquet store into per-month, per-year and all-time views."""
+    pages = read_report(data_dir, "pages_info")
+    sessions = read_report(data_dir, "website_sessions_info")
+    website = read_report(data_dir, "website_info")
+
+    page_columns = ["pagePath", "activeUsers", "screenPageViews"]
+    rollups = {
+        "top_n": top_n,
+        "months": sorted(website["year_month"].unique()) if len(website) else [],
+        "pages": {"month": {}, "year": {}, "all": []},
+        "sources": {"month": {}, "year": {}, "all": []},
+    }
+    if len(pages):
+        for year_month, month_pages in pages.groupby("year_month"):
+            top = month_pages.sort_values("activeUsers", ascending=False, kind="stable")
+            rollups["pages"]["month"][year_month] = (
+                top[page_columns].head(top_n).to_dict(orient="records")
+            )
+        for year, year_pages in pages.groupby("year"):
+            rollups["pages"]["year"][str(year)] = top_records(
+                year_pages[page_columns], "pagePath", "activeUsers", top_n
+            )
+        rollups["pages"]["all"] = top_records(
+            pages[page_columns], "pagePath", "activeUsers", top_n
+        )
+    if len(sessions):
+        # Source totals come from the cross-tab's sessionSource marginal
+        sources = sessions.dropna(subset=["sessionSource"])
+        sources = sources.rename(
+            columns={"sessionSource": "source", "sessions": "count"}
+        )
+        source_columns = ["source", "count"]
+        for year_month, month_sources in sources.groupby("year_month"):
+            rollups["sources"]["month"][year_month] = top_records(
+                month_sources[source_columns], "source", "count"
+            )
+        for year, year_sources in sources.groupby("year"):
+            rollups["sources"]["year"][str(year)] = top_records(
+                year_sources[source_columns], "source", "count"
+            )
+        rollups["sources"]["all"] = top_records(
+            sources[source_columns], "source", "count"
+        )
+    return rollups
+
+
+def write_rollups(data_dir: str = "data") -> dict:
+    """Rebuild data/rollups.json from the Parquet store."""
+    rollups = build_rollups(data_dir)
+    path = os.path.join(data_dir, ROLLUPS_FILE)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        f.write(json.dumps(rollups, indent=4))
+    os.replace(f"{path}.tmp", path)
+    logging.info("Rollups updated for %d months", len(rollups["months"]))
+    return rollups
+
+
+def file_entry(path: str, rows: int) -> dict:
+    """Size, SHA-256 and row count of one data file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return {"bytes": os.path.getsize(path), "sha256": digest.hexdigest(), "rows": rows}
+
+
+def month_index(data_dir: str, year_month: str) -> dict:
+    """Index entry of one month: its files and its website totals."""
+    files = {}
+    rows = {}
+    for report in JSON_REPORTS:
+        path = os.path.join(data_dir, year_month, f"{report}.json")
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            rows[report] = len(data)
+            files[f"{year_month}/{report}.json"] = file_entry(path, len(data))
+            if report == "website_info" and data:
+                website = data[0]
+
+    for report in SCHEMAS:
+        path = partition_path(data_dir, report, year_month)
+        if os.path.exists(path):
+            num_rows = pq.ParquetFile(path).metadata.num_rows
+            relative = os.path.relpath(path, data_dir).replace(os.sep, "/")
+            files[relative] = file_entry(path, num_rows)
+
+    totals = {
+        "pages": rows.get("pages_info", 0),
+        "sources": rows.get("website_dimensions_info", 0),
+    }
+    if rows.get("website_info"):
+        for key in ("activeUsers", "screenPageViews", "sessions"):
+            totals[key] = int(website[key])
+        for key in ("averageSessionDuration", "bounceRate"):
+            totals[key] = float(website[key])
+    return {"files": files, "totals": totals}
+
+
+def read_index(data_dir: str = "data") -> dict:
+    """Load data/index.json, or an empty index if it does not exist yet."""
+    try:
+        with open(os.path.join(data_dir, INDEX_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"months": {}}
+
+
+def write_index(data_dir: str, index: dict):
+    index["months"] = dict(sorted(index["months"].items()))
+    path = os.path.join(data_dir, INDEX_FILE)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        f.write(json.dumps(index, indent=4))
+    os.replace(f"{path}.tmp", path)
+
+
+def update_index(data_dir: str, year_month: str) -> dict:
+    """Add or refresh one month in data/index.json, leaving the others as is."""
+    index = read_index(data_dir)
+    index["months"][year_month] = month_index(data_dir, year_month)
+    write_index(data_dir, index)
+    logging.info("Index updated for %s", year_month)
+    return index
+
+
+def month_folders(data_dir: str = "data") -> list:
+    """Sorted YYYY-MM folders of data_dir that hold a month's JSON files."""
+    return sorted(
+        name
+        for name in os.listdir(data_dir)
+        if MONTH_DIR_PATTERN.match(name)
+        and os.path.exists(os.path.join(data_dir, name, "website_info.json"))
+    )
+
+
+def rebuild(data_dir: str = "data") -> list:
+    """Convert every data/YYYY-MM folder and rebuild the rollups and index."""
+    months = month_folders(data_dir)
+    index = {"months": {}}
+    for year_month in months:
+        logging.info("Converting %s", year_month)
+        convert_month(data_dir, year_month)
+        index["months"][year_month] = month_index(data_dir, year_month)
+    write_index(data_dir, index)
+    write_rollups(data_dir)
+    return months
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    converted = rebuild(sys.argv[1] if len(sys.argv) > 1 else "data")
+    logging.info("Converted %d months", len(converted))
@@ -0,0 +1,142 @@
+"""Preparação dos dados dos gráficos do dashboard.
+
+Os gráficos do Plotly mandam para o navegador todos os pontos de todas as
+séries. Estas funções limitam esse volume antes de montar a figura:
+
+- ``top_with_other`` mantém as N maiores categorias e junta o resto numa
+  categoria "Outras", para pizzas e barras;
+- ``downsample`` agrupa meses consecutivos quando a série passa de
+  ``max_chart_points`` pontos, usando a média de cada grupo para manter a
+  escala mensal dos eixos.
+
+``FigureCache`` guarda as figuras já montadas por (página, filtros, versão
+dos dados), para que voltar a uma página com os mesmos filtros não monte
+tudo de novo.
+"""
+
+import math
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import plotly.io as pio
+
+from config import CHART_CONFIG, DATA_CONFIG
+from timing import span
+
+OTHER_LABEL = "Outras"
+# Tamanhos de grupo aceitos, em meses: bimestre, trimestre, semestre, ano...
+BUCKET_MONTHS = (1, 2, 3, 6, 12, 24, 60, 120)
+
+
+def top_with_other(frame, label, value, limit, other=OTHER_LABEL):
+    """As ``limit`` linhas com maior ``value`` e uma linha ``other`` com o resto"""
+    ordered = frame.sort_values(value, ascending=False, kind="stable")
+    top = ordered.head(limit)
+    rest = ordered[value].iloc[limit:].sum()
+    if not rest:
+        return top
+    top = top[[label, value]].astype({label: object})
+    return pd.concat(
+        [top, pd.DataFrame({label: [other], value: [rest]})], ignore_index=True
+    )
+
+
+def bucket_months(periods, max_points=None):
+    """Quantos meses cabem em cada ponto para ``periods`` caber no limite"""
+    max_points = max_points or DATA_CONFIG["max_chart_points"]
+    for months in BUCKET_MONTHS:
+        if math.ceil(len(periods) / months) <= max_points:
+            return months
+    return math.ceil(len(periods) / max_points)
+
+
+def downsample(frame, values, x="year_month", color=None, max_points=None):
+    """Agrupa a série em no máximo ``max_points`` períodos por cor
+
+    Retorna o DataFrame e quantos meses cada ponto representa; cada ponto
+    leva o rótulo do primeiro mês do grupo e a média de ``values``. Com
+    1 mês por ponto o DataFrame volta como está.
+    """
+    periods = sorted(frame[x].astype(str).unique())
+    months = bucket_months(periods, max_points)
+    if months == 1:
+        return frame, 1
+
+    starts = {period: periods[i - i % months] for i, period in enumerate(periods)}
+    keys = [frame[x].astype(str).map(starts).rename(x)]
+    if color is not None:
+        keys.append(frame[color])
+    grouped = (
+        frame.groupby(keys, observed=True, sort=True)[values]
+        .mean()
+        .round(2)
+        .reset_index()
+    )
+    return grouped, months
+
+
+def period_title(months):
+    """Título do eixo de períodos, indicando o agrupamento quando houver"""
+    if months == 1:
+        return "Período"
+    return f"Período (média de {months} meses)"
+
+
+def estimate_size(value):
+    """Tamanho aproximado em bytes de figuras, DataFrames e tuplas deles"""
+    if value is None:
+        return 0
+    if isinstance(value, (tuple, list)):
+        return sum(estimate_size(item) for item in value)
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    return len(pio.to_json(value, validate=False))
+
+
+class FigureCache:
+    """LRU de figuras e tabelas derivadas, limitado em entradas e bytes
+
+    A chave deve incluir a versão dos dados usados (``Queries.data_version``):
+    quando um mês muda em disco a chave muda e a figura é montada de novo;
+    as versões antigas saem pelo LRU.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None):
+        self.max_entries = max_entries or CHART_CONFIG["figure_cache_entries"]
+        self.max_bytes = max_bytes or CHART_CONFIG["figure_cache_mb"] * 2**20
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # chave -> (tamanho, valor)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        """Valor guardado em ``key`` ou o resultado de ``build()``, guardado"""
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+
+        with span("figures.build", key=key[0]):
+            value = build()
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return value
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[0]
+            self._entries[key] = (size, value)
+            self.size += size
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.size -= evicted
+        return value
+
+    def __len__(self):
+        return len(self._entries)
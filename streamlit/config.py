@@ -20,13 +20,16 @@ CHART_CONFIG = {
         'plasma': 'Plasma'
     },
     'default_height': 400,
-    'default_width': 800
+    'default_width': 800,
+    'figure_cache_entries': 256,  # Figuras guardadas entre reruns
+    'figure_cache_mb': 64  # Limite de memória dessas figuras
 }
 
 # Configurações de dados
 DATA_CONFIG = {
     'max_top_pages': 20,
     'max_traffic_sources': 10,
+    'max_chart_points': 120,  # Acima disso, meses consecutivos viram um ponto
     'default_comparison_periods': 3
 }
 
@@ -0,0 +1,989 @@
+"""Camada de dados do dashboard.
+
+Mantém em memória os dados já lidos de cada pasta ``data/YYYY-MM/`` e só
+relê os meses cuja impressão digital (mtime/tamanho dos arquivos) mudou.
+Enquanto nada muda em disco, cada rerun recebe os mesmos DataFrames.
+
+Quando o extrator já gerou a cópia tipada em ``data/parquet/`` (veja
+``storage.py``), os meses são lidos de lá numa única leitura vetorizada;
+os JSON ficam como alternativa para meses ainda não convertidos.
+
+Meses que já estão no arquivo binário ``data/archive/`` (veja
+``archive.py``) têm preferência: os arquivos são mapeados em memória só
+para leitura e as colunas numéricas viram views sobre o mapeamento, sem
+cópia. Esse cache de meses fica no cache de páginas do sistema, dividido
+entre todas as sessões e processos do servidor, e não na memória privada
+de cada processo.
+
+As duas cópias só valem enquanto são mais novas que os JSON do mês; um mês
+atualizado depois delas, ou do arquivo binário cujos dicionários faltam ou
+não cobrem os IDs, é lido da próxima origem (Parquet e por fim JSON).
+
+O índice ``data/index.json`` lista os meses e seus totais, então as páginas
+montam os filtros sem ler dado nenhum e carregam só os meses escolhidos.
+
+Meses em JSON são lidos em paralelo (``parse_months``): threads para
+poucos meses e processos quando há muitos, já que a decodificação segura o
+GIL. Com o ``orjson`` instalado ele substitui o ``json`` na decodificação.
+"""
+
+import atexit
+import json
+import multiprocessing
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from page_index import PageIndex
+from timing import span
+
+try:
+    import orjson
+except ImportError:  # opcional: só deixa a decodificação mais rápida
+    orjson = None
+
+MONTH_DIR_PATTERN = re.compile(r"^(\d{4})-(\d{2})$")
+MONTH_FILES = (
+    "website_info.json",
+    "pages_info.json",
+    "website_dimensions_info.json",
+    "website_sessions_info.json",
+)
+# Arquivos JSON de que cada relatório do Parquet e do arquivo binário é gerado
+# (o primeiro que existir); os meses dessas cópias mais velhas que eles são
+# lidos do JSON
+SOURCE_FILES = {
+    "website_info": ("website_info.json",),
+    "pages_info": ("pages_info.json",),
+    "website_sessions_info": (
+        "website_sessions_info.json",
+        "website_dimensions_info.json",
+    ),
+}
+PARQUET_DIR = "parquet"
+ARCHIVE_DIR = "archive"
+ARCHIVE_DICTIONARIES = "dictionaries"
+# Colunas guardadas no arquivo binário como IDs dos dicionários; -1 é nulo
+ARCHIVE_CODED = ("pagePath", "newVsReturning", "sessionSource")
+ARCHIVE_NULL = -1
+ARCHIVE_FILE_PATTERN = re.compile(r"^(\d{4}-\d{2})\.arrow$")
+ROLLUPS_FILE = "rollups.json"
+INDEX_FILE = "index.json"
+# Combinações de meses cujos DataFrames ficam guardados ao mesmo tempo
+MAX_CACHED_SELECTIONS = 16
+# A leitura de meses em JSON usa processos a partir de tantos meses e workers;
+# abaixo disso o custo de trazer os dados de volta não compensa
+PROCESS_POOL_MONTHS = 48
+PROCESS_POOL_WORKERS = 4
+POOLS = ("sequential", "thread", "process")
+
+# Tipos finais das colunas; os mesmos do schema Parquet em storage.py
+COLUMN_TYPES = {
+    "year": "int16",
+    "month": "int8",
+    "year_month": "category",
+    "pagePath": "category",
+    "newVsReturning": "category",
+    "sessionSource": "category",
+    "activeUsers": "int64",
+    "screenPageViews": "int64",
+    "sessions": "int64",
+    "screenPageViewsPerSession": "float64",
+    "screenPageViewPerUser": "float64",
+    "averageSessionDuration": "float64",
+    "bounceRate": "float64",
+}
+REPORTS = ("website_info", "pages_info", "website_sessions_info")
+# Ordem das colunas de cada relatório, a mesma das partições Parquet
+REPORT_COLUMNS = {
+    "website_info": [
+        "year",
+        "month",
+        "activeUsers",
+        "screenPageViews",
+        "averageSessionDuration",
+        "bounceRate",
+        "sessions",
+        "year_month",
+    ],
+    "pages_info": [
+        "pagePath",
+        "year",
+        "month",
+        "activeUsers",
+        "screenPageViews",
+        "screenPageViewsPerSession",
+        "screenPageViewPerUser",
+        "averageSessionDuration",
+        "bounceRate",
+        "year_month",
+    ],
+    "website_sessions_info": [
+        "newVsReturning",
+        "sessionSource",
+        "sessions",
+        "year",
+        "month",
+        "year_month",
+    ],
+}
+NEW_VS_RETURNING = ("new", "returning")
+
+
+def month_fingerprint(month_dir):
+    """Retorna (arquivo, mtime, tamanho) dos arquivos de dados de um mês"""
+    fingerprint = []
+    for name in MONTH_FILES:
+        try:
+            stat = os.stat(os.path.join(month_dir, name))
+        except FileNotFoundError:
+            continue
+        fingerprint.append((name, stat.st_mtime_ns, stat.st_size))
+    return tuple(fingerprint)
+
+
+def parquet_partition_dir(data_dir, report, year_month):
+    """Pasta da partição de um mês no dataset Parquet de um relatório"""
+    return os.path.join(data_dir, PARQUET_DIR, report, f"year_month={year_month}")
+
+
+def parquet_fingerprint(data_dir, year_month):
+    """Retorna (relatório, mtime, tamanho) das partições Parquet de um mês"""
+    fingerprint = []
+    for report in REPORTS:
+        partition = parquet_partition_dir(data_dir, report, year_month)
+        try:
+            entries = sorted(os.scandir(partition), key=lambda entry: entry.name)
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            if entry.name.endswith(".parquet"):
+                stat = entry.stat()
+                fingerprint.append((report, stat.st_mtime_ns, stat.st_size))
+    return tuple(fingerprint)
+
+
+def parquet_months(data_dir):
+    """Meses que já têm partição de website_info no dataset Parquet"""
+    try:
+        entries = os.scandir(os.path.join(data_dir, PARQUET_DIR, "website_info"))
+        names = [entry.name for entry in entries if entry.is_dir()]
+    except FileNotFoundError:
+        return set()
+    return {
+        name.split("=", 1)[1]
+        for name in names
+        if name.startswith("year_month=")
+        and MONTH_DIR_PATTERN.match(name.split("=", 1)[1])
+    }
+
+
+def archive_path(data_dir, report, year_month):
+    """Arquivo de um mês de um relatório no arquivo binário"""
+    return os.path.join(data_dir, ARCHIVE_DIR, report, f"{year_month}.arrow")
+
+
+def archive_fingerprint(data_dir, year_month):
+    """Retorna (relatório, mtime, tamanho) dos arquivos binários de um mês"""
+    fingerprint = []
+    for report in REPORTS:
+        try:
+            stat = os.stat(archive_path(data_dir, report, year_month))
+        except FileNotFoundError:
+            continue
+        fingerprint.append((report, stat.st_mtime_ns, stat.st_size))
+    return tuple(fingerprint)
+
+
+def archive_months(data_dir):
+    """Meses que já têm website_info no arquivo binário"""
+    try:
+        names = os.listdir(os.path.join(data_dir, ARCHIVE_DIR, "website_info"))
+    except FileNotFoundError:
+        return set()
+    return {match.group(1) for match in map(ARCHIVE_FILE_PATTERN.match, names) if match}
+
+
+def is_current(fingerprint, json_fingerprint):
+    """Se uma cópia (Parquet ou binária) é mais nova que os JSON do mês
+
+    ``fingerprint`` tem (relatório, mtime, tamanho) dos arquivos da cópia e
+    ``json_fingerprint`` o de ``month_fingerprint``; como em
+    ``SqlBackend.covers``, vale o mtime dos arquivos.
+    """
+    json_mtimes = {name: mtime for name, mtime, _ in json_fingerprint}
+    copied = {}
+    for report, mtime, _ in fingerprint:
+        copied[report] = min(mtime, copied.get(report, mtime))
+    for report, names in SOURCE_FILES.items():
+        source = next((json_mtimes[n] for n in names if n in json_mtimes), None)
+        if source is not None and copied.get(report, -1) < source:
+            return False
+    return True
+
+
+def month_dirs(data_dir):
+    """Nomes das pastas YYYY-MM em ``data_dir``, sem abrir nenhum arquivo"""
+    try:
+        entries = list(os.scandir(data_dir))
+    except FileNotFoundError:
+        return set()
+    return {
+        entry.name
+        for entry in entries
+        if entry.is_dir() and MONTH_DIR_PATTERN.match(entry.name)
+    }
+
+
+def scan_months(data_dir, year_months=None, archive=True):
+    """Mapeia cada mês disponível para (origem, impressão digital)
+
+    A origem é ``"archive"`` quando o mês está no arquivo binário,
+    ``"parquet"`` quando já tem partições tipadas e ``"json"`` para pastas
+    YYYY-MM que só têm os arquivos do extrator. Uma cópia mais velha que
+    os JSON do mês (``is_current``) é ignorada, e com ``archive=False`` o
+    arquivo binário também. Com ``year_months``, só esses meses são
+    verificados em disco.
+    """
+    archived = archive_months(data_dir) if archive else set()
+    parquet = parquet_months(data_dir)
+    if year_months is None:
+        year_months = archived | parquet | month_dirs(data_dir)
+
+    months = {}
+    for year_month in year_months:
+        json_fingerprint = month_fingerprint(os.path.join(data_dir, year_month))
+        if year_month in archived:
+            fingerprint = archive_fingerprint(data_dir, year_month)
+            if is_current(fingerprint, json_fingerprint):
+                months[year_month] = ("archive", fingerprint)
+                continue
+        if year_month in parquet:
+            fingerprint = parquet_fingerprint(data_dir, year_month)
+            if is_current(fingerprint, json_fingerprint):
+                months[year_month] = ("parquet", fingerprint)
+                continue
+        if any(name == "website_info.json" for name, _, _ in json_fingerprint):
+            months[year_month] = ("json", json_fingerprint)
+    return months
+
+
+def read_parquet_months(data_dir, year_months, reports=REPORTS):
+    """Lê vários meses de cada relatório numa única leitura por dataset
+
+    Retorna ``{year_month: {relatório: DataFrame}}``; relatórios sem linhas
+    no mês vêm como DataFrame vazio.
+    """
+    frames = {
+        year_month: {report: pd.DataFrame() for report in reports}
+        for year_month in year_months
+    }
+    for report in reports:
+        report_dir = os.path.join(data_dir, PARQUET_DIR, report)
+        if not os.path.isdir(report_dir):
+            continue
+        table = ds.dataset(report_dir, format="parquet", partitioning="hive").to_table(
+            filter=ds.field("year_month").isin(list(year_months))
+        )
+        report_df = table.to_pandas()
+        report_df["year_month"] = report_df["year_month"].astype(str)
+        for year_month, month_df in report_df.groupby("year_month", sort=False):
+            frames[year_month][report] = month_df.reset_index(drop=True)
+    return frames
+
+
+def read_archive_months(data_dir, year_months, reports=REPORTS):
+    """Mapeia os arquivos binários dos meses pedidos, sem copiar os dados
+
+    Retorna ``{year_month: {relatório: pyarrow.Table}}``. As colunas das
+    tabelas apontam para o arquivo mapeado, que continua mapeado enquanto
+    a tabela (ou um array tirado dela) existir, mesmo que o extrator
+    troque o arquivo no meio tempo.
+    """
+    frames = {year_month: {} for year_month in year_months}
+    for year_month in year_months:
+        for report in reports:
+            path = archive_path(data_dir, report, year_month)
+            if os.path.exists(path):
+                source = pa.memory_map(path)
+                frames[year_month][report] = pa.ipc.open_file(source).read_all()
+    return frames
+
+
+def read_lines(path, default):
+    """Lê um arquivo com um valor JSON por linha (os dicionários do arquivo)"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+    except FileNotFoundError:
+        return default
+
+
+def column_view(column):
+    """Array NumPy de uma coluna Arrow; sem cópia quando há um único pedaço"""
+    arrays = [chunk.to_numpy(zero_copy_only=False) for chunk in column.chunks]
+    return arrays[0] if len(arrays) == 1 else np.concatenate(arrays)
+
+
+def decode_categories(ids, dictionary):
+    """Categorical dos IDs de um dicionário global
+
+    As categorias são só os valores presentes, em ordem alfabética, como
+    as de ``astype("category")`` nos meses lidos de JSON ou Parquet.
+    """
+    ids = ids.astype(np.int64)
+    used = np.unique(ids[ids != ARCHIVE_NULL])
+    names = dictionary[used]
+    order = names.argsort()
+    codes = np.full(len(dictionary) + 1, -1, dtype=np.int64)  # último: nulo
+    codes[used[order]] = np.arange(len(used))
+    return pd.Categorical.from_codes(codes[ids], categories=names[order])
+
+
+def archive_decodable(month_reports, dictionaries):
+    """Se os IDs das tabelas do arquivo de um mês estão nos dicionários
+
+    Falha com um dicionário ausente ou ilegível (None) ou mais curto que os
+    IDs, como quando foi lido no meio de um acréscimo.
+    """
+    for table in month_reports.values():
+        if not isinstance(table, pa.Table):
+            continue
+        for name in ARCHIVE_CODED:
+            if name not in table.column_names:
+                continue
+            if dictionaries is None or dictionaries.get(name) is None:
+                return False
+            highest = pc.max(table[name]).as_py()
+            if highest is not None and highest >= len(dictionaries[name]):
+                return False
+    return True
+
+
+def archive_frame(month_tables, report, dictionaries):
+    """Monta o DataFrame de um relatório a partir das tabelas do arquivo
+
+    ``month_tables`` é uma lista de ``(year_month, tabela)``. Com um só mês
+    as colunas numéricas são views sobre o arquivo mapeado (somente
+    leitura); com vários, cada coluna é concatenada uma vez.
+    """
+    month_tables = [(ym, table) for ym, table in month_tables if table.num_rows]
+    if not month_tables:
+        return pd.DataFrame()
+
+    table = pa.concat_tables([table for _, table in month_tables])
+    lengths = [t.num_rows for _, t in month_tables]
+    year_months = [year_month for year_month, _ in month_tables]
+    columns = {}
+    for name in table.column_names:
+        values = column_view(table[name])
+        if name in ARCHIVE_CODED:
+            values = decode_categories(values, dictionaries[name])
+        columns[name] = values
+    columns["year"] = np.repeat(
+        np.array([int(ym[:4]) for ym in year_months], dtype=np.int16), lengths
+    )
+    columns["month"] = np.repeat(
+        np.array([int(ym[5:]) for ym in year_months], dtype=np.int8), lengths
+    )
+    columns["year_month"] = pd.Categorical.from_codes(
+        np.repeat(np.arange(len(year_months)), lengths), categories=year_months
+    )
+    return pd.DataFrame(
+        {name: columns[name] for name in REPORT_COLUMNS[report]}, copy=False
+    )
+
+
+def json_loads(data):
+    """Decodifica JSON com o ``orjson`` quando instalado"""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def read_json(path, default):
+    """Lê um arquivo JSON, devolvendo ``default`` quando ele não existe"""
+    try:
+        with open(path, "rb") as f:
+            return json_loads(f.read())
+    except FileNotFoundError:
+        return default
+
+
+def legacy_sessions(dims):
+    """Separa o antigo website_dimensions_info.json nas duas dimensões
+
+    O arquivo antigo mistura "new"/"returning" com as fontes; cada chave
+    vira uma linha com só uma das dimensões preenchida, para que as somas
+    por fonte e por tipo de visitante não contem a mesma sessão duas vezes.
+    """
+    return [
+        {
+            "newVsReturning": key if key in NEW_VS_RETURNING else None,
+            "sessionSource": None if key in NEW_VS_RETURNING else key,
+            "sessions": count,
+        }
+        for key, count in dims.items()
+    ]
+
+
+def parse_month(data_dir, year_month, reports=REPORTS):
+    """Lê os arquivos JSON pedidos de um mês e devolve seus registros
+
+    Retorna ``{relatório: registros}``. Os registros só viram DataFrame em
+    ``build_frame``, junto com os outros meses, para não pagar o custo fixo
+    do pandas mês a mês.
+    """
+    root = os.path.join(data_dir, year_month)
+    records = {}
+    for report in reports:
+        if report == "website_sessions_info":
+            sessions = read_json(os.path.join(root, f"{report}.json"), None)
+            if sessions is None:
+                dims = read_json(os.path.join(root, "website_dimensions_info.json"), {})
+                sessions = legacy_sessions(dims)
+            records[report] = sessions
+        else:
+            records[report] = read_json(os.path.join(root, f"{report}.json"), [])
+    return records
+
+
+def available_cpus():
+    """Núcleos que este processo pode usar"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+_process_pools = {}
+_process_pools_lock = threading.Lock()
+
+
+def process_pool(workers):
+    """Pool de processos do servidor, criado uma vez por número de workers
+
+    Usa ``spawn``: o servidor do Streamlit tem várias threads, e ``fork``
+    copiaria locks presos por elas.
+    """
+    with _process_pools_lock:
+        pool = _process_pools.get(workers)
+        if pool is None:
+            pool = _process_pools[workers] = ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return pool
+
+
+def drop_process_pool(workers, pool):
+    """Tira do cache um pool quebrado (worker morto), para o próximo ser novo"""
+    with _process_pools_lock:
+        if _process_pools.get(workers) is pool:
+            del _process_pools[workers]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+@atexit.register
+def shutdown_process_pools():
+    """Encerra os pools de processos quando o servidor sai"""
+    with _process_pools_lock:
+        pools = list(_process_pools.values())
+        _process_pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def choose_pool(months, workers):
+    """Forma de ler ``months`` meses em JSON com ``workers`` workers"""
+    if months < 2 or workers < 2:
+        return "sequential"
+    if months >= PROCESS_POOL_MONTHS and workers >= PROCESS_POOL_WORKERS:
+        return "process"
+    return "thread"
+
+
+def parse_chunk(data_dir, year_months, reports=REPORTS):
+    """Lê um bloco de meses em JSON e monta um DataFrame tipado por relatório
+
+    Roda nos processos de ``parse_months``. Os registros custam mais para
+    serializar de volta do que para decodificar; DataFrames tipados voltam
+    quase de graça. Retorna ``({relatório: DataFrame}, {relatório: linhas
+    de cada mês})``.
+    """
+    records = [parse_month(data_dir, year_month, reports) for year_month in year_months]
+    frames = {}
+    lengths = {}
+    for report in reports:
+        months = [month[report] for month in records]
+        frames[report] = cast_columns(build_frame(list(zip(year_months, months))))
+        lengths[report] = [len(rows) for rows in months]
+    return frames, lengths
+
+
+class ChunkRows(NamedTuple):
+    """Linhas de um mês dentro do DataFrame de um bloco lido num processo"""
+
+    frame: pd.DataFrame
+    start: int
+    stop: int
+
+
+def chunk_rows(frame, lengths):
+    """Uma ``ChunkRows`` por mês de um bloco com ``lengths`` linhas em cada"""
+    stops = np.cumsum(lengths).tolist()
+    return [ChunkRows(frame, start, stop) for start, stop in zip([0] + stops, stops)]
+
+
+def chunk_frames(parts):
+    """Fatias dos blocos com as ``ChunkRows`` pedidas, em ordem
+
+    Meses seguidos de um mesmo bloco viram uma única fatia, então a
+    concatenação recebe poucos DataFrames em vez de um por mês.
+    """
+    merged = []
+    for part in parts:
+        previous = merged[-1] if merged else None
+        if previous and previous.frame is part.frame and previous.stop == part.start:
+            merged[-1] = previous._replace(stop=part.stop)
+        elif part.stop > part.start:
+            merged.append(part)
+    return [part.frame.iloc[slice(part.start, part.stop)] for part in merged]
+
+
+def parse_months(data_dir, year_months, reports=REPORTS, pool=None, workers=None):
+    """Lê os arquivos JSON de vários meses, em paralelo quando compensa
+
+    ``pool`` é "sequential", "thread" (sobrepõe a leitura dos arquivos; a
+    decodificação segura o GIL), "process" (decodifica em paralelo e paga a
+    cópia dos registros de volta) ou None para escolher pelo número de
+    meses. ``workers`` vale o número de núcleos disponíveis quando é None.
+    Se um processo morre (falta de memória, erro ao importar), o pool é
+    descartado e os meses são lidos com threads.
+
+    Retorna ``{year_month: {relatório: dados}}`` na ordem de
+    ``year_months``, seja qual for a ordem em que os meses terminam; os
+    dados são registros, ou ``ChunkRows`` quando vêm do pool de processos.
+    """
+    year_months = list(year_months)
+    workers = min(workers or available_cpus(), max(len(year_months), 1))
+    pool = pool or choose_pool(len(year_months), workers)
+    args = (repeat(data_dir), year_months, repeat(tuple(reports)))
+    if pool == "sequential":
+        parsed = map(parse_month, *args)
+    elif pool == "thread":
+        with ThreadPoolExecutor(workers) as executor:
+            parsed = list(executor.map(parse_month, *args))
+    else:
+        count = min(workers * 4, len(year_months))
+        chunks = [chunk.tolist() for chunk in np.array_split(year_months, count)]
+        executor = process_pool(workers)
+        parsed = []
+        try:
+            for frames, lengths in executor.map(
+                parse_chunk, repeat(data_dir), chunks, repeat(tuple(reports))
+            ):
+                months = [
+                    chunk_rows(frames[report], lengths[report]) for report in reports
+                ]
+                parsed.extend(dict(zip(reports, rows)) for rows in zip(*months))
+        except BrokenExecutor:
+            drop_process_pool(workers, executor)
+            return parse_months(data_dir, year_months, reports, "thread", workers)
+    return dict(zip(year_months, parsed))
+
+
+def build_frame(month_records):
+    """Monta um único DataFrame a partir dos registros de vários meses
+
+    ``month_records`` é uma lista de ``(year_month, registros)``. As colunas
+    year, month e year_month são criadas por coluna, repetindo o valor de
+    cada mês pelo número de linhas dele.
+    """
+    month_records = [(ym, records) for ym, records in month_records if records]
+    if not month_records:
+        return pd.DataFrame()
+
+    frame = pd.DataFrame.from_records(
+        [record for _, records in month_records for record in records]
+    )
+    lengths = [len(records) for _, records in month_records]
+    year_months = [year_month for year_month, _ in month_records]
+    frame["year"] = np.repeat([int(ym[:4]) for ym in year_months], lengths)
+    frame["month"] = np.repeat([int(ym[5:]) for ym in year_months], lengths)
+    frame["year_month"] = pd.Categorical.from_codes(
+        np.repeat(np.arange(len(year_months)), lengths), categories=year_months
+    )
+    return frame
+
+
+def cast_columns(frame):
+    """Converte as colunas conhecidas para os tipos de ``COLUMN_TYPES``
+
+    Colunas que já têm o tipo certo não são copiadas.
+    """
+    types = {column: dtype for column, dtype in COLUMN_TYPES.items() if column in frame}
+    return frame.astype(types, copy=False)
+
+
+class Rollups:
+    """Agregados pré-calculados pelo extrator (``data/rollups.json``)
+
+    Guarda as top páginas e o total por fonte de cada mês, de cada ano e de
+    todo o histórico. Os métodos retornam ``None`` quando o recorte pedido
+    não existe, para a página cair no cálculo sobre os dados brutos.
+    """
+
+    PAGE_COLUMNS = ["pagePath", "activeUsers", "screenPageViews"]
+    SOURCE_COLUMNS = ["source", "count"]
+
+    def __init__(self, payload):
+        self.top_n = payload["top_n"]
+        self.months = frozenset(payload["months"])
+        self._pages = payload["pages"]
+        self._sources = payload["sources"]
+
+    @staticmethod
+    def _lookup(section, scope, key):
+        if scope == "all":
+            return section["all"]
+        return section[scope].get(str(key))
+
+    def top_pages(self, scope, key=None, limit=None):
+        """Top páginas por usuários ativos em ``scope`` ("month", "year" ou "all")"""
+        if limit is not None and limit > self.top_n:
+            return None
+        records = self._lookup(self._pages, scope, key)
+        if records is None:
+            return None
+        return pd.DataFrame(records[:limit], columns=self.PAGE_COLUMNS)
+
+    def sources(self, scope, key=None):
+        """Sessões por fonte em ``scope``, da maior para a menor"""
+        records = self._lookup(self._sources, scope, key)
+        if records is None:
+            return None
+        return pd.DataFrame(records, columns=self.SOURCE_COLUMNS)
+
+
+def rollup_scope(years, months, selected_years, selected_months):
+    """Traduz os filtros de ano/mês para um recorte dos rollups
+
+    Retorna ``("all", None)``, ``("year", ano)`` ou ``None`` quando o filtro
+    é um recorte personalizado que precisa dos dados brutos.
+    """
+    if set(selected_months) != set(months):
+        return None
+    if set(selected_years) == set(years):
+        return ("all", None)
+    if len(selected_years) == 1:
+        return ("year", selected_years[0])
+    return None
+
+
+class DataStore:
+    """Cache por processo dos dados mensais, invalidado por mtime/tamanho"""
+
+    def __init__(self, data_dir, pool=None, workers=None):
+        self.data_dir = data_dir
+        # Como ler meses em JSON; veja ``parse_months``
+        self.pool = pool
+        self.workers = workers
+        self._lock = threading.Lock()
+        # year_month -> ((origem, impressão digital), {relatório: dados}); os
+        # dados são DataFrames em meses Parquet e registros em meses JSON
+        # (ou ChunkRows, quando lidos pelo pool de processos)
+        self._months = {}
+        # versão (meses + impressões digitais) -> DataFrames combinados
+        self._selections = OrderedDict()
+        # versão -> PageIndex das páginas daquele recorte
+        self._page_indexes = OrderedDict()
+        self._version = None
+        self._files = {}  # arquivo -> ((mtime, tamanho), conteúdo)
+
+    @property
+    def version(self):
+        """Identifica o conjunto de arquivos que gerou o último ``load``"""
+        return self._version
+
+    def _read_cached(self, name, parse, read=read_json):
+        """Lê ``data_dir/name`` com ``parse`` só quando mtime/tamanho mudam
+
+        Um arquivo ilegível (em escrita, por exemplo) dá None e é relido na
+        próxima chamada, sem ficar guardado.
+        """
+        path = os.path.join(self.data_dir, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = self._files.get(name)
+        if cached is None or cached[0] != key:
+            try:
+                value = parse(read(path, None))
+            except (OSError, ValueError, KeyError, TypeError):
+                return None
+            cached = self._files[name] = (key, value)
+        return cached[1]
+
+    def index(self):
+        """Conteúdo de ``data/index.json`` ou None se o extrator não o gerou"""
+        return self._read_cached(INDEX_FILE, lambda payload: payload["months"])
+
+    def dictionaries(self):
+        """Valores dos dicionários do arquivo binário, por coluna codificada
+
+        Os dicionários só crescem, então IDs já lidos continuam válidos; um
+        dicionário é relido quando ``archive.py build`` acrescenta valores e
+        é None quando falta ou não pôde ser lido.
+        """
+        return {
+            column: self._read_cached(
+                os.path.join(ARCHIVE_DIR, ARCHIVE_DICTIONARIES, f"{column}.jsonl"),
+                lambda values: pd.Index(values, dtype=object),
+                read_lines,
+            )
+            for column in ARCHIVE_CODED
+        }
+
+    def available_months(self):
+        """Meses com dados, em ordem, sem ler os arquivos de cada mês
+
+        Os meses do índice são aceitos direto; só pastas fora dele são
+        verificadas em disco.
+        """
+        index = self.index() or {}
+        stored = archive_months(self.data_dir) | parquet_months(self.data_dir)
+        folders = month_dirs(self.data_dir)
+        unknown = folders - stored - set(index)
+        months = stored | (folders & set(index))
+        months |= set(scan_months(self.data_dir, unknown))
+        return sorted(months)
+
+    def catalog(self):
+        """Um mês por linha: year, month, year_month e os totais do índice"""
+        index = self.index() or {}
+        rows = [
+            {
+                **index.get(year_month, {}).get("totals", {}),
+                "year": int(year_month[:4]),
+                "month": int(year_month[5:]),
+                "year_month": year_month,
+            }
+            for year_month in self.available_months()
+        ]
+        if not rows:
+            return pd.DataFrame(columns=["year", "month", "year_month"])
+        return pd.DataFrame(rows)
+
+    def fingerprint(self, year_months=None):
+        """Versão dos meses pedidos; muda quando algum arquivo deles muda"""
+        if year_months is not None:
+            year_months = set(year_months)
+        return tuple(sorted(scan_months(self.data_dir, year_months).items()))
+
+    def load(self, year_months=None, reports=REPORTS):
+        """Retorna um DataFrame por relatório, relendo só o que mudou
+
+        Com ``year_months``, só esses meses são verificados e carregados, e
+        só os relatórios em ``reports`` são lidos (na ordem pedida).
+        """
+        return self._versioned_load(year_months, reports)[1]
+
+    def _versioned_load(self, year_months, reports):
+        """``load`` que também devolve a versão dos dados lidos
+
+        A versão é a desta chamada, não ``self.version``, que outra sessão
+        pode ter trocado enquanto isso; é None quando algum arquivo não pôde
+        ser lido e o resultado não vai para o cache.
+        """
+        reports = tuple(reports)
+        with span("load", reports=",".join(reports)) as details:
+            return self._load(year_months, reports, details)
+
+    def _load(self, year_months, reports, details):
+        """Corpo de ``_versioned_load``; anota em ``details`` o uso do cache"""
+        if year_months is not None:
+            year_months = set(year_months)
+        fingerprints = scan_months(self.data_dir, year_months)
+        version = tuple(sorted(fingerprints.items()))
+        frames = self._selections.get((version, reports))
+        details["months"] = len(fingerprints)
+        details["cached"] = frames is not None
+        if frames is not None:
+            self._version = version
+            return version, frames
+
+        with self._lock:
+            if year_months is None:
+                # Varredura completa: esquece meses que sumiram do disco
+                self._months = {
+                    year_month: cached
+                    for year_month, cached in self._months.items()
+                    if year_month in fingerprints
+                }
+
+            dictionaries = None
+            if any(source == "archive" for source, _ in fingerprints.values()):
+                dictionaries = self.dictionaries()
+
+            # (origem, relatório) -> meses que precisam ser lidos
+            stale = {}
+            for year_month, fingerprint in fingerprints.items():
+                cached = self._months.get(year_month)
+                if (
+                    cached is None
+                    or cached[0] != fingerprint
+                    or not archive_decodable(cached[1], dictionaries)
+                ):
+                    cached = self._months[year_month] = (fingerprint, {})
+                for report in reports:
+                    if report not in cached[1]:
+                        stale.setdefault((fingerprint[0], report), []).append(
+                            year_month
+                        )
+
+            complete = True
+            for (source, report), stale_months in stale.items():
+                try:
+                    parsed = self._read(source, stale_months, report)
+                    if source == "archive":
+                        complete &= self._replace_undecodable(
+                            parsed, report, dictionaries
+                        )
+                except (OSError, ValueError):
+                    # Arquivo em escrita ou inválido: tenta de novo no próximo rerun
+                    complete = False
+                    continue
+                for year_month, month_reports in parsed.items():
+                    self._months[year_month][1].update(month_reports)
+
+            frames = tuple(
+                self._combine(sorted(fingerprints), report, dictionaries)
+                for report in reports
+            )
+            if complete:
+                self._selections[(version, reports)] = frames
+                while len(self._selections) > MAX_CACHED_SELECTIONS:
+                    self._selections.popitem(last=False)
+            self._version = version
+            return (version if complete else None), frames
+
+    def _read(self, source, year_months, report):
+        """Lê um relatório de meses de uma mesma origem"""
+        if source == "archive":
+            return read_archive_months(self.data_dir, year_months, (report,))
+        if source == "parquet":
+            return read_parquet_months(self.data_dir, year_months, (report,))
+        return parse_months(
+            self.data_dir, year_months, (report,), self.pool, self.workers
+        )
+
+    def _replace_undecodable(self, parsed, report, dictionaries):
+        """Troca em ``parsed`` os meses do arquivo que os dicionários não decodificam
+
+        Esses meses são lidos do Parquet ou dos JSON. Retorna False se algum
+        deles não tem outra origem e ficou de fora.
+        """
+        undecodable = {
+            year_month
+            for year_month, month_reports in parsed.items()
+            if not archive_decodable(month_reports, dictionaries)
+        }
+        if not undecodable:
+            return True
+        for year_month in undecodable:
+            del parsed[year_month]
+        fallback = scan_months(self.data_dir, undecodable, archive=False)
+        for year_month, (source, _) in fallback.items():
+            parsed.update(self._read(source, [year_month], report))
+        return len(fallback) == len(undecodable)
+
+    def page_index(self, year_months=None):
+        """Índice de caminhos e séries das páginas dos meses pedidos
+
+        Montado uma vez por versão dos dados e guardado como os DataFrames.
+        """
+        version, (pages,) = self._versioned_load(year_months, ("pages_info",))
+        with self._lock:
+            index = self._page_indexes.get(version)
+        if index is not None:
+            return index
+
+        with span("index.build", pages=len(pages)):
+            index = PageIndex(pages)
+        if version is None:
+            return index
+        with self._lock:
+            # Outra sessão pode ter montado o mesmo índice enquanto isso
+            index = self._page_indexes.setdefault(version, index)
+            while len(self._page_indexes) > MAX_CACHED_SELECTIONS:
+                self._page_indexes.popitem(last=False)
+        return index
+
+    def rollups(self):
+        """Rollups do extrator, se cobrirem exatamente os meses disponíveis"""
+        rollups = self._read_cached(ROLLUPS_FILE, Rollups)
+        if rollups is None or rollups.months != set(self.available_months()):
+            return None
+        return rollups
+
+    def _combine(self, year_months, report, dictionaries=None):
+        """Junta um relatório dos meses pedidos em um DataFrame tipado
+
+        Meses em JSON viram um único DataFrame, assim como os meses do
+        arquivo binário; meses em Parquet já chegam como DataFrames e meses
+        lidos pelo pool de processos como fatias dos seus blocos. Tudo é
+        concatenado uma vez, em ordem de mês. As tabelas do arquivo binário
+        são decodificadas com ``dictionaries``, os que ``_load`` conferiu.
+        """
+        json_records = []
+        archive_tables = []
+        parquet_frames = []
+        chunk_parts = []
+        for year_month in year_months:
+            _, data = self._months[year_month]
+            if report not in data:
+                continue
+            if isinstance(data[report], list):
+                json_records.append((year_month, data[report]))
+            elif isinstance(data[report], pa.Table):
+                archive_tables.append((year_month, data[report]))
+            elif isinstance(data[report], ChunkRows):
+                chunk_parts.append(data[report])
+            elif not data[report].empty:
+                parquet_frames.append(data[report])
+
+        frames = (
+            [build_frame(json_records)] + parquet_frames + chunk_frames(chunk_parts)
+        )
+        if archive_tables:
+            frames.append(archive_frame(archive_tables, report, dictionaries))
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return pd.DataFrame()
+        if len(frames) == 1:
+            combined = frames[0]
+        else:
+            combined = pd.concat(frames, ignore_index=True)
+            sources = [json_records, archive_tables, parquet_frames, chunk_parts]
+            if sum(bool(part) for part in sources) > 1:
+                # Mantém a ordem por mês quando as origens se misturam
+                combined = combined.sort_values(
+                    "year_month", kind="stable", ignore_index=True
+                )
+        if chunk_parts:
+            # Fatias de um só bloco trazem o índice e as categorias dele todo
+            combined = combined.reset_index(drop=True)
+            for column in combined.select_dtypes("category"):
+                combined[column] = combined[column].cat.remove_unused_categories()
+        return cast_columns(combined)
@@ -1,11 +1,11 @@
 import os
 import streamlit as st
-import pandas as pd
-import json
-from datetime import datetime
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+
+# pandas, Plotly e a camada de dados são importados dentro das funções que
+# os usam: a página inicial abre sem carregá-los nem ler data/
+from config import DATA_CONFIG
+import timing
+from timing import span
 
 # Configuração da página
 st.set_page_config(
@@ -16,10 +16,9 @@ st.set_page_config(
 )
 
 DATA_DIR = "data"
-ALL_FILES = []
-for root, dirs, files in os.walk(DATA_DIR):
-    for file in files:
-        ALL_FILES.append(os.path.join(root, file))
+# Painel de tempos: DASHBOARD_DEBUG=1 no ambiente ou ?debug=1 na URL
+DEBUG_ENV = "DASHBOARD_DEBUG"
+timing.configure_logging()
 
 
 def intro():
@@ -57,81 +56,114 @@ def intro():
     )
 
 
-def load_all_data():
-    """Carrega todos os dados dos arquivos JSON organizados por mês"""
-    website_data = []
-    pages_data = []
-    dimensions_data = []
-    
-    # Padrão para extrair ano e mês do caminho
-    for root, dirs, files in os.walk(DATA_DIR):
-        if 'website_info.json' in files:
-            # Extrai ano e mês do caminho (ex: data/2024-01/)
-            path_parts = root.split('/')
-            if len(path_parts) >= 2:
-                year_month = path_parts[-1]  # ex: 2024-01
-                try:
-                    year, month = year_month.split('-')
-                    
-                    # Carrega website_info.json
-                    with open(os.path.join(root, 'website_info.json'), 'r') as f:
-                        data = json.load(f)[0]  # Assumindo que é uma lista com um item
-                        data['year'] = int(year)
-                        data['month'] = int(month)
-                        data['year_month'] = year_month
-                        # Converte strings para números
-                        for key in ['activeUsers', 'screenPageViews', 'sessions']:
-                            if key in data:
-                                data[key] = int(data[key])
-                        for key in ['averageSessionDuration', 'bounceRate']:
-                            if key in data:
-                                data[key] = float(data[key])
-                        website_data.append(data)
-                    
-                    # Carrega pages_info.json
-                    pages_file = os.path.join(root, 'pages_info.json')
-                    if os.path.exists(pages_file):
-                        with open(pages_file, 'r') as f:
-                            pages_list = json.load(f)
-                            for page in pages_list:
-                                page['year'] = int(year)
-                                page['month'] = int(month)
-                                page['year_month'] = year_month
-                                # Converte strings para números
-                                for key in ['activeUsers', 'screenPageViews']:
-                                    if key in page:
-                                        page[key] = int(page[key])
-                                pages_data.append(page)
-                    
-                    # Carrega website_dimensions_info.json
-                    dimensions_file = os.path.join(root, 'website_dimensions_info.json')
-                    if os.path.exists(dimensions_file):
-                        with open(dimensions_file, 'r') as f:
-                            dims = json.load(f)
-                            # Transforma em lista de dicionários
-                            for source, count in dims.items():
-                                dimensions_data.append({
-                                    'source': source,
-                                    'count': int(count),
-                                    'year': int(year),
-                                    'month': int(month),
-                                    'year_month': year_month
-                                })
-                
-                except ValueError:
-                    # Ignora diretórios que não seguem o padrão YYYY-MM
-                    continue
-    
-    return pd.DataFrame(website_data), pd.DataFrame(pages_data), pd.DataFrame(dimensions_data)
+@st.cache_resource
+def get_data_store():
+    """Cache de dados compartilhado por todas as sessões do processo"""
+    from data_loader import DataStore
+    
+    return DataStore(DATA_DIR)
+
+
+@st.cache_resource
+def get_figure_cache():
+    """Figuras montadas, compartilhadas por todas as sessões do processo"""
+    from charts import FigureCache
+    
+    return FigureCache()
+
+
+@st.cache_resource
+def get_sql_backend():
+    """Conexões ao banco SQLite do extrator, uma por thread do processo"""
+    from sql_backend import SqlBackend
+    
+    return SqlBackend(DATA_DIR)
+
+
+def get_queries():
+    """Consultas por filtro sobre o cache de dados e o banco do processo"""
+    from queries import Queries
+    
+    return Queries(get_data_store(), get_sql_backend())
+
+
+def overview_figures(filtered_website):
+    """Gráficos de tendência da visão geral"""
+    import plotly.express as px
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    from charts import downsample, period_title
+    
+    # Períodos longos viram médias de meses consecutivos nos gráficos
+    trend, trend_months = downsample(
+        filtered_website,
+        ['activeUsers', 'screenPageViews', 'averageSessionDuration', 'bounceRate']
+    )
+    
+    fig_users = px.line(
+        trend, 
+        x='year_month', 
+        y='activeUsers',
+        title='Evolução de Usuários Ativos',
+        markers=True
+    )
+    fig_users.update_layout(xaxis_title=period_title(trend_months), yaxis_title="Usuários Ativos")
+    
+    fig_views = px.line(
+        trend, 
+        x='year_month', 
+        y='screenPageViews',
+        title='Evolução de Visualizações',
+        markers=True,
+        color_discrete_sequence=['#ff6b6b']
+    )
+    fig_views.update_layout(xaxis_title=period_title(trend_months), yaxis_title="Visualizações")
+    
+    # Gráfico combinado
+    fig_combined = make_subplots(
+        rows=2, cols=2,
+        subplot_titles=('Usuários Ativos', 'Visualizações', 'Duração Média da Sessão', 'Taxa de Rejeição'),
+        specs=[[{"secondary_y": False}, {"secondary_y": False}],
+               [{"secondary_y": False}, {"secondary_y": False}]]
+    )
+    
+    fig_combined.add_trace(
+        go.Scatter(x=trend['year_month'], y=trend['activeUsers'], 
+                  mode='lines+markers', name='Usuários'),
+        row=1, col=1
+    )
+    
+    fig_combined.add_trace(
+        go.Scatter(x=trend['year_month'], y=trend['screenPageViews'], 
+                  mode='lines+markers', name='Visualizações'),
+        row=1, col=2
+    )
+    
+    fig_combined.add_trace(
+        go.Scatter(x=trend['year_month'], y=trend['averageSessionDuration'], 
+                  mode='lines+markers', name='Duração'),
+        row=2, col=1
+    )
+    
+    fig_combined.add_trace(
+        go.Scatter(x=trend['year_month'], y=trend['bounceRate'], 
+                  mode='lines+markers', name='Bounce Rate'),
+        row=2, col=2
+    )
+    
+    fig_combined.update_layout(height=600, title_text="Dashboard Completo de Métricas", showlegend=False)
+    
+    return fig_users, fig_views, fig_combined
 
 
 def overview_dashboard():
     st.title("📊 Visão Geral - Analytics")
     
-    # Carrega todos os dados
-    website_df, pages_df, dimensions_df = load_all_data()
+    # Lista os meses disponíveis sem carregar os dados
+    queries = get_queries()
+    catalog = queries.catalog()
     
-    if website_df.empty:
+    if catalog.empty:
         st.error("Nenhum dado encontrado. Verifique se os arquivos estão no formato correto.")
         return
     
@@ -139,8 +171,8 @@ def overview_dashboard():
     st.sidebar.header("🔧 Filtros")
     
     # Filtro de período
-    years = sorted(website_df['year'].unique())
-    months = sorted(website_df['month'].unique())
+    years = sorted(catalog['year'].unique())
+    months = sorted(catalog['month'].unique())
     
     selected_years = st.sidebar.multiselect(
         "Selecione os anos:",
@@ -154,11 +186,8 @@ def overview_dashboard():
         default=months
     )
     
-    # Filtrar dados
-    filtered_website = website_df[
-        (website_df['year'].isin(selected_years)) & 
-        (website_df['month'].isin(selected_months))
-    ]
+    # Carrega só o website_info dos meses selecionados
+    filtered_website = queries.website(selected_years, selected_months)
     
     if filtered_website.empty:
         st.warning("Nenhum dado encontrado para o período selecionado.")
@@ -207,82 +236,47 @@ def overview_dashboard():
     # Ordena por ano e mês
     filtered_website = filtered_website.sort_values(['year', 'month'])
     
+    # Figuras guardadas por filtro e versão dos meses selecionados
+    fig_users, fig_views, fig_combined = get_figure_cache().get(
+        ('overview', tuple(selected_years), tuple(selected_months),
+         queries.data_version(selected_years, selected_months)),
+        lambda: overview_figures(filtered_website)
+    )
+    
     col1, col2 = st.columns(2)
     
     with col1:
-        fig_users = px.line(
-            filtered_website, 
-            x='year_month', 
-            y='activeUsers',
-            title='Evolução de Usuários Ativos',
-            markers=True
-        )
-        fig_users.update_layout(xaxis_title="Período", yaxis_title="Usuários Ativos")
-        st.plotly_chart(fig_users, use_container_width=True)
+        with span('chart', figure='users'):
+            st.plotly_chart(fig_users, use_container_width=True)
     
     with col2:
-        fig_views = px.line(
-            filtered_website, 
-            x='year_month', 
-            y='screenPageViews',
-            title='Evolução de Visualizações',
-            markers=True,
-            color_discrete_sequence=['#ff6b6b']
-        )
-        fig_views.update_layout(xaxis_title="Período", yaxis_title="Visualizações")
-        st.plotly_chart(fig_views, use_container_width=True)
+        with span('chart', figure='views'):
+            st.plotly_chart(fig_views, use_container_width=True)
     
     # Gráfico combinado
-    fig_combined = make_subplots(
-        rows=2, cols=2,
-        subplot_titles=('Usuários Ativos', 'Visualizações', 'Duração Média da Sessão', 'Taxa de Rejeição'),
-        specs=[[{"secondary_y": False}, {"secondary_y": False}],
-               [{"secondary_y": False}, {"secondary_y": False}]]
-    )
-    
-    fig_combined.add_trace(
-        go.Scatter(x=filtered_website['year_month'], y=filtered_website['activeUsers'], 
-                  mode='lines+markers', name='Usuários'),
-        row=1, col=1
-    )
-    
-    fig_combined.add_trace(
-        go.Scatter(x=filtered_website['year_month'], y=filtered_website['screenPageViews'], 
-                  mode='lines+markers', name='Visualizações'),
-        row=1, col=2
-    )
-    
-    fig_combined.add_trace(
-        go.Scatter(x=filtered_website['year_month'], y=filtered_website['averageSessionDuration'], 
-                  mode='lines+markers', name='Duração'),
-        row=2, col=1
-    )
-    
-    fig_combined.add_trace(
-        go.Scatter(x=filtered_website['year_month'], y=filtered_website['bounceRate'], 
-                  mode='lines+markers', name='Bounce Rate'),
-        row=2, col=2
-    )
-    
-    fig_combined.update_layout(height=600, title_text="Dashboard Completo de Métricas", showlegend=False)
-    st.plotly_chart(fig_combined, use_container_width=True)
+    with span('chart', figure='combined'):
+        st.plotly_chart(fig_combined, use_container_width=True)
 
 
 def pages_analysis():
+    import plotly.express as px
+    from charts import downsample, period_title
+    
     st.title("📄 Análise de Páginas")
     
-    # Carrega dados
-    website_df, pages_df, dimensions_df = load_all_data()
+    # Lista os meses disponíveis sem carregar os dados
+    queries = get_queries()
+    catalog = queries.catalog()
     
-    if pages_df.empty:
+    if catalog.empty:
         st.error("Nenhum dado de páginas encontrado.")
         return
     
     # Sidebar filters
     st.sidebar.header("🔧 Filtros de Páginas")
     
-    years = sorted(pages_df['year'].unique())
-    months = sorted(pages_df['month'].unique())
+    years = sorted(catalog['year'].unique())
+    months = sorted(catalog['month'].unique())
     
     selected_years = st.sidebar.multiselect(
         "Anos:", years, default=years, key="pages_years"
@@ -291,52 +285,47 @@ def pages_analysis():
         "Meses:", months, default=months, key="pages_months"
     )
     
-    # Filtrar dados
-    filtered_pages = pages_df[
-        (pages_df['year'].isin(selected_years)) & 
-        (pages_df['month'].isin(selected_months))
-    ]
-    
-    if filtered_pages.empty:
+    # Só verifica se há páginas; os dados vêm das consultas abaixo
+    if not queries.has_pages(selected_years, selected_months):
         st.warning("Nenhum dado encontrado para o período selecionado.")
         return
     
     # Top páginas
-    st.header("🏆 Top 20 Páginas Mais Acessadas")
+    max_top_pages = DATA_CONFIG['max_top_pages']
+    st.header(f"🏆 Top {max_top_pages} Páginas Mais Acessadas")
     
-    # Agrupa por página e soma usuários ativos
-    top_pages = filtered_pages.groupby('pagePath').agg({
-        'activeUsers': 'sum',
-        'screenPageViews': 'sum'
-    }).reset_index().sort_values('activeUsers', ascending=False).head(20)
+    # Usa o rollup do extrator quando o filtro cobre um ano ou todo o histórico
+    top_pages = queries.top_pages(max_top_pages, selected_years, selected_months)
     
     col1, col2 = st.columns(2)
     
     with col1:
-        fig_pages_users = px.bar(
-            top_pages.head(10), 
-            x='activeUsers', 
-            y='pagePath',
-            orientation='h',
-            title='Top 10 - Usuários Ativos',
-            color='activeUsers',
-            color_continuous_scale='Blues'
-        )
-        fig_pages_users.update_layout(yaxis={'categoryorder':'total ascending'})
-        st.plotly_chart(fig_pages_users, use_container_width=True)
+        with span('chart', figure='pages_users'):
+            fig_pages_users = px.bar(
+                top_pages.head(10), 
+                x='activeUsers', 
+                y='pagePath',
+                orientation='h',
+                title='Top 10 - Usuários Ativos',
+                color='activeUsers',
+                color_continuous_scale='Blues'
+            )
+            fig_pages_users.update_layout(yaxis={'categoryorder':'total ascending'})
+            st.plotly_chart(fig_pages_users, use_container_width=True)
     
     with col2:
-        fig_pages_views = px.bar(
-            top_pages.head(10), 
-            x='screenPageViews', 
-            y='pagePath',
-            orientation='h',
-            title='Top 10 - Visualizações',
-            color='screenPageViews',
-            color_continuous_scale='Reds'
-        )
-        fig_pages_views.update_layout(yaxis={'categoryorder':'total ascending'})
-        st.plotly_chart(fig_pages_views, use_container_width=True)
+        with span('chart', figure='pages_views'):
+            fig_pages_views = px.bar(
+                top_pages.head(10), 
+                x='screenPageViews', 
+                y='pagePath',
+                orientation='h',
+                title='Top 10 - Visualizações',
+                color='screenPageViews',
+                color_continuous_scale='Reds'
+            )
+            fig_pages_views.update_layout(yaxis={'categoryorder':'total ascending'})
+            st.plotly_chart(fig_pages_views, use_container_width=True)
     
     # Tabela detalhada
     st.header("📋 Tabela Detalhada")
@@ -344,8 +333,10 @@ def pages_analysis():
     # Adiciona filtro de busca
     search_term = st.text_input("🔍 Buscar página (digite parte da URL):")
     
+    # A busca e as séries por página vão ao SQLite ou ao índice de caminhos
     if search_term:
-        top_pages = top_pages[top_pages['pagePath'].str.contains(search_term, case=False, na=False)]
+        matches = queries.search_pages(search_term, selected_years, selected_months)
+        top_pages = top_pages[top_pages['pagePath'].isin(matches)]
     
     # Adiciona métricas calculadas
     top_pages['views_per_user'] = (top_pages['screenPageViews'] / top_pages['activeUsers']).round(2)
@@ -363,47 +354,52 @@ def pages_analysis():
     # Análise temporal de páginas específicas
     st.header("📈 Evolução Temporal de Páginas")
     
-    # Selecionar páginas para análise
-    available_pages = pages_df['pagePath'].unique()
+    # Selecionar páginas para análise (limitado para não sobrecarregar)
+    available_pages = queries.page_paths(max_top_pages, selected_years, selected_months)
     selected_pages = st.multiselect(
         "Selecione páginas para comparar:",
-        available_pages[:20],  # Limita para não sobrecarregar
+        available_pages,
         default=available_pages[:3] if len(available_pages) >= 3 else available_pages
     )
     
     if selected_pages:
-        temporal_data = filtered_pages[filtered_pages['pagePath'].isin(selected_pages)]
-        temporal_summary = temporal_data.groupby(['year_month', 'pagePath']).agg({
-            'activeUsers': 'sum'
-        }).reset_index()
-        
-        fig_temporal = px.line(
-            temporal_summary,
-            x='year_month',
-            y='activeUsers',
-            color='pagePath',
-            title='Evolução de Usuários Ativos por Página',
-            markers=True
+        temporal_summary, temporal_months = downsample(
+            queries.page_series(selected_pages, selected_years, selected_months),
+            ['activeUsers'], color='pagePath'
         )
-        fig_temporal.update_layout(xaxis_title="Período", yaxis_title="Usuários Ativos")
-        st.plotly_chart(fig_temporal, use_container_width=True)
+        
+        with span('chart', figure='temporal'):
+            fig_temporal = px.line(
+                temporal_summary,
+                x='year_month',
+                y='activeUsers',
+                color='pagePath',
+                title='Evolução de Usuários Ativos por Página',
+                markers=True
+            )
+            fig_temporal.update_layout(xaxis_title=period_title(temporal_months), yaxis_title="Usuários Ativos")
+            st.plotly_chart(fig_temporal, use_container_width=True)
 
 
 def traffic_sources_analysis():
+    import plotly.express as px
+    from charts import downsample, period_title, top_with_other
+    
     st.title("🌐 Análise de Fontes de Tráfego")
     
-    # Carrega dados
-    website_df, pages_df, dimensions_df = load_all_data()
+    # Lista os meses disponíveis sem carregar os dados
+    queries = get_queries()
+    catalog = queries.catalog()
     
-    if dimensions_df.empty:
+    if catalog.empty:
         st.error("Nenhum dado de fontes de tráfego encontrado.")
         return
     
     # Filtros
     st.sidebar.header("🔧 Filtros de Tráfego")
     
-    years = sorted(dimensions_df['year'].unique())
-    months = sorted(dimensions_df['month'].unique())
+    years = sorted(catalog['year'].unique())
+    months = sorted(catalog['month'].unique())
     
     selected_years = st.sidebar.multiselect(
         "Anos:", years, default=years, key="traffic_years"
@@ -412,11 +408,8 @@ def traffic_sources_analysis():
         "Meses:", months, default=months, key="traffic_months"
     )
     
-    # Filtrar dados
-    filtered_dimensions = dimensions_df[
-        (dimensions_df['year'].isin(selected_years)) & 
-        (dimensions_df['month'].isin(selected_months))
-    ]
+    # Carrega só as fontes dos meses selecionados
+    filtered_dimensions = queries.sources(selected_years, selected_months)
     
     if filtered_dimensions.empty:
         st.warning("Nenhum dado encontrado para o período selecionado.")
@@ -425,36 +418,38 @@ def traffic_sources_analysis():
     # Métricas principais
     st.header("📊 Distribuição de Fontes de Tráfego")
     
-    # Agrupa por fonte
-    traffic_summary = filtered_dimensions.groupby('source').agg({
-        'count': 'sum'
-    }).reset_index().sort_values('count', ascending=False)
+    # Usa o rollup do extrator quando o filtro cobre um ano ou todo o histórico
+    traffic_summary = queries.source_totals(selected_years, selected_months)
+    
+    max_sources = DATA_CONFIG['max_traffic_sources']
     
     col1, col2 = st.columns(2)
     
     with col1:
-        # Gráfico de pizza
-        fig_pie = px.pie(
-            traffic_summary.head(10), 
-            values='count', 
-            names='source',
-            title='Top 10 Fontes de Tráfego'
-        )
-        st.plotly_chart(fig_pie, use_container_width=True)
+        # Gráfico de pizza; as fontes fora do top entram como "Outras"
+        with span('chart', figure='pie'):
+            fig_pie = px.pie(
+                top_with_other(traffic_summary, 'source', 'count', max_sources), 
+                values='count', 
+                names='source',
+                title=f'Top {max_sources} Fontes de Tráfego'
+            )
+            st.plotly_chart(fig_pie, use_container_width=True)
     
     with col2:
         # Gráfico de barras
-        fig_bar = px.bar(
-            traffic_summary.head(10),
-            x='count',
-            y='source',
-            orientation='h',
-            title='Volume por Fonte',
-            color='count',
-            color_continuous_scale='Viridis'
-        )
-        fig_bar.update_layout(yaxis={'categoryorder':'total ascending'})
-        st.plotly_chart(fig_bar, use_container_width=True)
+        with span('chart', figure='bar'):
+            fig_bar = px.bar(
+                traffic_summary.head(max_sources),
+                x='count',
+                y='source',
+                orientation='h',
+                title='Volume por Fonte',
+                color='count',
+                color_continuous_scale='Viridis'
+            )
+            fig_bar.update_layout(yaxis={'categoryorder':'total ascending'})
+            st.plotly_chart(fig_bar, use_container_width=True)
     
     # Evolução temporal das principais fontes
     st.header("📈 Evolução das Principais Fontes")
@@ -462,21 +457,36 @@ def traffic_sources_analysis():
     # Top 5 fontes
     top_sources = traffic_summary.head(5)['source'].tolist()
     
-    temporal_traffic = filtered_dimensions[filtered_dimensions['source'].isin(top_sources)]
-    temporal_summary = temporal_traffic.groupby(['year_month', 'source']).agg({
-        'count': 'sum'
-    }).reset_index()
-    
-    fig_temporal_traffic = px.line(
-        temporal_summary,
-        x='year_month',
-        y='count',
-        color='source',
-        title='Evolução das Top 5 Fontes de Tráfego',
-        markers=True
-    )
-    fig_temporal_traffic.update_layout(xaxis_title="Período", yaxis_title="Volume de Tráfego")
-    st.plotly_chart(fig_temporal_traffic, use_container_width=True)
+    # Só as séries dessas fontes, já somadas por mês
+    temporal_summary = queries.sources(selected_years, selected_months, only=top_sources)
+    temporal_summary, temporal_months = downsample(temporal_summary, ['count'], color='source')
+    
+    with span('chart', figure='temporal_traffic'):
+        fig_temporal_traffic = px.line(
+            temporal_summary,
+            x='year_month',
+            y='count',
+            color='source',
+            title='Evolução das Top 5 Fontes de Tráfego',
+            markers=True
+        )
+        fig_temporal_traffic.update_layout(xaxis_title=period_title(temporal_months), yaxis_title="Volume de Tráfego")
+        st.plotly_chart(fig_temporal_traffic, use_container_width=True)
+    
+    # Novos vs recorrentes, somados da mesma tabela de sessões
+    visitors = queries.visitors(selected_years, selected_months)
+    
+    if not visitors.empty:
+        st.header("👥 Visitantes Novos vs Recorrentes")
+        
+        with span('chart', figure='visitors'):
+            fig_visitors = px.pie(
+                visitors,
+                values='sessions',
+                names='newVsReturning',
+                title='Sessões por Tipo de Visitante'
+            )
+            st.plotly_chart(fig_visitors, use_container_width=True)
     
     # Tabela detalhada
     st.header("📋 Tabela de Fontes Detalhada")
@@ -495,13 +505,47 @@ def traffic_sources_analysis():
     )
 
 
+def comparison_figure(data1, data2, period1, period2):
+    """Barras normalizadas das métricas de dois períodos"""
+    import pandas as pd
+    import plotly.express as px
+    
+    comparison_data = pd.DataFrame({
+        'Métrica': ['Usuários Ativos', 'Visualizações', 'Duração Média', 'Taxa de Rejeição'],
+        period1: [data1['activeUsers'], data1['screenPageViews'], data1['averageSessionDuration'], data1['bounceRate']],
+        period2: [data2['activeUsers'], data2['screenPageViews'], data2['averageSessionDuration'], data2['bounceRate']]
+    })
+    
+    # Normaliza os dados para melhor visualização (exceto bounce rate)
+    normalized_data = comparison_data.copy()
+    for col in [period1, period2]:
+        normalized_data.loc[0, col] = normalized_data.loc[0, col] / 1000  # Usuários em milhares
+        normalized_data.loc[1, col] = normalized_data.loc[1, col] / 1000  # Views em milhares
+        normalized_data.loc[2, col] = normalized_data.loc[2, col] / 100   # Duração em centenas
+        normalized_data.loc[3, col] = normalized_data.loc[3, col] * 100   # Bounce rate em percentual
+    
+    fig_comparison = px.bar(
+        normalized_data,
+        x='Métrica',
+        y=[period1, period2],
+        title=f'Comparação: {period1} vs {period2}',
+        barmode='group'
+    )
+    fig_comparison.update_layout(yaxis_title="Valores Normalizados")
+    
+    return fig_comparison
+
+
 def comparative_analysis():
+    import pandas as pd
+    
     st.title("🔍 Análise Comparativa")
     
-    # Carrega dados
-    website_df, pages_df, dimensions_df = load_all_data()
+    # Lista os meses disponíveis sem carregar os dados
+    queries = get_queries()
+    catalog = queries.catalog()
     
-    if website_df.empty:
+    if catalog.empty:
         st.error("Nenhum dado encontrado.")
         return
     
@@ -510,7 +554,7 @@ def comparative_analysis():
     # Seleção de períodos para comparação
     col1, col2 = st.columns(2)
     
-    available_periods = sorted(website_df['year_month'].unique())
+    available_periods = sorted(catalog['year_month'].unique())
     
     with col1:
         st.subheader("Período 1")
@@ -525,6 +569,9 @@ def comparative_analysis():
         st.warning("Selecione períodos diferentes para comparação.")
         return
     
+    # Carrega só os dois períodos comparados
+    website_df = pd.concat([queries.website(period=period1), queries.website(period=period2)], ignore_index=True)
+    
     # Dados dos períodos
     data1 = website_df[website_df['year_month'] == period1].iloc[0] if not website_df[website_df['year_month'] == period1].empty else None
     data2 = website_df[website_df['year_month'] == period2].iloc[0] if not website_df[website_df['year_month'] == period2].empty else None
@@ -574,41 +621,24 @@ def comparative_analysis():
             delta=f"{diff_bounce:+.1%} ({pct_bounce:+.1f}%)"
         )
     
-    # Gráfico de comparação
-    comparison_data = pd.DataFrame({
-        'Métrica': ['Usuários Ativos', 'Visualizações', 'Duração Média', 'Taxa de Rejeição'],
-        period1: [data1['activeUsers'], data1['screenPageViews'], data1['averageSessionDuration'], data1['bounceRate']],
-        period2: [data2['activeUsers'], data2['screenPageViews'], data2['averageSessionDuration'], data2['bounceRate']]
-    })
-    
-    # Normaliza os dados para melhor visualização (exceto bounce rate)
-    normalized_data = comparison_data.copy()
-    for col in [period1, period2]:
-        normalized_data.loc[0, col] = normalized_data.loc[0, col] / 1000  # Usuários em milhares
-        normalized_data.loc[1, col] = normalized_data.loc[1, col] / 1000  # Views em milhares
-        normalized_data.loc[2, col] = normalized_data.loc[2, col] / 100   # Duração em centenas
-        normalized_data.loc[3, col] = normalized_data.loc[3, col] * 100   # Bounce rate em percentual
-    
-    fig_comparison = px.bar(
-        normalized_data,
-        x='Métrica',
-        y=[period1, period2],
-        title=f'Comparação: {period1} vs {period2}',
-        barmode='group'
+    # Gráfico de comparação, guardado por período e versão dos dois meses
+    fig_comparison = get_figure_cache().get(
+        ('comparative', period1, period2, queries.data_version(period=period1), queries.data_version(period=period2)),
+        lambda: comparison_figure(data1, data2, period1, period2)
     )
-    fig_comparison.update_layout(yaxis_title="Valores Normalizados")
-    st.plotly_chart(fig_comparison, use_container_width=True)
+    
+    with span('chart', figure='comparison'):
+        st.plotly_chart(fig_comparison, use_container_width=True)
     
     # Análise de páginas nos dois períodos
-    if not pages_df.empty:
+    top_pages1 = queries.top_pages(10, period=period1)
+    top_pages2 = queries.top_pages(10, period=period2)
+    if not top_pages1.empty or not top_pages2.empty:
         st.header("📄 Comparação de Páginas Populares")
         
-        pages1 = pages_df[pages_df['year_month'] == period1]
-        pages2 = pages_df[pages_df['year_month'] == period2]
-        
-        if not pages1.empty and not pages2.empty:
-            top_pages1 = pages1.nlargest(10, 'activeUsers')[['pagePath', 'activeUsers']]
-            top_pages2 = pages2.nlargest(10, 'activeUsers')[['pagePath', 'activeUsers']]
+        if not top_pages1.empty and not top_pages2.empty:
+            top_pages1 = top_pages1[['pagePath', 'activeUsers']]
+            top_pages2 = top_pages2[['pagePath', 'activeUsers']]
             
             col1, col2 = st.columns(2)
             
@@ -623,24 +653,69 @@ def comparative_analysis():
                            use_container_width=True)
 
 
+def monthly_figures(top_pages_month, traffic_month, selected_period):
+    """Gráficos do relatório mensal; None para os que não têm dados"""
+    import plotly.express as px
+    
+    fig_top_month = fig_traffic_pie = fig_traffic_bar = None
+    
+    if not top_pages_month.empty:
+        fig_top_month = px.bar(
+            top_pages_month,
+            x='activeUsers',
+            y='pagePath',
+            orientation='h',
+            title=f'Páginas Mais Acessadas - {selected_period}',
+            color='activeUsers',
+            color_continuous_scale='Blues'
+        )
+        fig_top_month.update_layout(yaxis={'categoryorder':'total ascending'})
+    
+    if not traffic_month.empty:
+        traffic_month = traffic_month.head(8)
+        fig_traffic_pie = px.pie(
+            traffic_month,
+            values='count',
+            names='source',
+            title=f'Distribuição de Tráfego - {selected_period}'
+        )
+        
+        fig_traffic_bar = px.bar(
+            traffic_month,
+            x='count',
+            y='source',
+            orientation='h',
+            title='Volume por Fonte',
+            color='count',
+            color_continuous_scale='Viridis'
+        )
+        fig_traffic_bar.update_layout(yaxis={'categoryorder':'total ascending'})
+    
+    return fig_top_month, fig_traffic_pie, fig_traffic_bar
+
+
 def monthly_report():
+    import pandas as pd
+    
     st.title("📈 Relatório Mensal Completo")
     
-    # Carrega dados
-    website_df, pages_df, dimensions_df = load_all_data()
+    # Lista os meses disponíveis sem carregar os dados
+    queries = get_queries()
+    catalog = queries.catalog()
     
-    if website_df.empty:
+    if catalog.empty:
         st.error("Nenhum dado encontrado.")
         return
     
     # Seleção do mês
-    available_periods = sorted(website_df['year_month'].unique(), reverse=True)
+    available_periods = sorted(catalog['year_month'].unique(), reverse=True)
     selected_period = st.selectbox("Selecione o período:", available_periods)
     
-    # Dados do período selecionado
-    period_data = website_df[website_df['year_month'] == selected_period]
-    period_pages = pages_df[pages_df['year_month'] == selected_period] if not pages_df.empty else pd.DataFrame()
-    period_traffic = dimensions_df[dimensions_df['year_month'] == selected_period] if not dimensions_df.empty else pd.DataFrame()
+    # Dados do período selecionado; o histórico vem dos totais do índice
+    website_df = queries.history()
+    period_data = queries.website(period=selected_period)
+    top_pages_month = queries.top_pages(10, period=selected_period)
+    traffic_month = queries.source_totals(period=selected_period)
     
     if period_data.empty:
         st.error("Nenhum dado encontrado para o período selecionado.")
@@ -694,51 +769,32 @@ def monthly_report():
             pct_bounce = (diff_bounce / avg_bounce * 100) if avg_bounce != 0 else 0
             st.metric("Rejeição", "vs Média", delta=f"{pct_bounce:+.1f}%")
     
+    # Figuras guardadas por período e versão do mês
+    fig_top_month, fig_traffic_pie, fig_traffic_bar = get_figure_cache().get(
+        ('monthly', selected_period, queries.data_version(period=selected_period)),
+        lambda: monthly_figures(top_pages_month, traffic_month, selected_period)
+    )
+    
     # Top páginas do mês
-    if not period_pages.empty:
+    if not top_pages_month.empty:
         st.header("🏆 Top 10 Páginas do Mês")
-        top_pages_month = period_pages.nlargest(10, 'activeUsers')[['pagePath', 'activeUsers', 'screenPageViews']]
         
-        fig_top_month = px.bar(
-            top_pages_month,
-            x='activeUsers',
-            y='pagePath',
-            orientation='h',
-            title=f'Páginas Mais Acessadas - {selected_period}',
-            color='activeUsers',
-            color_continuous_scale='Blues'
-        )
-        fig_top_month.update_layout(yaxis={'categoryorder':'total ascending'})
-        st.plotly_chart(fig_top_month, use_container_width=True)
+        with span('chart', figure='top_month'):
+            st.plotly_chart(fig_top_month, use_container_width=True)
     
     # Fontes de tráfego do mês
-    if not period_traffic.empty:
+    if not traffic_month.empty:
         st.header("🌐 Fontes de Tráfego do Mês")
         
         col1, col2 = st.columns(2)
         
         with col1:
-            traffic_month = period_traffic.nlargest(8, 'count')
-            fig_traffic_pie = px.pie(
-                traffic_month,
-                values='count',
-                names='source',
-                title=f'Distribuição de Tráfego - {selected_period}'
-            )
-            st.plotly_chart(fig_traffic_pie, use_container_width=True)
+            with span('chart', figure='traffic_pie'):
+                st.plotly_chart(fig_traffic_pie, use_container_width=True)
         
         with col2:
-            fig_traffic_bar = px.bar(
-                traffic_month,
-                x='count',
-                y='source',
-                orientation='h',
-                title='Volume por Fonte',
-                color='count',
-                color_continuous_scale='Viridis'
-            )
-            fig_traffic_bar.update_layout(yaxis={'categoryorder':'total ascending'})
-            st.plotly_chart(fig_traffic_bar, use_container_width=True)
+            with span('chart', figure='traffic_bar'):
+                st.plotly_chart(fig_traffic_bar, use_container_width=True)
     
     # Insights e Recomendações
     st.header("💡 Insights e Recomendações")
@@ -761,8 +817,8 @@ def monthly_report():
     else:
         insights.append("💡 **Duração de sessão** pode ser melhorada com conteúdo mais interativo")
     
-    if not period_pages.empty:
-        top_page = period_pages.nlargest(1, 'activeUsers').iloc[0]
+    if not top_pages_month.empty:
+        top_page = top_pages_month.iloc[0]
         insights.append(f"🏆 **Página mais popular**: {top_page['pagePath']} com {top_page['activeUsers']} usuários")
     
     for insight in insights:
@@ -781,11 +837,11 @@ def monthly_report():
             'Taxa_Rejeicao': data['bounceRate']
         }
         
-        if not period_pages.empty:
-            report_data['Top_Pagina'] = period_pages.nlargest(1, 'activeUsers').iloc[0]['pagePath']
+        if not top_pages_month.empty:
+            report_data['Top_Pagina'] = top_pages_month.iloc[0]['pagePath']
         
-        if not period_traffic.empty:
-            report_data['Principal_Fonte'] = period_traffic.nlargest(1, 'count').iloc[0]['source']
+        if not traffic_month.empty:
+            report_data['Principal_Fonte'] = traffic_month.iloc[0]['source']
         
         report_df = pd.DataFrame([report_data])
         csv = report_df.to_csv(index=False)
@@ -844,5 +900,36 @@ st.sidebar.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-# Executa a função da página selecionada
-page_names_to_funcs[page_name]()
+
+def timing_panel():
+    """Painel de depuração com os tempos da execução atual e do processo"""
+    import pandas as pd
+    
+    spans = timing.run_spans()
+    with st.sidebar.expander("⏱️ Tempos de execução", expanded=True):
+        if spans:
+            st.dataframe(
+                pd.DataFrame(spans).drop(columns=['page']),
+                use_container_width=True,
+                hide_index=True
+            )
+        stats = pd.DataFrame.from_dict(timing.process_stats(), orient='index')
+        if not stats.empty:
+            st.markdown("**Desde o início do processo**")
+            st.dataframe(stats.sort_values('self_ms', ascending=False), use_container_width=True)
+            st.download_button(
+                label="📥 Exportar métricas (JSON)",
+                data=stats.to_json(orient='index', indent=2),
+                file_name="dashboard_timings.json",
+                mime="application/json"
+            )
+
+
+# Executa a função da página selecionada, medindo cada trecho
+timing.begin_run(page_name)
+with span('page'):
+    page_names_to_funcs[page_name]()
+timing.export_run()
+
+if os.environ.get(DEBUG_ENV) or st.query_params.get('debug') == '1':
+    timing_panel()
@@ -0,0 +1,141 @@
+"""Índice de páginas do dashboard.
+
+Montado uma vez por recorte de meses a partir do ``pages_info``, guarda:
+
+- os caminhos normalizados (minúsculas, sem barras repetidas);
+- uma lista ordenada desses caminhos, onde todas as páginas de uma seção
+  como ``/trilhas/python/`` formam um intervalo achado por busca binária;
+- um índice de trigramas para a busca por trecho do caminho;
+- a série mensal de cada página, guardada em fatias contíguas.
+
+Assim a busca enquanto se digita e o histórico de uma página são consultas
+ao índice, não varreduras de todas as linhas de páginas.
+"""
+
+import bisect
+import re
+
+import numpy as np
+import pandas as pd
+
+from timing import timed
+
+SERIES_COLUMNS = ["year_month", "pagePath", "activeUsers", "screenPageViews"]
+_REPEATED_SLASHES = re.compile(r"/{2,}")
+
+
+def normalize_path(path):
+    """Forma usada nas buscas: minúsculas e sem barras repetidas"""
+    return _REPEATED_SLASHES.sub("/", str(path).strip().lower())
+
+
+def trigrams(text):
+    """Trechos de 3 caracteres de ``text``"""
+    return {"".join(gram) for gram in zip(text, text[1:], text[2:])}
+
+
+def matching_paths(paths, term):
+    """Os ``paths`` que contêm ``term``, comparados na forma normalizada"""
+    term = normalize_path(term)
+    return [path for path in paths if term in normalize_path(path)]
+
+
+class PageIndex:
+    """Busca por caminho e séries mensais das páginas de um recorte"""
+
+    def __init__(self, pages):
+        if pages.empty:
+            self.paths = []
+            self._series = pd.DataFrame(columns=SERIES_COLUMNS)
+            self._slices = {}
+            self._sorted = []
+            self._keys = []
+            self._trigrams = {}
+            return
+
+        # Ordem de primeira aparição, a mesma de pages['pagePath'].unique()
+        self.paths = list(pages["pagePath"].unique())
+
+        series = (
+            pages.groupby(["pagePath", "year_month"], observed=True)
+            .agg({"activeUsers": "sum", "screenPageViews": "sum"})
+            .reset_index()
+        )
+        self._series = series[SERIES_COLUMNS]
+        # As linhas de cada página são contíguas (agrupadas por pagePath)
+        codes = self._series["pagePath"].cat.codes.to_numpy()
+        starts = np.flatnonzero(np.diff(codes, prepend=-1))
+        ends = np.append(starts[1:], len(codes))
+        categories = self._series["pagePath"].cat.categories
+        self._slices = {
+            categories[codes[start]]: (start, end)
+            for start, end in zip(starts.tolist(), ends.tolist())
+        }
+
+        normalized = [(normalize_path(path), path) for path in self.paths]
+        self._sorted = sorted(normalized)
+        self._keys = [key for key, _ in self._sorted]
+        self._trigrams = {}
+        for position, (key, _) in enumerate(self._sorted):
+            for gram in trigrams(key):
+                self._trigrams.setdefault(gram, []).append(position)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def with_prefix(self, prefix):
+        """Páginas cujo caminho normalizado começa com ``prefix``"""
+        prefix = normalize_path(prefix)
+        start = bisect.bisect_left(self._keys, prefix)
+        end = bisect.bisect_left(self._keys, prefix + "\uffff")
+        return [path for _, path in self._sorted[start:end]]
+
+    @timed("index.search")
+    def search(self, term):
+        """Páginas cujo caminho contém ``term``, sem diferenciar maiúsculas
+
+        Vale também para termos com "/": ``/python`` acha
+        ``/trilhas/python/...``. Páginas de uma seção são ``with_prefix``.
+        """
+        term = normalize_path(term)
+        if not term:
+            return list(self.paths)
+
+        grams = trigrams(term)
+        if grams:
+            candidates = None
+            for gram in grams:
+                positions = self._trigrams.get(gram)
+                if positions is None:
+                    return []
+                candidates = (
+                    set(positions)
+                    if candidates is None
+                    else candidates & set(positions)
+                )
+            positions = sorted(candidates)
+        else:
+            positions = range(len(self._sorted))
+        return [
+            self._sorted[position][1]
+            for position in positions
+            if term in self._sorted[position][0]
+        ]
+
+    @timed("index.series")
+    def series(self, paths):
+        """Usuários e visualizações por mês das páginas pedidas
+
+        Retorna as colunas year_month, pagePath, activeUsers e
+        screenPageViews, ordenadas por mês e página.
+        """
+        slices = [self._slices[path] for path in paths if path in self._slices]
+        if not slices:
+            return pd.DataFrame(columns=SERIES_COLUMNS)
+        rows = pd.concat(
+            [self._series.iloc[start:end] for start, end in slices],
+            ignore_index=True,
+        )
+        return rows.sort_values(
+            ["year_month", "pagePath"], kind="stable", ignore_index=True
+        )
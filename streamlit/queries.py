@@ -0,0 +1,349 @@
+"""Consultas do dashboard por filtro.
+
+Cada página descreve o recorte que quer (anos, meses, um período, top-N,
+páginas) e recebe só os dados desse recorte. Os meses fora do filtro não são
+lidos nem convertidos em DataFrame, então uma visão de um mês custa o mesmo
+com 2 ou 20 anos de histórico.
+
+Agregações (top páginas, totais por fonte, sessões por mês) usam, nessa
+ordem, os rollups do extrator, o banco SQLite (``sql_backend``) quando ele
+cobre o recorte e, por fim, os DataFrames do ``DataStore``.
+"""
+
+import pandas as pd
+
+from data_loader import rollup_scope
+from page_index import matching_paths
+from sql_backend import placeholders
+from timing import timed
+
+WEBSITE_METRICS = [
+    "activeUsers",
+    "screenPageViews",
+    "sessions",
+    "averageSessionDuration",
+    "bounceRate",
+]
+
+
+def categorize(frame, columns):
+    """Converte ``columns`` de um resultado SQL em category, como no pandas"""
+    return frame.astype({column: "category" for column in columns})
+
+
+class Queries:
+    """API de consulta sobre um ``DataStore`` e, se houver, um ``SqlBackend``"""
+
+    def __init__(self, store, sql=None):
+        self.store = store
+        self.sql = sql
+
+    def catalog(self):
+        """Meses disponíveis e seus totais, sem carregar os dados de cada mês"""
+        return self.store.catalog()
+
+    def periods(self, years=None, months=None, period=None):
+        """Lista os year_month que passam nos filtros
+
+        ``period`` escolhe um único mês; ``years`` e ``months`` filtram o
+        catálogo e valem "todos" quando são None.
+        """
+        catalog = self.catalog()
+        if period is not None:
+            return [period] if period in set(catalog["year_month"]) else []
+        selected = catalog
+        if years is not None:
+            selected = selected[selected["year"].isin(years)]
+        if months is not None:
+            selected = selected[selected["month"].isin(months)]
+        return selected["year_month"].tolist()
+
+    def data_version(self, years=None, months=None, period=None):
+        """Versão dos arquivos do recorte, para chaves de cache de figuras"""
+        return self.store.fingerprint(self.periods(years, months, period))
+
+    def _scope(self, years, months, period):
+        """Recorte dos rollups equivalente aos filtros, ou None"""
+        if period is not None:
+            return ("month", period)
+        catalog = self.catalog()
+        all_years = sorted(catalog["year"].unique())
+        all_months = sorted(catalog["month"].unique())
+        return rollup_scope(
+            all_years,
+            all_months,
+            all_years if years is None else years,
+            all_months if months is None else months,
+        )
+
+    def _sql(self, periods):
+        """Backend SQL quando o banco cobre ``periods``, senão None"""
+        if self.sql is None or not self.sql.covers(self.store.fingerprint(periods)):
+            return None
+        return self.sql
+
+    def _load(self, report, years, months, period):
+        periods = self.periods(years, months, period)
+        (frame,) = self.store.load(periods, reports=(report,))
+        return frame
+
+    @timed("query.website")
+    def website(self, years=None, months=None, period=None):
+        """Um registro de website_info por mês do recorte"""
+        return self._load("website_info", years, months, period)
+
+    @timed("query.pages")
+    def pages(self, years=None, months=None, period=None, page_paths=None):
+        """Páginas do recorte, opcionalmente só as de ``page_paths``"""
+        pages = self._load("pages_info", years, months, period)
+        if page_paths is not None and not pages.empty:
+            pages = pages[pages["pagePath"].isin(page_paths)]
+        return pages
+
+    @timed("query.page_index")
+    def page_index(self, years=None, months=None, period=None):
+        """Índice de busca e séries mensais das páginas do recorte"""
+        return self.store.page_index(self.periods(years, months, period))
+
+    @timed("query.has_pages")
+    def has_pages(self, years=None, months=None, period=None):
+        """Se o recorte tem alguma linha de páginas, sem carregá-las"""
+        periods = self.periods(years, months, period)
+        if not periods:
+            return False
+        sql = self._sql(periods)
+        if sql is not None:
+            found = sql.query(
+                "SELECT 1 FROM pages_info "
+                f"WHERE year_month IN ({placeholders(periods)}) LIMIT 1",
+                periods,
+            )
+            if found is not None:
+                return not found.empty
+        return len(self.page_index(years, months, period)) > 0
+
+    @timed("query.page_paths")
+    def page_paths(self, limit, years=None, months=None, period=None):
+        """As ``limit`` primeiras páginas do recorte, na ordem dos arquivos
+
+        É a ordem de ``PageIndex.paths``: por mês e, em cada mês, a do
+        relatório (mais usuários primeiro).
+        """
+        periods = self.periods(years, months, period)
+        sql = self._sql(periods)
+        if sql is not None:
+            paths = sql.query(
+                "SELECT pagePath FROM pages_info "
+                f"WHERE year_month IN ({placeholders(periods)}) GROUP BY pagePath "
+                "ORDER BY MIN(year_month || printf('%09d', position)) LIMIT ?",
+                periods + [limit],
+            )
+            if paths is not None:
+                return paths["pagePath"].tolist()
+        return self.page_index(years, months, period).paths[:limit]
+
+    @timed("query.search_pages")
+    def search_pages(self, term, years=None, months=None, period=None):
+        """Páginas do recorte cujo caminho contém ``term`` (``PageIndex.search``)"""
+        periods = self.periods(years, months, period)
+        sql = self._sql(periods)
+        if sql is not None:
+            paths = sql.query(
+                "SELECT DISTINCT pagePath FROM pages_info "
+                f"WHERE year_month IN ({placeholders(periods)})",
+                periods,
+            )
+            if paths is not None:
+                return matching_paths(paths["pagePath"], term)
+        return self.page_index(years, months, period).search(term)
+
+    @timed("query.page_series")
+    def page_series(self, paths, years=None, months=None, period=None):
+        """Usuários e visualizações por mês de ``paths`` (``PageIndex.series``)"""
+        periods = self.periods(years, months, period)
+        sql = self._sql(periods)
+        if sql is not None and paths:
+            series = sql.query(
+                "SELECT year_month, pagePath, SUM(activeUsers) AS activeUsers, "
+                "SUM(screenPageViews) AS screenPageViews FROM pages_info "
+                f"WHERE year_month IN ({placeholders(periods)}) "
+                f"AND pagePath IN ({placeholders(paths)}) "
+                "GROUP BY 1, 2 ORDER BY 1, 2",
+                periods + list(paths),
+            )
+            if series is not None:
+                return categorize(series, ["year_month", "pagePath"])
+        return self.page_index(years, months, period).series(paths)
+
+    @timed("query.sessions")
+    def sessions(self, years=None, months=None, period=None):
+        """Sessões por newVsReturning x sessionSource e por mês do recorte"""
+        return self._load("website_sessions_info", years, months, period)
+
+    @timed("query.breakdown")
+    def breakdown(self, dimension, years=None, months=None, period=None, only=None):
+        """Soma as sessões do recorte por mês e por ``dimension``
+
+        ``dimension`` é "sessionSource" ou "newVsReturning"; linhas sem valor
+        nessa dimensão (meses antigos, sem a tabela cruzada) ficam de fora.
+        Com ``only``, só esses valores da dimensão entram.
+        """
+        periods = self.periods(years, months, period)
+        sql = self._sql(periods)
+        if sql is not None:
+            params = list(periods)
+            condition = f'"{dimension}" IS NOT NULL'
+            if only is not None:
+                condition = f'"{dimension}" IN ({placeholders(only)})'
+                params += list(only)
+            breakdown = sql.query(
+                f'SELECT year_month, "{dimension}", SUM(sessions) AS sessions '
+                "FROM website_sessions_info "
+                f"WHERE year_month IN ({placeholders(periods)}) AND {condition} "
+                "GROUP BY 1, 2 ORDER BY 1, 2",
+                params,
+            )
+            if breakdown is not None:
+                return categorize(breakdown, ["year_month", dimension])
+
+        sessions = self.sessions(years, months, period)
+        if only is not None and not sessions.empty:
+            sessions = sessions[sessions[dimension].isin(only)]
+        if sessions.empty:
+            return pd.DataFrame(columns=["year_month", dimension, "sessions"])
+        return (
+            sessions.groupby(["year_month", dimension], observed=True)
+            .agg({"sessions": "sum"})
+            .reset_index()
+        )
+
+    @timed("query.sources")
+    def sources(self, years=None, months=None, period=None, only=None):
+        """Sessões por fonte e por mês do recorte (colunas source e count)
+
+        Com ``only``, só as fontes dessa lista.
+        """
+        sources = self.breakdown("sessionSource", years, months, period, only)
+        return sources.rename(columns={"sessionSource": "source", "sessions": "count"})
+
+    @timed("query.visitors")
+    def visitors(self, years=None, months=None, period=None):
+        """Sessões de visitantes novos e recorrentes no recorte"""
+        periods = self.periods(years, months, period)
+        sql = self._sql(periods)
+        if sql is not None:
+            visitors = sql.query(
+                "SELECT newVsReturning, SUM(sessions) AS sessions "
+                "FROM website_sessions_info "
+                f"WHERE year_month IN ({placeholders(periods)}) "
+                "AND newVsReturning IS NOT NULL GROUP BY 1 ORDER BY 1",
+                periods,
+            )
+            if visitors is not None:
+                return categorize(visitors, ["newVsReturning"])
+
+        visitors = self.breakdown("newVsReturning", years, months, period)
+        return (
+            visitors.groupby("newVsReturning", observed=True)
+            .agg({"sessions": "sum"})
+            .reset_index()
+        )
+
+    @timed("query.top_pages")
+    def top_pages(self, limit, years=None, months=None, period=None):
+        """Top ``limit`` páginas por usuários ativos no recorte
+
+        Usa os rollups do extrator quando o recorte é um mês, um ano ou todo
+        o histórico; senão soma as páginas dos meses do recorte, no SQLite
+        quando possível.
+        """
+        rollups = self.store.rollups()
+        scope = self._scope(years, months, period)
+        if rollups is not None and scope is not None:
+            top = rollups.top_pages(*scope, limit=limit)
+            if top is not None:
+                return top
+
+        periods = self.periods(years, months, period)
+        sql = self._sql(periods)
+        top = None
+        if sql is not None and period is not None:
+            top = sql.query(
+                "SELECT pagePath, activeUsers, screenPageViews FROM pages_info "
+                "WHERE year_month = ? ORDER BY activeUsers DESC, position LIMIT ?",
+                [period, limit],
+            )
+        elif sql is not None:
+            top = sql.query(
+                "SELECT pagePath, SUM(activeUsers) AS activeUsers, "
+                "SUM(screenPageViews) AS screenPageViews FROM pages_info "
+                f"WHERE year_month IN ({placeholders(periods)}) GROUP BY pagePath "
+                "ORDER BY activeUsers DESC, pagePath LIMIT ?",
+                periods + [limit],
+            )
+        if top is not None:
+            return categorize(top, ["pagePath"])
+
+        columns = ["pagePath", "activeUsers", "screenPageViews"]
+        pages = self.pages(years, months, period)
+        if pages.empty:
+            return pd.DataFrame(columns=columns)
+        if period is not None:
+            top = pages[columns].sort_values(
+                "activeUsers", ascending=False, kind="stable"
+            )
+        else:
+            top = (
+                pages.groupby("pagePath", observed=True)
+                .agg({"activeUsers": "sum", "screenPageViews": "sum"})
+                .reset_index()
+                .sort_values("activeUsers", ascending=False)
+            )
+        return top.head(limit)
+
+    @timed("query.source_totals")
+    def source_totals(self, years=None, months=None, period=None):
+        """Sessões por fonte somadas no recorte, da maior para a menor"""
+        rollups = self.store.rollups()
+        scope = self._scope(years, months, period)
+        if rollups is not None and scope is not None:
+            totals = rollups.sources(*scope)
+            if totals is not None:
+                return totals
+
+        periods = self.periods(years, months, period)
+        sql = self._sql(periods)
+        if sql is not None:
+            totals = sql.query(
+                'SELECT sessionSource AS source, SUM(sessions) AS "count" '
+                "FROM website_sessions_info "
+                f"WHERE year_month IN ({placeholders(periods)}) "
+                'AND sessionSource IS NOT NULL GROUP BY 1 ORDER BY "count" DESC, 1',
+                periods,
+            )
+            if totals is not None:
+                return categorize(totals, ["source"])
+
+        sources = self.sources(years, months, period)
+        if sources.empty:
+            return pd.DataFrame(columns=["source", "count"])
+        return (
+            sources.groupby("source", observed=True)
+            .agg({"count": "sum"})
+            .reset_index()
+            .sort_values("count", ascending=False)
+        )
+
+    @timed("query.history")
+    def history(self):
+        """Métricas gerais de todos os meses, para médias históricas
+
+        Vêm dos totais de ``data/index.json`` quando ele cobre todos os meses;
+        senão só o website_info (uma linha por mês) é carregado.
+        """
+        catalog = self.catalog()
+        if set(WEBSITE_METRICS) <= set(catalog.columns):
+            history = catalog[["year", "month", "year_month"] + WEBSITE_METRICS]
+            if not history[WEBSITE_METRICS].isna().any().any():
+                return history
+        return self.website()
@@ -0,0 +1,151 @@
+"""Consultas SQL do dashboard sobre ``data/analytics.sqlite``.
+
+O banco é gerado no servidor do dashboard (``python database.py``, rodado
+pelo ``streamlit.service``) com uma tabela por relatório e todos os meses.
+O extrator roda no CI e não mexe nele: quando os arquivos de um mês pedido
+mudam (um ``git pull`` trouxe um mês novo ou atualizado), ``covers``
+regrava só esses meses com ``database.refresh`` antes de consultar.
+As consultas de ``Queries`` que agrupam e ordenam (top páginas, totais por
+fonte, sessões por mês) mandam o filtro de meses, o ``GROUP BY`` e o
+``ORDER BY ... LIMIT`` para o SQLite e só recebem o resultado, sem carregar
+as linhas dos meses no pandas.
+
+O SQLite lê do arquivo só as páginas que a consulta usa, então o histórico
+não precisa caber na memória. Cada thread (cada sessão do Streamlit) tem a
+sua conexão somente leitura e as consultas rodam fora do GIL, em paralelo.
+
+O banco só é usado quando tem os meses pedidos gravados a partir dos
+arquivos atuais deles; se a atualização falhar, as consultas voltam para os
+DataFrames do ``DataStore``.
+"""
+
+import logging
+import os
+import sqlite3
+import sys
+import threading
+
+import pandas as pd
+
+from timing import span
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database  # noqa: E402
+
+DATABASE_FILE = database.DATABASE_FILE
+# Threads auxiliares do SQLite para ordenações grandes
+SORTER_THREADS = 4
+
+
+class SqlBackend:
+    """Conexões somente leitura ao banco SQLite, uma por thread"""
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.path = os.path.join(data_dir, DATABASE_FILE)
+        self._local = threading.local()
+        self._refresh_lock = threading.Lock()
+        # Assinaturas cuja atualização falhou, para não tentar a cada consulta
+        self._failed = set()
+
+    def _stat(self):
+        try:
+            return os.stat(self.path)
+        except FileNotFoundError:
+            return None
+
+    def _connection(self, stat):
+        """Conexão da thread atual, reaberta quando o arquivo do banco muda"""
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        local = self._local
+        if getattr(local, "key", None) != key:
+            if getattr(local, "connection", None) is not None:
+                local.connection.close()
+                local.connection = local.key = None
+            connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            connection.execute(f"PRAGMA threads = {SORTER_THREADS}")
+            local.connection = connection
+            local.months = dict(
+                connection.execute("SELECT year_month, signature FROM months")
+            )
+            local.key = key
+        return local.connection
+
+    def covers(self, fingerprint):
+        """Se o banco tem os meses de ``fingerprint`` como estão nos arquivos
+
+        ``fingerprint`` é o de ``DataStore.fingerprint``; os meses cujos JSON
+        mudaram desde que foram gravados são regravados aqui.
+        """
+        if not fingerprint:
+            return False
+        signatures = {
+            year_month: database.month_signature(self.data_dir, year_month)
+            for year_month, _ in fingerprint
+        }
+        if "[]" in signatures.values():
+            return False
+        try:
+            stale = self._stale(signatures)
+            if stale:
+                self._refresh(stale, signatures)
+                stale = self._stale(signatures)
+        except sqlite3.Error:
+            return False
+        return not stale
+
+    def _stale(self, signatures):
+        """Meses de ``signatures`` ausentes ou desatualizados no banco"""
+        stat = self._stat()
+        if stat is None:
+            return list(signatures)
+        try:
+            self._connection(stat)
+        except sqlite3.Error:
+            # Banco de um esquema antigo: refresh o recria
+            return list(signatures)
+        return [
+            year_month
+            for year_month, signature in signatures.items()
+            if self._local.months.get(year_month) != signature
+        ]
+
+    def _refresh(self, year_months, signatures):
+        """Regrava ``year_months`` no banco, uma thread por vez"""
+        attempt = frozenset((month, signatures[month]) for month in year_months)
+        with self._refresh_lock:
+            if attempt <= self._failed:
+                return
+            with span("sql_refresh") as details:
+                try:
+                    details["months"] = len(
+                        database.refresh(self.data_dir, sorted(year_months))
+                    )
+                except (sqlite3.Error, OSError, ValueError):
+                    logging.exception("Falha ao atualizar %s", self.path)
+                    self._failed |= attempt
+
+    def query(self, sql, params=()):
+        """Resultado de ``sql`` como DataFrame, ou None se o banco falhar
+
+        Usa a conexão que ``covers`` validou nesta thread, sem olhar o
+        arquivo de novo: se ele foi trocado ou apagado nesse meio tempo, a
+        conexão aberta continua lendo o banco validado. Com None, quem chamou
+        volta para os DataFrames do ``DataStore``.
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            return None
+        with span("sql") as details:
+            try:
+                frame = pd.read_sql_query(sql, connection, params=list(params))
+            except (sqlite3.Error, pd.errors.DatabaseError):
+                details["failed"] = True
+                return None
+            details["rows"] = len(frame)
+        return frame
+
+
+def placeholders(values):
+    """``?, ?, ?`` para uma cláusula ``IN`` com ``values``"""
+    return ", ".join("?" * len(values))
@@ -0,0 +1,145 @@
+"""Medição de tempo dos trechos quentes do dashboard.
+
+``span("load", ...)`` mede um trecho (carga de dados, agregação, montagem de
+gráfico) e guarda o resultado em três lugares:
+
+- na lista da execução atual do script, mostrada no painel de depuração;
+- nas estatísticas do processo (contagem, total, máximo por trecho);
+- no logger ``dashboard.timing``, uma linha JSON por trecho.
+
+Variáveis de ambiente:
+
+- ``DASHBOARD_TIMING_LOG``: escreve o log JSON dos trechos em stderr;
+- ``DASHBOARD_METRICS_FILE``: cada execução acrescenta seus trechos nesse
+  arquivo, em formato JSON Lines.
+"""
+
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("dashboard.timing")
+LOG_ENV = "DASHBOARD_TIMING_LOG"
+METRICS_FILE_ENV = "DASHBOARD_METRICS_FILE"
+
+# Cada sessão do Streamlit roda o script na sua própria thread
+_local = threading.local()
+_stats_lock = threading.Lock()
+_stats = {}  # nome -> {"count", "total_ms", "self_ms", "max_ms"}
+
+
+def configure_logging():
+    """Liga o log JSON dos trechos em stderr se ``DASHBOARD_TIMING_LOG`` existir"""
+    if os.environ.get(LOG_ENV) and not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+
+
+def _run():
+    if not hasattr(_local, "spans"):
+        _local.spans = []
+        _local.stack = []
+        _local.page = None
+    return _local
+
+
+def begin_run(page):
+    """Começa a coleta de uma execução do script para a página ``page``"""
+    run = _run()
+    run.spans = []
+    run.stack = []
+    run.page = page
+
+
+def run_spans():
+    """Trechos medidos na execução atual, na ordem em que terminaram"""
+    return list(_run().spans)
+
+
+@contextmanager
+def span(name, **fields):
+    """Mede o bloco ``with`` como um trecho chamado ``name``
+
+    O ``with`` recebe o dicionário de campos do trecho, para o bloco
+    acrescentar detalhes que só conhece no fim (ex.: se veio do cache).
+    ``self_ms`` desconta o tempo dos trechos internos.
+    """
+    run = _run()
+    parent = run.stack[-1] if run.stack else None
+    frame = {"name": name, "children_ms": 0.0}
+    run.stack.append(frame)
+    started = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        elapsed = (time.perf_counter() - started) * 1000
+        run.stack.pop()
+        own = elapsed - frame["children_ms"]
+        if parent is not None:
+            parent["children_ms"] += elapsed
+        record = {
+            "span": name,
+            "ms": round(elapsed, 3),
+            "self_ms": round(own, 3),
+            "page": run.page,
+            "parent": parent and parent["name"],
+            "depth": len(run.stack),
+            **fields,
+        }
+        run.spans.append(record)
+        with _stats_lock:
+            stats = _stats.setdefault(
+                name, {"count": 0, "total_ms": 0.0, "self_ms": 0.0, "max_ms": 0.0}
+            )
+            stats["count"] += 1
+            stats["total_ms"] += elapsed
+            stats["self_ms"] += own
+            stats["max_ms"] = max(stats["max_ms"], elapsed)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+
+def timed(name):
+    """Decorador que mede cada chamada da função como o trecho ``name``"""
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def process_stats():
+    """Estatísticas por trecho desde o início do processo"""
+    with _stats_lock:
+        return {
+            name: {
+                "count": stats["count"],
+                "total_ms": round(stats["total_ms"], 3),
+                "self_ms": round(stats["self_ms"], 3),
+                "mean_ms": round(stats["total_ms"] / stats["count"], 3),
+                "max_ms": round(stats["max_ms"], 3),
+            }
+            for name, stats in _stats.items()
+        }
+
+
+def export_run(path=None):
+    """Acrescenta os trechos da execução atual em ``path`` (JSON Lines)"""
+    path = path or os.environ.get(METRICS_FILE_ENV)
+    if not path:
+        return
+    spans = run_spans()
+    with open(path, "a", encoding="utf-8") as f:
+        for record in spans:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
@@ -0,0 +1,9 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [
+    ROOT,
+    os.path.join(ROOT, "streamlit"),
+    os.path.join(ROOT, "benchmarks"),
+]
@@ -0,0 +1,83 @@
+import filecmp
+import json
+import os
+import shutil
+import time
+
+import archive
+import storage
+from conftest import ROOT
+
+MONTHS = ("2024-01", "2025-06", "2025-07")
+SESSIONS = [
+    {"newVsReturning": "new", "sessionSource": "google", "sessions": 3000},
+    {"newVsReturning": "returning", "sessionSource": "google", "sessions": 443},
+    {"newVsReturning": "new", "sessionSource": "(direct)", "sessions": 299},
+]
+
+
+def copy_months(data_dir):
+    """Two stored months, and 2025-07 with the sessions cross-tab report."""
+    for year_month in MONTHS[:2]:
+        shutil.copytree(os.path.join(ROOT, "data", year_month), data_dir / year_month)
+    folder = data_dir / "2025-07"
+    folder.mkdir()
+    shutil.copy(data_dir / "2025-06" / "website_info.json", folder)
+    pages = json.loads((data_dir / "2025-06" / "pages_info.json").read_text())
+    files = {
+        "pages_info.json": [{**row, "month": "07"} for row in pages],
+        "website_sessions_info.json": SESSIONS,
+        "website_dimensions_info.json": storage.dimensions_info(SESSIONS),
+    }
+    for name, data in files.items():
+        (folder / name).write_text(json.dumps(data, indent=4))
+
+
+def test_export_rebuilds_the_json_files_byte_for_byte(tmp_path):
+    copy_months(tmp_path / "data")
+    data_dir = str(tmp_path / "data")
+    assert archive.build(data_dir) == list(MONTHS)
+    assert archive.months(data_dir) == list(MONTHS)
+
+    out_dir = str(tmp_path / "json")
+    assert archive.export(data_dir, out_dir) == list(MONTHS)
+    for year_month in MONTHS:
+        names = sorted(os.listdir(os.path.join(data_dir, year_month)))
+        assert sorted(os.listdir(os.path.join(out_dir, year_month))) == names
+        _, mismatch, errors = filecmp.cmpfiles(
+            os.path.join(data_dir, year_month),
+            os.path.join(out_dir, year_month),
+            names,
+            shallow=False,
+        )
+        assert (mismatch, errors) == ([], [])
+
+
+def test_read_month_matches_the_json_rows(tmp_path):
+    copy_months(tmp_path)
+    data_dir = str(tmp_path)
+    archive.build(data_dir)
+    dictionaries = archive.load_dictionaries(data_dir)
+
+    rows = storage.read_month_rows(data_dir, "2024-01")["pages_info"]
+    table = archive.read_month(data_dir, "pages_info", "2024-01")
+    assert table.num_rows == len(rows)
+    paths = dictionaries["pagePath"].decode(table["pagePath"])
+    assert paths == [row["pagePath"] for row in rows]
+
+
+def test_build_rewrites_only_months_newer_than_the_archive(tmp_path):
+    copy_months(tmp_path)
+    data_dir = str(tmp_path)
+    archive.build(data_dir)
+    assert archive.build(data_dir) == []
+
+    path = os.path.join(data_dir, "2025-06", "pages_info.json")
+    os.utime(path, (time.time() + 60,) * 2)
+    assert not archive.is_current(data_dir, "2025-06")
+    assert archive.build(data_dir) == ["2025-06"]
+    # Dictionaries only grow: the rewrite adds no value twice
+    dictionary = os.path.join(data_dir, "archive", "dictionaries", "pagePath.jsonl")
+    with open(dictionary) as f:
+        values = f.read().splitlines()
+    assert len(values) == len(set(values))
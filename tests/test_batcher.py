@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+from fake_ga import FakeAnalyticsClient
+
+import main
+import reports
+
+
+def requests(count):
+    return [
+        reports.WEBSITE.request(1, f"2024-{month:02d}-01", f"2024-{month:02d}-28")
+        for month in range(1, count + 1)
+    ]
+
+
+async def run_all(batcher, batch_requests):
+    results = await asyncio.gather(
+        *(batcher.run_report(request) for request in batch_requests),
+        return_exceptions=True,
+    )
+    # The batch tasks must finish cleanly even when callers already gave up
+    await asyncio.gather(*batcher._tasks)
+    return results
+
+
+class ShortBatchClient(FakeAnalyticsClient):
+    """Answers every batch with one report too few."""
+
+    async def batch_run_reports(self, request):
+        response = await super().batch_run_reports(request)
+        del response.reports[-1]
+        return response
+
+
+class FailingClient(FakeAnalyticsClient):
+    async def batch_run_reports(self, request):
+        raise RuntimeError("unavailable")
+
+
+def test_batcher_splits_requests_and_keeps_their_order():
+    client = FakeAnalyticsClient()
+    batcher = main.ReportBatcher(client, 1)
+    batch_requests = requests(main.MAX_BATCH_SIZE + 2)
+
+    results = asyncio.run(run_all(batcher, batch_requests))
+
+    assert batcher.batches == client.calls == 2
+    assert client.requests == len(batch_requests)
+    for request, response in zip(batch_requests, results):
+        expected = asyncio.run(client.run_report(request))
+        assert response.rows[0].metric_values[0].value == (
+            expected.rows[0].metric_values[0].value
+        )
+
+
+@pytest.mark.parametrize("client_class", [FailingClient, ShortBatchClient])
+def test_batcher_fails_every_caller_of_a_bad_batch(client_class):
+    batcher = main.ReportBatcher(client_class(), 1)
+
+    results = asyncio.run(run_all(batcher, requests(3)))
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert batcher.batches == 0
+
+
+def test_batcher_skips_callers_that_were_cancelled():
+    async def scenario():
+        batcher = main.ReportBatcher(ShortBatchClient(latency=0.01), 1)
+        calls = [
+            asyncio.ensure_future(batcher.run_report(request))
+            for request in requests(2)
+        ]
+        await asyncio.sleep(main.BATCH_WINDOW + 0.005)
+        calls[0].cancel()
+        await asyncio.gather(*batcher._tasks)
+        return await asyncio.gather(*calls, return_exceptions=True)
+
+    cancelled, failed = asyncio.run(scenario())
+    assert isinstance(cancelled, asyncio.CancelledError)
+    assert isinstance(failed, RuntimeError)
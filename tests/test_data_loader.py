@@ -0,0 +1,121 @@
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pytest
+
+import archive
+import data_loader
+from conftest import ROOT
+from data_loader import DataStore, scan_months
+
+MONTHS = ("2024-01", "2024-02")
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    for year_month in MONTHS:
+        shutil.copytree(os.path.join(ROOT, "data", year_month), tmp_path / year_month)
+    return str(tmp_path)
+
+
+def assert_same_frames(expected, loaded):
+    for left, right in zip(expected, loaded):
+        pd.testing.assert_frame_equal(
+            left.reset_index(drop=True),
+            right.reset_index(drop=True),
+            check_like=True,
+            check_categorical=False,
+        )
+
+
+def test_unreadable_dictionary_falls_back_to_json(data_dir):
+    expected = DataStore(data_dir).load()
+    archive.build(data_dir)
+    assert {source for source, _ in scan_months(data_dir).values()} == {"archive"}
+
+    path = os.path.join(data_dir, "archive", "dictionaries", "pagePath.jsonl")
+    with open(path) as f:
+        lines = f.readlines()
+    with open(path, "w") as f:
+        f.writelines(lines[:-1] + [lines[-1][:3]])
+    store = DataStore(data_dir)
+    assert store.dictionaries()["pagePath"] is None
+    assert_same_frames(expected, store.load())
+
+    with open(path, "w") as f:
+        f.writelines(lines[:10])
+    assert_same_frames(expected, store.load())
+
+    os.remove(path)
+    assert_same_frames(expected, DataStore(data_dir).load())
+
+
+def test_archive_older_than_json_is_ignored(data_dir):
+    archive.build(data_dir)
+    path = os.path.join(data_dir, "2024-02", "website_info.json")
+    os.utime(path, (time.time() + 60,) * 2)
+
+    months = scan_months(data_dir)
+    assert months["2024-01"][0] == "archive"
+    assert months["2024-02"][0] == "json"
+
+
+def test_load_reuses_frames_until_a_month_changes(data_dir):
+    store = DataStore(data_dir)
+    first = store.load()
+    version = store.version
+    assert store.load() is first
+    assert store.version == version
+
+    path = os.path.join(data_dir, "2024-02", "pages_info.json")
+    with open(path) as f:
+        rows = json.load(f)
+    with open(path, "w") as f:
+        json.dump(rows[:5], f)
+    website, pages, sessions = store.load()
+    assert store.version != version
+    assert pages is not first[1]
+    assert (pages["year_month"] == "2024-02").sum() == 5
+    assert_same_frames(
+        [first[1][first[1]["year_month"] == "2024-01"]],
+        [pages[pages["year_month"] == "2024-01"]],
+    )
+
+
+def test_load_forgets_removed_months_and_finds_new_ones(data_dir):
+    store = DataStore(data_dir)
+    store.load()
+
+    shutil.rmtree(os.path.join(data_dir, "2024-01"))
+    shutil.copytree(
+        os.path.join(ROOT, "data", "2024-03"), os.path.join(data_dir, "2024-03")
+    )
+    website, _, _ = store.load()
+    assert list(website["year_month"]) == ["2024-02", "2024-03"]
+    assert store.available_months() == ["2024-02", "2024-03"]
+
+
+def test_parse_months_recovers_from_a_broken_process_pool(data_dir):
+    expected = data_loader.parse_months(data_dir, MONTHS, pool="sequential")
+    # Workers that exit on start break the pool on first use
+    broken = ProcessPoolExecutor(1, initializer=os._exit, initargs=(1,))
+    data_loader._process_pools[1] = broken
+    try:
+        parsed = data_loader.parse_months(data_dir, MONTHS, pool="process", workers=1)
+        assert parsed == expected
+        assert data_loader._process_pools.get(1) is not broken
+    finally:
+        data_loader.shutdown_process_pools()
+
+
+def test_store_loads_the_same_frames_with_every_pool(data_dir):
+    expected = DataStore(data_dir, pool="sequential").load()
+    try:
+        for pool in ("thread", "process"):
+            assert_same_frames(expected, DataStore(data_dir, pool=pool).load())
+    finally:
+        data_loader.shutdown_process_pools()
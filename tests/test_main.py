@@ -0,0 +1,32 @@
+import os
+from datetime import date
+
+import main
+
+
+def write_reports(folder, names):
+    os.makedirs(folder, exist_ok=True)
+    for name in names:
+        with open(os.path.join(folder, name), "w") as f:
+            f.write("[]")
+
+
+def test_is_month_complete_never_for_the_current_month(tmp_path):
+    folder = str(tmp_path / "2025-06")
+    write_reports(folder, main.REPORT_FILES)
+
+    assert main.is_month_complete(folder, today=date(2025, 7, 1))
+    assert not main.is_month_complete(folder, today=date(2025, 6, 30))
+    assert not main.is_month_complete(folder, today=date(2025, 5, 10))
+
+
+def test_is_month_complete_without_the_sessions_report(tmp_path):
+    folder = str(tmp_path / "2024-01")
+    legacy = [
+        name for name in main.REPORT_FILES if name != "website_sessions_info.json"
+    ]
+    write_reports(folder, legacy)
+    assert main.is_month_complete(folder, today=date(2025, 7, 1))
+
+    os.remove(os.path.join(folder, "website_dimensions_info.json"))
+    assert not main.is_month_complete(folder, today=date(2025, 7, 1))
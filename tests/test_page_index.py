@@ -0,0 +1,75 @@
+import pandas as pd
+import pytest
+
+from page_index import PageIndex, matching_paths
+
+PATHS = [
+    "/",
+    "/trilhas/python/",
+    "/trilhas/Python/listas/",
+    "//trilhas/javascript/",
+    "/blog/python-na-escola/",
+    "/sobre/",
+]
+
+
+def pages():
+    rows = [
+        {
+            "pagePath": path,
+            "year_month": year_month,
+            "activeUsers": 10 * (position + 1),
+            "screenPageViews": 20 * (position + 1) + number,
+        }
+        for number, year_month in enumerate(["2024-01", "2024-02"])
+        for position, path in enumerate(PATHS)
+    ]
+    frame = pd.DataFrame(rows)
+    for column in ("pagePath", "year_month"):
+        frame[column] = frame[column].astype("category")
+    return frame
+
+
+@pytest.fixture
+def index():
+    return PageIndex(pages())
+
+
+@pytest.mark.parametrize(
+    "term", ["python", "PYTHON", "/python", "trilhas/", "/", "py", "a", "x", ""]
+)
+def test_search_matches_a_scan_of_the_paths(index, term):
+    expected = matching_paths(PATHS, term) if term else PATHS
+    assert sorted(index.search(term)) == sorted(expected)
+
+
+def test_search_ignores_case_and_repeated_slashes(index):
+    assert sorted(index.search("/trilhas/")) == [
+        "//trilhas/javascript/",
+        "/trilhas/Python/listas/",
+        "/trilhas/python/",
+    ]
+    assert index.search("javascript") == ["//trilhas/javascript/"]
+    assert index.search("nada-aqui") == []
+
+
+def test_with_prefix_keeps_a_section(index):
+    assert index.with_prefix("/trilhas/python") == [
+        "/trilhas/python/",
+        "/trilhas/Python/listas/",
+    ]
+
+
+def test_series_of_pages(index):
+    series = index.series(["/sobre/", "/trilhas/python/", "/missing/"])
+    assert list(series["pagePath"]) == ["/sobre/", "/trilhas/python/"] * 2
+    assert list(series["year_month"]) == ["2024-01"] * 2 + ["2024-02"] * 2
+    assert list(series["screenPageViews"]) == [120, 40, 121, 41]
+    assert index.series(["/missing/"]).empty
+
+
+def test_empty_index():
+    index = PageIndex(pages()[:0])
+    assert len(index) == 0
+    assert index.search("python") == []
+    assert index.series(["/"]).empty
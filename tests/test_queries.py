@@ -0,0 +1,102 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+import storage
+from conftest import ROOT
+from data_loader import DataStore
+from queries import Queries
+from sql_backend import SqlBackend
+
+MONTHS = ("2024-11", "2024-12", "2025-01", "2025-02", "2025-03")
+FILTERS = [
+    {},
+    {"period": "2024-12"},
+    {"years": [2025]},
+    {"months": [1, 12]},
+    {"years": [2024], "months": [11]},
+]
+
+
+@pytest.fixture(scope="module")
+def backends(tmp_path_factory):
+    """The same months answered by pandas, by SQLite and by the rollups"""
+    queries = {}
+    for name in ("pandas", "sql", "rollups"):
+        data_dir = str(tmp_path_factory.mktemp(name))
+        for year_month in MONTHS:
+            shutil.copytree(
+                os.path.join(ROOT, "data", year_month),
+                os.path.join(data_dir, year_month),
+            )
+        if name == "rollups":
+            storage.rebuild(data_dir)
+        sql = SqlBackend(data_dir) if name == "sql" else None
+        queries[name] = Queries(DataStore(data_dir), sql)
+    assert queries["rollups"].store.rollups() is not None
+    return queries
+
+
+def normalized(frame, keys):
+    """Rows of ``frame`` as plain values, in ``keys`` order"""
+    frame = frame.reset_index(drop=True)
+    frame = frame.astype({column: str for column in keys})
+    return frame.sort_values(keys, ignore_index=True).to_dict("records")
+
+
+def test_sql_backend_covers_the_months(backends):
+    queries = backends["sql"]
+    assert queries._sql(list(MONTHS)) is not None
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_top_pages_agree(backends, filters):
+    pandas = backends["pandas"]
+    expected = pandas.top_pages(10, **filters)
+    for name in ("sql", "rollups"):
+        top = backends[name].top_pages(10, **filters)
+        assert list(top["activeUsers"]) == list(expected["activeUsers"])
+        # Ties at the cut may keep different pages; the ones above it match
+        cut = expected["activeUsers"].min()
+        above = expected[expected["activeUsers"] > cut]
+        chosen = top[top["activeUsers"] > cut]
+        assert normalized(chosen, ["pagePath"]) == normalized(above, ["pagePath"])
+
+    every_page = normalized(pandas.top_pages(10000, **filters), ["pagePath"])
+    top = backends["sql"].top_pages(10000, **filters)
+    assert normalized(top, ["pagePath"]) == every_page
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_source_totals_and_visitors_agree(backends, filters):
+    pandas = backends["pandas"]
+    for name in ("sql", "rollups"):
+        assert normalized(backends[name].source_totals(**filters), ["source"]) == (
+            normalized(pandas.source_totals(**filters), ["source"])
+        )
+    assert normalized(backends["sql"].visitors(**filters), ["newVsReturning"]) == (
+        normalized(pandas.visitors(**filters), ["newVsReturning"])
+    )
+    keys = ["year_month", "sessionSource"]
+    assert normalized(backends["sql"].breakdown("sessionSource", **filters), keys) == (
+        normalized(pandas.breakdown("sessionSource", **filters), keys)
+    )
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_page_queries_agree(backends, filters):
+    pandas, sql = backends["pandas"], backends["sql"]
+    assert sql.has_pages(**filters) == pandas.has_pages(**filters) is True
+    paths = pandas.page_paths(30, **filters)
+    assert sql.page_paths(30, **filters) == paths
+    assert sorted(sql.search_pages("trilhas", **filters)) == sorted(
+        pandas.search_pages("trilhas", **filters)
+    )
+    keys = ["year_month", "pagePath"]
+    series = sql.page_series(paths[:5], **filters)
+    assert normalized(series, keys) == normalized(
+        pandas.page_series(paths[:5], **filters), keys
+    )
+    assert isinstance(series["pagePath"].dtype, pd.CategoricalDtype)
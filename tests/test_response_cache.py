@@ -0,0 +1,77 @@
+import asyncio
+import os
+import time
+
+import pytest
+from fake_ga import FakeAnalyticsClient
+
+import reports
+from response_cache import CacheMiss, CachingClient, ResponseCache, request_key
+
+
+def request(month=1):
+    return reports.WEBSITE.request(1, f"2024-{month:02d}-01", f"2024-{month:02d}-28")
+
+
+def response(month=1):
+    return asyncio.run(FakeAnalyticsClient().run_report(request(month)))
+
+
+def age(cache, month, seconds):
+    path = cache.path(request_key(request(month)))
+    mtime = time.time() - seconds
+    os.utime(path, (mtime, mtime))
+
+
+def test_get_returns_put_responses_until_they_expire(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=60)
+    assert cache.get(request()) is None
+
+    cache.put(request(), response())
+    assert cache.get(request()) == response()
+    age(cache, 1, 120)
+    assert cache.get(request()) is None
+    assert cache.get(request(), ignore_ttl=True) == response()
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_put_evicts_the_oldest_entries(tmp_path):
+    entry = len(type(response()).serialize(response()))
+    cache = ResponseCache(str(tmp_path), max_bytes=int(entry * 3.5))
+    for month in range(1, 4):
+        cache.put(request(month), response(month))
+        age(cache, month, 100 - month)
+    assert cache.size == 3 * entry
+
+    cache.put(request(4), response(4))
+    assert cache.get(request(1)) is None
+    assert all(cache.get(request(month)) for month in range(2, 5))
+    assert cache.size == sum(size for _, size, _ in cache.entries()) == 3 * entry
+    assert ResponseCache(str(tmp_path)).size == cache.size
+
+
+def test_unreadable_entries_are_removed(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.put(request(), response())
+    path = cache.path(request_key(request()))
+    with open(path, "wb") as f:
+        f.write(b"\xff\xff\xff")
+    cache = ResponseCache(str(tmp_path))
+    assert cache.size == 3
+
+    assert cache.get(request()) is None
+    assert not os.path.exists(path)
+    assert cache.size == 0
+
+
+def test_replay_serves_only_cached_responses(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=0)
+    api = FakeAnalyticsClient()
+    asyncio.run(CachingClient(api, cache).run_report(request(1)))
+    assert api.calls == 1
+
+    replay = CachingClient(api, cache, replay=True)
+    assert asyncio.run(replay.run_report(request(1))) == response(1)
+    with pytest.raises(CacheMiss):
+        asyncio.run(replay.run_report(request(2)))
+    assert api.calls == 1
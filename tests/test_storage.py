@@ -0,0 +1,166 @@
+import json
+import os
+from datetime import date
+
+import pytest
+
+import storage
+
+
+def page(path, users, views, per_session, duration, bounce):
+    return {
+        "pagePath": path,
+        "year": "2025",
+        "month": "06",
+        "activeUsers": str(users),
+        "screenPageViews": str(views),
+        "screenPageViewsPerSession": str(per_session),
+        "screenPageViewPerUser": str(views / users),
+        "averageSessionDuration": str(duration),
+        "bounceRate": str(bounce),
+    }
+
+
+def website(users, views, duration, bounce, sessions):
+    return {
+        "activeUsers": str(users),
+        "screenPageViews": str(views),
+        "averageSessionDuration": str(duration),
+        "bounceRate": str(bounce),
+        "sessions": str(sessions),
+    }
+
+
+def day_reports(scale=1):
+    return {
+        "pages_info": [page("/a/", 10 * scale, 20 * scale, 2.0, 100.0 * scale, 0.5)],
+        "website_info": [website(10 * scale, 40 * scale, 60.0 * scale, 0.4, 20)],
+        "website_sessions_info": [
+            {"newVsReturning": "new", "sessionSource": "google", "sessions": 15},
+            {"newVsReturning": "returning", "sessionSource": "google", "sessions": 5},
+        ],
+    }
+
+
+def write_month(data_dir, year_month, reports):
+    folder = os.path.join(data_dir, year_month)
+    os.makedirs(folder, exist_ok=True)
+    for report, rows in reports.items():
+        with open(os.path.join(folder, f"{report}.json"), "w") as f:
+            json.dump(rows, f)
+
+
+MONTH_USERS = {"pages_info": {"/a/": 25}, "website_info": 32}
+
+
+def test_merge_days_sums_counts_and_weights_rates():
+    merged = storage.merge_days(
+        "2025-06", [day_reports(1), day_reports(3)], MONTH_USERS
+    )
+
+    (pages,) = merged["pages_info"]
+    assert pages["pagePath"] == "/a/"
+    assert (pages["year"], pages["month"]) == ("2025", "06")
+    assert pages["screenPageViews"] == "80"
+    assert pages["screenPageViewsPerSession"] == "2"
+    # Day sessions are views / per-session: 10 and 30
+    assert float(pages["averageSessionDuration"]) == pytest.approx(250.0)
+
+    (site,) = merged["website_info"]
+    assert site["screenPageViews"] == "160"
+    assert site["sessions"] == "40"
+    assert float(site["averageSessionDuration"]) == pytest.approx(120.0)
+    assert float(site["bounceRate"]) == pytest.approx(0.4)
+
+    assert merged["website_sessions_info"] == [
+        {"newVsReturning": "new", "sessionSource": "google", "sessions": 30},
+        {"newVsReturning": "returning", "sessionSource": "google", "sessions": 10},
+    ]
+
+
+def test_merge_days_takes_active_users_from_the_month():
+    merged = storage.merge_days(
+        "2025-06", [day_reports(1), day_reports(3)], MONTH_USERS
+    )
+
+    (pages,) = merged["pages_info"]
+    # Not 10 + 30: users active on both days count once
+    assert pages["activeUsers"] == "25"
+    assert pages["screenPageViewPerUser"] == "3.2"
+    assert merged["website_info"][0]["activeUsers"] == "32"
+
+    merged = storage.merge_days(
+        "2025-06", [day_reports(1)], {"pages_info": {}, "website_info": 0}
+    )
+    assert merged["pages_info"][0]["activeUsers"] == "0"
+    assert merged["pages_info"][0]["screenPageViewPerUser"] == "0"
+
+
+def test_merge_days_without_rows():
+    merged = storage.merge_days("2025-06", [], MONTH_USERS)
+    assert merged == {
+        "pages_info": [],
+        "website_info": [],
+        "website_sessions_info": [],
+    }
+
+
+def test_missing_days_stops_at_today(tmp_path):
+    data_dir = str(tmp_path)
+    storage.write_day(data_dir, "2025-06-01", day_reports())
+    storage.write_day(data_dir, "2025-06-03", day_reports())
+
+    missing = storage.missing_days(data_dir, "2025-06", today=date(2025, 6, 4))
+    assert missing == ["2025-06-02", "2025-06-04"]
+    assert len(storage.missing_days(data_dir, "2025-06", date(2025, 7, 1))) == 28
+    assert storage.month_days("2025-07", today=date(2025, 6, 4)) == []
+
+
+def test_derive_month_keeps_monthly_files_when_days_are_missing(tmp_path):
+    data_dir = str(tmp_path)
+    monthly = {
+        "pages_info": [page("/a/", 3401, 9000, 2.0, 100.0, 0.5)],
+        "website_info": [website(3401, 12000, 90.0, 0.4, 5000)],
+    }
+    write_month(data_dir, "2025-06", monthly)
+    storage.write_day(data_dir, "2025-06-03", day_reports())
+    storage.write_day(data_dir, "2025-06-04", day_reports())
+
+    with pytest.raises(storage.IncompleteMonth) as raised:
+        storage.derive_month(data_dir, "2025-06", MONTH_USERS, today=date(2025, 7, 1))
+
+    assert raised.value.missing[0] == "2025-06-01"
+    assert len(raised.value.missing) == 28
+    for report, rows in monthly.items():
+        with open(os.path.join(data_dir, "2025-06", f"{report}.json")) as f:
+            assert json.load(f) == rows
+
+
+def test_derive_month_from_every_day(tmp_path):
+    data_dir = str(tmp_path)
+    for day in storage.month_days("2025-06"):
+        storage.write_day(data_dir, day, day_reports())
+
+    days = storage.derive_month(
+        data_dir, "2025-06", MONTH_USERS, today=date(2025, 7, 1)
+    )
+
+    assert len(days) == 30
+    with open(os.path.join(data_dir, "2025-06", "website_info.json")) as f:
+        assert json.load(f)[0]["sessions"] == "600"
+    assert os.path.exists(storage.partition_path(data_dir, "pages_info", "2025-06"))
+
+
+def test_derived_is_stale_until_the_month_is_derived(tmp_path):
+    data_dir = str(tmp_path)
+    assert not storage.derived_is_stale(data_dir, "2025-06")
+    for day in storage.month_days("2025-06"):
+        storage.write_day(data_dir, day, day_reports())
+    assert storage.derived_is_stale(data_dir, "2025-06")
+
+    storage.derive_month(data_dir, "2025-06", MONTH_USERS, today=date(2025, 7, 1))
+    assert not storage.derived_is_stale(data_dir, "2025-06")
+
+    path = storage.day_path(data_dir, "2025-06-10")
+    os.utime(path, (os.path.getmtime(path) + 60,) * 2)
+    assert storage.derived_is_stale(data_dir, "2025-06")